@@ -0,0 +1 @@
+"""Бенчмарки бота."""
@@ -0,0 +1,84 @@
+"""Общие функции бенчмарков: статистика, окружение и сохранение результатов."""
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def setup_env():
+    """Задать переменные окружения, без которых не импортируется config.py."""
+    os.environ.setdefault("BOT_TOKEN", "42:BENCHMARK")
+    os.environ.setdefault("ADMIN_IDS", "900000001")
+    os.environ.setdefault("GROUP_ID", "-1000000000001")
+    # Трассы и лимиты задаются бенчмарком явно
+    os.environ.setdefault("TRACE_SLOW_THRESHOLD", "1000000")
+    os.environ.setdefault("MAX_CONCURRENT_UPDATES", "1000")
+
+
+def percentile(values: Iterable[float], q: float) -> float:
+    """Перцентиль (q от 0 до 1) методом ближайшего ранга."""
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(q * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def summarize(values: Iterable[float]) -> Dict[str, float]:
+    """Количество, среднее и перцентили выборки (в миллисекундах)."""
+    values = list(values)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean_ms": sum(values) / len(values) * 1000,
+        "p50_ms": percentile(values, 0.50) * 1000,
+        "p95_ms": percentile(values, 0.95) * 1000,
+        "p99_ms": percentile(values, 0.99) * 1000,
+        "max_ms": max(values) * 1000,
+    }
+
+
+def git_commit() -> Optional[str]:
+    """Текущий коммит репозитория, если он доступен."""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(RESULTS_DIR),
+            stderr=subprocess.DEVNULL,
+            text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_result(name: str, result: Dict[str, Any], path: Optional[str] = None) -> str:
+    """Сохранить результат в JSON вместе с коммитом и окружением."""
+    commit = git_commit()
+    now = datetime.now()
+    result = {
+        "benchmark": name,
+        "commit": commit,
+        "timestamp": now.isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        **result,
+    }
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{name}_{now:%Y%m%d_%H%M%S}_{commit or 'nogit'}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def compare_metric(old: Dict[str, Any], new: Dict[str, Any], key: str = "p95_ms") -> str:
+    """Строка сравнения метрики двух прогонов."""
+    if key not in old or key not in new or not old[key]:
+        return "-"
+    change = (new[key] - old[key]) / old[key]
+    return f"{old[key]:.1f} -> {new[key]:.1f} ({change:+.0%})"
@@ -0,0 +1,254 @@
+"""
+Бенчмарк функций database.py на синтетических данных разного объема.
+
+База заполняется правдоподобными жильцами (русские ФИО, телефоны +7,
+кадастровые номера участков) на 10 тыс., 100 тыс. и, по желанию, 1 млн
+записей. Для каждой функции измеряется:
+
+- cold — первый вызов после вытеснения файла базы из кеша ОС;
+- warm — медиана повторных вызовов.
+
+Кеш страниц самого SQLite между вызовами не сохраняется: каждая функция
+database.py открывает новое соединение.
+
+    python -m benchmarks.db_bench
+    python -m benchmarks.db_bench --sizes 10000,100000,1000000 --repeat 7
+    python -m benchmarks.db_bench --compare benchmarks/results/db_bench_....json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import setup_env, save_result, compare_metric
+
+setup_env()
+
+import database
+
+MALE_FIRST = ["Александр", "Сергей", "Дмитрий", "Андрей", "Алексей", "Максим", "Евгений", "Иван",
+              "Михаил", "Артем", "Николай", "Владимир", "Павел", "Олег", "Юрий", "Виктор"]
+FEMALE_FIRST = ["Елена", "Ольга", "Наталья", "Татьяна", "Ирина", "Анна", "Мария", "Светлана",
+                "Екатерина", "Юлия", "Марина", "Людмила", "Галина", "Дарья", "Вера", "Нина"]
+SURNAMES = ["Иванов", "Смирнов", "Кузнецов", "Попов", "Васильев", "Петров", "Соколов", "Михайлов",
+            "Новиков", "Федоров", "Морозов", "Волков", "Алексеев", "Лебедев", "Семенов", "Егоров",
+            "Павлов", "Козлов", "Степанов", "Николаев", "Орлов", "Андреев", "Макаров", "Никитин"]
+PATRONYMIC_BASES = ["Александров", "Сергеев", "Дмитриев", "Андреев", "Алексеев", "Иванов",
+                    "Михайлов", "Николаев", "Владимиров", "Павлов", "Викторов", "Юрьев"]
+
+STATUSES = ["approved"] * 7 + ["pending"] * 2 + ["rejected"]
+
+TELEGRAM_ID_BASE = 100_000_000
+SEED_BATCH = 10_000
+
+
+def fake_user(rng: random.Random, index: int, started: datetime) -> Tuple:
+    """Строка таблицы users для синтетического жильца."""
+    if rng.random() < 0.5:
+        first, surname = rng.choice(MALE_FIRST), rng.choice(SURNAMES)
+        patronymic = rng.choice(PATRONYMIC_BASES) + "ич"
+    else:
+        first, surname = rng.choice(FEMALE_FIRST), rng.choice(SURNAMES) + "а"
+        patronymic = rng.choice(PATRONYMIC_BASES) + "на"
+    # Кадастровый номер: регион:район:квартал:участок
+    plot = f"50:{rng.randrange(10, 40)}:{rng.randrange(10**6, 10**7):07d}:{rng.randrange(1, 5000)}"
+    created = started + timedelta(seconds=index * 30 + rng.randrange(30))
+    return (
+        TELEGRAM_ID_BASE + index,
+        f"user{index}" if rng.random() < 0.7 else None,
+        f"{surname} {first} {patronymic}",
+        f"+79{rng.randrange(10**9):09d}",
+        plot,
+        f"file_{index}",
+        rng.choice(STATUSES),
+        created.strftime("%Y-%m-%d %H:%M:%S"),
+    )
+
+
+def seed(path: str, size: int, rng: random.Random):
+    """Заполнить базу `size` жильцами (синхронно, пачками)."""
+    started = datetime.now() - timedelta(seconds=size * 30)
+    conn = sqlite3.connect(path)
+    try:
+        for offset in range(0, size, SEED_BATCH):
+            rows = [fake_user(rng, i, started) for i in range(offset, min(size, offset + SEED_BATCH))]
+            conn.executemany(
+                "INSERT INTO users (telegram_id, username, full_name, phone, plot_number, "
+                "document_file_id, status, created_at, phone_rev, "
+                "cad_region, cad_district, cad_quarter, cad_parcel) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    row + (database.reverse_phone_digits(row[3]), *database.cadastral_columns(row[4]))
+                    for row in rows
+                ]
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def drop_os_cache(path: str) -> bool:
+    """Вытеснить файл из кеша страниц ОС. Возвращает False, если ОС это не поддерживает."""
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+    return True
+
+
+def sample_queries(path: str, rng: random.Random) -> Dict[str, Any]:
+    """Взять из базы существующие значения, по которым будут искать админы."""
+    conn = sqlite3.connect(path)
+    try:
+        count = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+        row = conn.execute(
+            "SELECT telegram_id, full_name, phone, plot_number FROM users LIMIT 1 OFFSET ?",
+            (rng.randrange(count),)
+        ).fetchone()
+    finally:
+        conn.close()
+    telegram_id, full_name, phone, plot_number = row
+    return {
+        "telegram_id": telegram_id,
+        "surname": full_name.split()[0],
+        "phone_tail": phone[-4:],
+        "plot_number": plot_number,
+        "plot_tail": plot_number.rsplit(":", 1)[-1],
+        "cadastral": database.cadastral_columns(plot_number),
+    }
+
+
+def cases(sample: Dict[str, Any], new_ids: List[int]) -> List[Tuple[str, Callable[[], Awaitable[Any]]]]:
+    """Замеряемые вызовы: имя и фабрика корутины."""
+    new_id = iter(new_ids)
+    return [
+        ("get_user_by_telegram_id", lambda: database.get_user_by_telegram_id(sample["telegram_id"])),
+        ("get_user_by_telegram_id[miss]", lambda: database.get_user_by_telegram_id(1)),
+        ("search_by_plot_number[full]", lambda: database.search_by_plot_number(sample["plot_number"])),
+        ("search_by_plot_number[tail]", lambda: database.search_by_plot_number(sample["plot_tail"])),
+        ("search_by_phone[tail]", lambda: database.search_by_phone(sample["phone_tail"])),
+        ("search_by_phone_suffix[tail]", lambda: database.search_by_phone_suffix(sample["phone_tail"])),
+        ("search_by_cadastral[quarter]", lambda: database.search_by_cadastral(
+            quarter_from=sample["cadastral"][2], quarter_to=sample["cadastral"][2]
+        )),
+        ("search_by_cadastral[district]", lambda: database.search_by_cadastral(
+            region=sample["cadastral"][0], district=sample["cadastral"][1], limit=301
+        )),
+        ("search_by_full_name[surname]", lambda: database.search_by_full_name(sample["surname"])),
+        ("get_statistics", database.get_statistics),
+        ("get_pending_users", database.get_pending_users),
+        ("get_all_users", database.get_all_users),
+        ("create_user", lambda: database.create_user(
+            next(new_id), "bench", "Тестов Тест Тестович", "+79990000000", "50:20:0000000:1", "bench_file"
+        )),
+    ]
+
+
+async def measure(factory: Callable[[], Awaitable[Any]], repeat: int, path: str) -> Dict[str, Any]:
+    """Холодный вызов и медиана повторных."""
+    cold_cache = drop_os_cache(path)
+    started = time.perf_counter()
+    result = await factory()
+    cold = time.perf_counter() - started
+
+    warm = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await factory()
+        warm.append(time.perf_counter() - started)
+    return {
+        "cold_ms": cold * 1000,
+        "warm_ms": statistics.median(warm) * 1000,
+        "warm_min_ms": min(warm) * 1000,
+        "rows": len(result) if isinstance(result, list) else None,
+        "os_cache_dropped": cold_cache,
+    }
+
+
+async def run_size(size: int, args: argparse.Namespace, workdir: str) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    database.DB_NAME = os.path.join(workdir, f"bench_{size}.db")
+    if os.path.exists(database.DB_NAME):
+        os.remove(database.DB_NAME)
+    await database.init_db()
+
+    started = time.perf_counter()
+    seed(database.DB_NAME, size, rng)
+    seed_time = time.perf_counter() - started
+    print(f"\n{size} жильцов: заполнение {seed_time:.1f} с, файл {os.path.getsize(database.DB_NAME) / 2**20:.1f} МБ")
+
+    sample = sample_queries(database.DB_NAME, rng)
+    new_ids = list(range(TELEGRAM_ID_BASE + size, TELEGRAM_ID_BASE + size + args.repeat + 1))
+    results = {}
+    for name, factory in cases(sample, new_ids):
+        # Выгрузка всех строк на больших объемах занимает секунды, хватит пары повторов
+        repeat = min(args.repeat, 2) if name == "get_all_users" and size > 100_000 else args.repeat
+        results[name] = await measure(factory, repeat, database.DB_NAME)
+        stats = results[name]
+        rows = f"{stats['rows']:>8}" if stats["rows"] is not None else " " * 8
+        print(f"  {name:<32}{rows}  cold {stats['cold_ms']:>10.2f} мс  warm {stats['warm_ms']:>10.2f} мс")
+    return {"seed_s": seed_time, "db_bytes": os.path.getsize(database.DB_NAME), "functions": results}
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    sizes = [int(size) for size in args.sizes.split(",")]
+    workdir = args.workdir or tempfile.mkdtemp(prefix="db_bench_")
+    try:
+        return {str(size): await run_size(size, args, workdir) for size in sizes}
+    finally:
+        if not args.workdir:
+            for name in os.listdir(workdir):
+                os.remove(os.path.join(workdir, name))
+            os.rmdir(workdir)
+
+
+def print_comparison(previous: Dict[str, Any], sizes: Dict[str, Any]):
+    print("\nСравнение warm с предыдущим прогоном:")
+    for size, data in sizes.items():
+        old = previous.get("sizes", {}).get(size)
+        if not old:
+            continue
+        print(f"  {size} жильцов")
+        for name, stats in data["functions"].items():
+            change = compare_metric(old["functions"].get(name, {}), stats, "warm_ms")
+            print(f"    {name:<32}{change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк функций database.py")
+    parser.add_argument("--sizes", default="10000,100000", help="Объемы базы через запятую")
+    parser.add_argument("--repeat", type=int, default=5, help="Число повторных (warm) вызовов")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--workdir", help="Каталог для баз (по умолчанию временный, удаляется)")
+    parser.add_argument("--output", help="Файл для результата (по умолчанию benchmarks/results/)")
+    parser.add_argument("--compare", help="JSON предыдущего прогона для сравнения")
+    args = parser.parse_args()
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+
+    sizes = asyncio.run(run(args))
+    if previous:
+        print_comparison(previous, sizes)
+    params = {"sizes": args.sizes, "repeat": args.repeat, "seed": args.seed}
+    path = save_result("db_bench", {"params": params, "sizes": sizes}, args.output)
+    print(f"\nРезультат сохранен в {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Сравнение поиска через индекс в памяти (registry_index) с LIKE-поиском SQLite.
+
+База заполняется так же, как в db_bench. Для каждого запроса замеряется
+медиана повторных вызовов:
+
+- sql — database.search_by_* (LIKE по таблице и словарь на каждую строку);
+- index — поиск id в индексе и чтение найденных строк по первичному ключу;
+- index_ids — только поиск id в индексе.
+
+Отдельно замеряется нечеткий поиск по ФИО (fuzzy.NameMatcher) по фамилии
+с опечаткой и по ФИО латиницей.
+
+Перед замерами результаты индекса сверяются с SQL: расхождение считается ошибкой.
+
+    python -m benchmarks.index_bench
+    python -m benchmarks.index_bench --sizes 10000,100000,1000000 --queries 20
+    python -m benchmarks.index_bench --compare benchmarks/results/index_bench_....json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import setup_env, save_result, compare_metric
+
+setup_env()
+
+import database
+from benchmarks.db_bench import seed, sample_queries
+from fuzzy import NameMatcher, TRANSLIT
+from registry_index import RegistryIndex
+
+SQL_SEARCHES = {
+    "plot": database.search_by_plot_number,
+    "phone": database.search_by_phone,
+    "name": database.search_by_full_name,
+}
+
+
+def build_queries(path: str, rng: random.Random, count: int) -> List[Tuple[str, str, str]]:
+    """(название, вид поиска, запрос) для `count` случайных жильцов."""
+    queries = []
+    for _ in range(count):
+        sample = sample_queries(path, rng)
+        queries += [
+            ("plot[full]", "plot", sample["plot_number"]),
+            ("plot[tail]", "plot", sample["plot_tail"]),
+            ("phone[tail]", "phone", sample["phone_tail"]),
+            ("name[surname]", "name", sample["surname"]),
+            ("name[surname lower]", "name", sample["surname"].lower()),
+        ]
+    return queries
+
+
+async def median_ms(factory: Callable[[], Awaitable[Any]], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await factory()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+async def index_path(index: RegistryIndex, kind: str, query: str) -> list:
+    """Путь поиска бота при включенном индексе: id из индекса, строки по первичному ключу."""
+    return await database.get_users_by_ids(await index.search(kind, query))
+
+
+async def run_size(size: int, args: argparse.Namespace, workdir: str) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    database.DB_NAME = os.path.join(workdir, f"index_bench_{size}.db")
+    if os.path.exists(database.DB_NAME):
+        os.remove(database.DB_NAME)
+    await database.init_db()
+    seed(database.DB_NAME, size, rng)
+
+    index = RegistryIndex()
+    started = time.perf_counter()
+    await index.load()
+    load_time = time.perf_counter() - started
+    # Память меряется на отдельной загрузке: tracemalloc сильно замедляет выделения
+    tracemalloc.start()
+    measured = RegistryIndex()
+    await measured.load()
+    # Колонки склеиваются при первом поиске
+    await measured.search("name", "-")
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del measured
+    print(f"\n{size} жильцов: загрузка индекса {load_time:.2f} с, память {memory / 2**20:.1f} МБ")
+
+    queries = build_queries(database.DB_NAME, rng, args.queries)
+    mismatches = 0
+    timings: Dict[str, Dict[str, List[float]]] = {}
+    for name, kind, query in queries:
+        expected = sorted(user["id"] for user in await SQL_SEARCHES[kind](query))
+        ids = await index.search(kind, query)
+        if sorted(ids) != expected:
+            mismatches += 1
+            print(f"  расхождение: {name} '{query}': sql {len(expected)}, индекс {len(ids)}")
+
+        stats = timings.setdefault(name, {"sql": [], "index": [], "index_ids": [], "rows": []})
+        stats["rows"].append(len(expected))
+        stats["sql"].append(await median_ms(lambda: SQL_SEARCHES[kind](query), args.repeat))
+        stats["index"].append(await median_ms(lambda: index_path(index, kind, query), args.repeat))
+        stats["index_ids"].append(await median_ms(lambda: index.search(kind, query), args.repeat))
+
+    results = {}
+    print(f"  {'запрос':<22}{'строк':>8}{'sql, мс':>12}{'index, мс':>12}{'ids, мс':>10}{'ускорение':>11}")
+    for name, stats in timings.items():
+        result = {key: statistics.median(values) for key, values in stats.items()}
+        results[name] = result
+        speedup = result["sql"] / result["index"] if result["index"] else 0
+        print(
+            f"  {name:<22}{result['rows']:>8.0f}{result['sql']:>12.3f}{result['index']:>12.3f}"
+            f"{result['index_ids']:>10.3f}{speedup:>10.1f}x"
+        )
+    fuzzy = await run_fuzzy(queries, args.repeat)
+    return {
+        "load_s": load_time, "memory_bytes": memory, "mismatches": mismatches,
+        "queries": results, "fuzzy": fuzzy,
+    }
+
+
+def typo(word: str) -> str:
+    """Слово с заменой одной гласной в середине."""
+    vowels = "аоеиуы"
+    for i in range(len(word) // 2, len(word)):
+        if word[i] in vowels:
+            return word[:i] + vowels[(vowels.index(word[i]) + 1) % len(vowels)] + word[i + 1:]
+    return word + "а"
+
+
+# Латиница не по той же таблице, что в fuzzy.py: так пишут жильцы
+LATIN_SPELLING = str.maketrans({**TRANSLIT, "й": "i", "х": "h", "ё": "yo", "ы": "i"})
+
+
+def to_latin(full_name: str) -> str:
+    return full_name.lower().translate(LATIN_SPELLING).title()
+
+
+async def run_fuzzy(queries: List[Tuple[str, str, str]], repeat: int) -> Dict[str, Any]:
+    matcher = NameMatcher()
+    started = time.perf_counter()
+    await matcher.sync()
+    load_time = time.perf_counter() - started
+
+    surnames = [query for name, _, query in queries if name == "name[surname]"]
+    cases = {
+        "fuzzy[typo]": [typo(surname) for surname in surnames],
+        "fuzzy[latin]": [to_latin(surname) for surname in surnames],
+    }
+    results = {"load_s": load_time}
+    print(f"  нечеткий поиск: загрузка {load_time:.2f} с")
+    for name, values in cases.items():
+        timings, found = [], []
+        for value in values:
+            timings.append(await median_ms(lambda: matcher.search(value), repeat))
+            found.append(len(await matcher.search(value)))
+        results[name] = {"ms": statistics.median(timings), "found": statistics.median(found)}
+        print(f"  {name:<22}{results[name]['found']:>8.0f}{results[name]['ms']:>12.3f} мс  (пример: {values[0]})")
+    return results
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    sizes = [int(size) for size in args.sizes.split(",")]
+    workdir = args.workdir or tempfile.mkdtemp(prefix="index_bench_")
+    try:
+        return {str(size): await run_size(size, args, workdir) for size in sizes}
+    finally:
+        if not args.workdir:
+            for name in os.listdir(workdir):
+                os.remove(os.path.join(workdir, name))
+            os.rmdir(workdir)
+
+
+def print_comparison(previous: Dict[str, Any], sizes: Dict[str, Any]):
+    print("\nСравнение index с предыдущим прогоном:")
+    for size, data in sizes.items():
+        old = previous.get("sizes", {}).get(size)
+        if not old:
+            continue
+        print(f"  {size} жильцов")
+        for name, stats in data["queries"].items():
+            change = compare_metric(old["queries"].get(name, {}), stats, "index")
+            print(f"    {name:<22}{change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Индекс реестра в памяти против LIKE-поиска SQLite")
+    parser.add_argument("--sizes", default="10000,100000", help="Объемы базы через запятую")
+    parser.add_argument("--queries", type=int, default=10, help="Сколько жильцов взять для запросов")
+    parser.add_argument("--repeat", type=int, default=5, help="Повторов каждого запроса")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--workdir", help="Каталог для баз (по умолчанию временный, удаляется)")
+    parser.add_argument("--output", help="Файл для результата (по умолчанию benchmarks/results/)")
+    parser.add_argument("--compare", help="JSON предыдущего прогона для сравнения")
+    args = parser.parse_args()
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+
+    sizes = asyncio.run(run(args))
+    if previous:
+        print_comparison(previous, sizes)
+    params = {"sizes": args.sizes, "queries": args.queries, "repeat": args.repeat, "seed": args.seed}
+    path = save_result("index_bench", {"params": params, "sizes": sizes}, args.output)
+    print(f"\nРезультат сохранен в {path}")
+
+
+if __name__ == "__main__":
+    main()
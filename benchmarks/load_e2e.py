@@ -0,0 +1,355 @@
+"""
+Сквозной нагрузочный тест: апдейты проходят через настоящий Dispatcher и роутеры.
+
+N жильцов одновременно проходят регистрацию (/start → ФИО → контакт → участок →
+документ), а админы в это время одобряют заявки и ищут по участку и ФИО.
+Bot API подменен MockSession, база создается во временном файле.
+
+Результат — пропускная способность, p50/p95/p99 по каждому шагу и время
+в базе данных с оценкой ожидания блокировок SQLite. Он сохраняется в JSON
+(с хешем коммита), чтобы прогоны можно было сравнивать между коммитами:
+
+    python -m benchmarks.load_e2e --residents 200 --admins 3
+    python -m benchmarks.load_e2e --compare benchmarks/results/load_e2e_....json
+"""
+import argparse
+import asyncio
+import datetime
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import setup_env, summarize, save_result, compare_metric
+
+setup_env()
+
+from aiogram.types import (
+    CallbackQuery, Chat, Contact, Document, Message, PhotoSize, Update, User
+)
+
+import database
+from callbacks import ModerationCallback, CALLBACK_VERSION
+from config import set_admin_ids
+from main import create_dispatcher
+from tracing import Span, Tracer
+from benchmarks.mock_bot import create_mock_bot
+
+FIRST_NAMES = ["Иван", "Петр", "Анна", "Мария", "Сергей", "Ольга", "Алексей", "Елена"]
+LAST_NAMES = ["Иванов", "Петров", "Сидоров", "Кузнецов", "Смирнов", "Попов", "Лебедев"]
+PATRONYMICS = ["Иванович", "Петрович", "Сергеевич", "Алексеевич", "Андреевич"]
+
+# Функции database.py, которые пишут в базу: только они ждут блокировку SQLite
+WRITE_FUNCTIONS = {"create_user", "update_user_status", "add_admin", "remove_admin", "init_db"}
+
+RESIDENT_ID_BASE = 100_000_000
+ADMIN_ID_BASE = 900_000_000
+
+
+class CollectingTracer(Tracer):
+    """Трассировщик, который складывает все трассы в память вместо журнала."""
+
+    def __init__(self):
+        super().__init__(slow_threshold=0.0)
+        self.roots: List[Span] = []
+
+    def _write(self, root: Span):
+        self.roots.append(root)
+
+
+class UpdateFactory:
+    """Сборка апдейтов от имени жильцов и админов."""
+
+    def __init__(self):
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+
+    def _user(self, user_id: int) -> User:
+        return User(id=user_id, is_bot=False, first_name=f"u{user_id}", username=f"user{user_id}")
+
+    def message(self, user_id: int, text: Optional[str] = None, **fields: Any) -> Update:
+        message = Message(
+            message_id=next(self._message_ids),
+            date=datetime.datetime.now(),
+            chat=Chat(id=user_id, type="private"),
+            from_user=self._user(user_id),
+            text=text,
+            **fields,
+        )
+        return Update(update_id=next(self._update_ids), message=message)
+
+    def contact(self, user_id: int, phone: str) -> Update:
+        return self.message(
+            user_id,
+            contact=Contact(phone_number=phone, first_name=f"u{user_id}", user_id=user_id)
+        )
+
+    def photo(self, user_id: int) -> Update:
+        return self.message(
+            user_id,
+            photo=[PhotoSize(
+                file_id=f"photo_{user_id}", file_unique_id=f"uphoto_{user_id}",
+                width=1280, height=960, file_size=200_000
+            )]
+        )
+
+    def document(self, user_id: int) -> Update:
+        return self.message(
+            user_id,
+            document=Document(
+                file_id=f"doc_{user_id}", file_unique_id=f"udoc_{user_id}",
+                file_name="egrn.pdf", file_size=300_000
+            )
+        )
+
+    def callback(self, user_id: int, data: str) -> Update:
+        callback = CallbackQuery(
+            id=str(next(self._update_ids)),
+            from_user=self._user(user_id),
+            chat_instance="bench",
+            data=data,
+            message=Message(
+                message_id=next(self._message_ids),
+                date=datetime.datetime.now(),
+                chat=Chat(id=user_id, type="private"),
+                text="Новая заявка"
+            ),
+        )
+        return Update(update_id=next(self._update_ids), callback_query=callback)
+
+
+class LoadTest:
+    """Один прогон нагрузочного теста."""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.tracer = CollectingTracer()
+        self.dp = create_dispatcher(self.tracer)
+        self.bot = create_mock_bot(latency=args.api_latency)
+        self.factory = UpdateFactory()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.pending: asyncio.Queue = asyncio.Queue()
+        self.plots: List[str] = []
+        self.names: List[str] = []
+        self.registered = 0
+        self.db_errors: Dict[str, int] = defaultdict(int)
+        self.residents_done = asyncio.Event()
+
+    async def feed(self, step: str, update: Update):
+        """Прогнать апдейт через диспетчер и записать время шага."""
+        started = time.perf_counter()
+        await self.dp.feed_update(self.bot, update)
+        self.latencies[step].append(time.perf_counter() - started)
+
+    async def think(self):
+        if self.args.think_time:
+            await asyncio.sleep(self.rng.uniform(0, 2 * self.args.think_time))
+
+    async def resident(self, index: int):
+        """Полный сценарий регистрации одного жильца."""
+        user_id = RESIDENT_ID_BASE + index
+        full_name = f"{self.rng.choice(LAST_NAMES)} {self.rng.choice(FIRST_NAMES)} {self.rng.choice(PATRONYMICS)}"
+        phone = f"+79{self.rng.randrange(10**9):09d}"
+        plot = f"50:21:0{self.rng.randrange(10, 99)}0{self.rng.randrange(100, 999)}:{index + 1}"
+        upload = self.factory.photo if index % 2 else self.factory.document
+
+        await self.feed("start", self.factory.message(user_id, "/start"))
+        await self.think()
+        await self.feed("full_name", self.factory.message(user_id, full_name))
+        await self.think()
+        await self.feed("phone", self.factory.contact(user_id, phone))
+        await self.think()
+        await self.feed("plot", self.factory.message(user_id, plot))
+        await self.think()
+        await self.feed("document", upload(user_id))
+
+        self.registered += 1
+        self.names.append(full_name.split()[0])
+        self.plots.append(plot)
+        await self.pending.put(user_id)
+
+    async def admin(self, admin_id: int):
+        """Админ одобряет заявки из очереди и между ними ищет по базе."""
+        while not (self.residents_done.is_set() and self.pending.empty()):
+            try:
+                telegram_id = await asyncio.wait_for(self.pending.get(), timeout=0.05)
+            except asyncio.TimeoutError:
+                telegram_id = None
+
+            if telegram_id is not None:
+                data = ModerationCallback(action="approve", telegram_id=telegram_id, v=CALLBACK_VERSION).pack()
+                await self.feed("approve", self.factory.callback(admin_id, data))
+
+            if self.plots and self.rng.random() < self.args.search_ratio:
+                if self.rng.random() < 0.5:
+                    query = self.rng.choice(self.plots).rsplit(":", 1)[-1]
+                    await self.feed("search_plot", self.factory.message(admin_id, f"/search_plot {query}"))
+                else:
+                    query = self.rng.choice(self.names)
+                    await self.feed("search_name", self.factory.message(admin_id, f"/search_name {query}"))
+
+    async def run(self) -> Dict[str, Any]:
+        admin_ids = [ADMIN_ID_BASE + i for i in range(self.args.admins)]
+        set_admin_ids(admin_ids)
+        await database.init_db()
+
+        # Прогрев: один жилец без конкуренции дает базовое время запросов к базе
+        await self.resident(self.args.residents)
+        await self.pending.get()
+        baseline = self._db_durations()
+        self.tracer.roots.clear()
+        self.latencies.clear()
+        self.names.clear()
+        self.plots.clear()
+        self.registered = 0
+        self.db_errors.clear()
+
+        started = time.perf_counter()
+        admins = [asyncio.create_task(self.admin(admin_id)) for admin_id in admin_ids]
+        semaphore = asyncio.Semaphore(self.args.concurrency or self.args.residents)
+
+        async def limited(index: int):
+            async with semaphore:
+                await self.resident(index)
+
+        await asyncio.gather(*(limited(i) for i in range(self.args.residents)))
+        self.residents_done.set()
+        await asyncio.gather(*admins)
+        elapsed = time.perf_counter() - started
+
+        return self._report(elapsed, baseline)
+
+    def _db_durations(self) -> Dict[str, List[float]]:
+        """Длительности вызовов database.py по трассам, сгруппированные по функции."""
+        durations: Dict[str, List[float]] = defaultdict(list)
+
+        def walk(node: Span):
+            if node.name.startswith("db."):
+                durations[node.name[3:]].append(node.duration)
+                if node.error:
+                    self.db_errors[node.name[3:]] += 1
+            for child in node.children:
+                walk(child)
+
+        for root in self.tracer.roots:
+            walk(root)
+        return durations
+
+    def _report(self, elapsed: float, baseline: Dict[str, List[float]]) -> Dict[str, Any]:
+        total_updates = sum(len(values) for values in self.latencies.values())
+        db = self._db_durations()
+
+        # Ожидание блокировки оцениваем как превышение над временем того же запроса
+        # без конкуренции: сам SQLite время ожидания блокировки не сообщает
+        db_report = {}
+        lock_wait = 0.0
+        for name, values in sorted(db.items()):
+            base = sorted(baseline.get(name) or values)[len(baseline.get(name) or values) // 2]
+            stats = summarize(values)
+            stats["total_s"] = sum(values)
+            stats["baseline_ms"] = base * 1000
+            stats["errors"] = self.db_errors.get(name, 0)
+            if name in WRITE_FUNCTIONS:
+                excess = sum(max(0.0, value - base) for value in values)
+                stats["lock_wait_estimate_s"] = excess
+                lock_wait += excess
+            db_report[name] = stats
+
+        handler_time = sum(root.duration for root in self.tracer.roots)
+        db_time = sum(sum(values) for values in db.values())
+        return {
+            "params": vars(self.args),
+            "elapsed_s": elapsed,
+            "updates": total_updates,
+            "throughput_updates_per_s": total_updates / elapsed if elapsed else 0.0,
+            "registrations": self.registered,
+            "registrations_per_s": (self.registered) / elapsed if elapsed else 0.0,
+            "api_requests": self.bot.session.requests,
+            "steps": {step: summarize(values) for step, values in self.latencies.items()},
+            "db": db_report,
+            "db_time_s": db_time,
+            "db_time_share": db_time / handler_time if handler_time else 0.0,
+            "db_lock_wait_estimate_s": lock_wait,
+            "db_errors": sum(self.db_errors.values()),
+            "concurrency": self.dp["concurrency"].stats(),
+        }
+
+
+def print_report(result: Dict[str, Any], previous: Optional[Dict[str, Any]] = None):
+    print(
+        f"{result['updates']} апдейтов за {result['elapsed_s']:.2f} с: "
+        f"{result['throughput_updates_per_s']:.0f} апдейтов/с, "
+        f"{result['registrations_per_s']:.1f} регистраций/с"
+    )
+    header = f"{'шаг':<14}{'кол-во':>8}{'p50, мс':>10}{'p95, мс':>10}{'p99, мс':>10}"
+    if previous:
+        header += "   p95 было -> стало"
+    print(header)
+    for step, stats in result["steps"].items():
+        line = (
+            f"{step:<14}{stats['count']:>8}{stats['p50_ms']:>10.2f}"
+            f"{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+        )
+        if previous:
+            line += "   " + compare_metric(previous["steps"].get(step, {}), stats)
+        print(line)
+    print(
+        f"База: {result['db_time_s']:.2f} с ({result['db_time_share']:.0%} времени обработки), "
+        f"оценка ожидания блокировок {result['db_lock_wait_estimate_s']:.2f} с, "
+        f"ошибок {result['db_errors']}"
+    )
+    for name, stats in result["db"].items():
+        print(
+            f"  {name:<26}{stats['count']:>7}  p50 {stats['p50_ms']:.2f} мс  "
+            f"p95 {stats['p95_ms']:.2f} мс  ошибок {stats['errors']}"
+        )
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_NAME = os.path.join(tmp, "load.db")
+        return await LoadTest(args).run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сквозной нагрузочный тест бота")
+    parser.add_argument("--residents", type=int, default=100, help="Число регистрирующихся жильцов")
+    parser.add_argument("--admins", type=int, default=2, help="Число админов")
+    parser.add_argument("--concurrency", type=int, default=0,
+                        help="Сколько жильцов регистрируется одновременно (0 - все сразу)")
+    parser.add_argument("--think-time", type=float, default=0.0,
+                        help="Средняя пауза жильца между шагами, с")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="Задержка ответа Bot API, с")
+    parser.add_argument("--search-ratio", type=float, default=0.5,
+                        help="Вероятность поиска на каждой итерации админа")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Файл для результата (по умолчанию benchmarks/results/)")
+    parser.add_argument("--compare", help="JSON предыдущего прогона для сравнения")
+    args = parser.parse_args()
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+    output = args.output
+    del args.compare, args.output
+
+    # Хендлеры пишут в лог каждый шаг, оставляем только ошибки
+    logging.basicConfig(level=logging.ERROR, format="%(levelname)s %(name)s: %(message)s")
+    result = asyncio.run(run(args))
+    print_report(result, previous)
+    path = save_result("load_e2e", result, output)
+    print(f"Результат сохранен в {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Бот с подменной сессией: запросы к Bot API не уходят в сеть."""
+import asyncio
+import datetime
+import itertools
+from typing import Any, List, Optional
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import TelegramMethod
+from aiogram.types import Chat, ChatInviteLink, File, Message, User
+
+BOT_USER = User(id=42, is_bot=True, first_name="Вахтер", username="test_vahter_bot")
+MOCK_TOKEN = "42:MOCK-TOKEN"
+
+
+class MockSession(BaseSession):
+    """
+    Сессия, которая отвечает на методы Bot API правдоподобными объектами.
+
+    `latency` имитирует задержку сети, все вызванные методы сохраняются в `calls`,
+    если `record_calls` включен.
+    """
+
+    def __init__(self, latency: float = 0.0, record_calls: bool = False):
+        super().__init__()
+        self.latency = latency
+        self.record_calls = record_calls
+        self.calls: List[TelegramMethod] = []
+        self.requests = 0
+        self._message_ids = itertools.count(1)
+
+    def _make_message(self, method: TelegramMethod) -> Message:
+        chat_id = getattr(method, "chat_id", None)
+        return Message(
+            message_id=next(self._message_ids),
+            date=datetime.datetime.now(),
+            chat=Chat(id=chat_id if isinstance(chat_id, int) else 0, type="private"),
+            from_user=BOT_USER,
+            text=getattr(method, "text", None),
+        )
+
+    def _make_response(self, method: TelegramMethod) -> Any:
+        returning = method.__returning__
+        if returning is Message or "Message" in str(returning):
+            return self._make_message(method)
+        if returning is User:
+            return BOT_USER
+        if returning is ChatInviteLink:
+            return ChatInviteLink(
+                invite_link=f"https://t.me/+mock{self.requests}",
+                creator=BOT_USER,
+                creates_join_request=False,
+                is_primary=False,
+                is_revoked=False,
+            )
+        if returning is File:
+            return File(
+                file_id=method.file_id,
+                file_unique_id=f"unique_{method.file_id}",
+                file_path=f"documents/{method.file_id}",
+                file_size=1024,
+            )
+        return True
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: Optional[int] = None) -> Any:
+        self.requests += 1
+        if self.record_calls:
+            self.calls.append(method)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._make_response(method)
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        yield f"mock file {url}".encode()
+
+    async def close(self):
+        pass
+
+
+def create_mock_bot(latency: float = 0.0, record_calls: bool = False) -> Bot:
+    """Создать бота с MockSession."""
+    return Bot(MOCK_TOKEN, session=MockSession(latency=latency, record_calls=record_calls))
@@ -0,0 +1,114 @@
+"""
+Микробенчмарк маршрутизации: цепочка lambda-фильтров против таблицы диспетчеризации.
+
+Запуск:
+    python -m benchmarks.routing_bench [--updates 2000]
+
+Для каждого числа хендлеров N строятся два роутера:
+- legacy: N callback-хендлеров `lambda c: c.data.startswith(...)` и N message-хендлеров
+  `lambda m: m.text == ...` (как было в admin.py и admin_menu.py);
+- table: один хендлер на CallbackData-фабрику и один на `F.text.in_(...)`
+  с поиском действия по словарю.
+Апдейты адресованы последнему хендлеру (худший случай для цепочки фильтров).
+"""
+import argparse
+import asyncio
+import datetime
+import time
+
+from aiogram import Dispatcher, F, Router
+from aiogram.types import CallbackQuery, Chat, Message, Update, User
+
+from benchmarks.mock_bot import create_mock_bot
+from callbacks import ModerationCallback
+
+HANDLER_COUNTS = (4, 16, 64, 256)
+USER = User(id=1, is_bot=False, first_name="Админ")
+
+
+def _noop_handler():
+    async def handler(event):
+        return True
+    return handler
+
+
+def build_legacy_router(n: int) -> Router:
+    router = Router()
+    for i in range(n):
+        router.callback_query.register(_noop_handler(), lambda c, i=i: c.data.startswith(f"action{i}_"))
+        router.message.register(_noop_handler(), lambda m, i=i: m.text == f"Кнопка {i}")
+    return router
+
+
+def build_table_router(n: int) -> Router:
+    router = Router()
+    actions = {f"action{i}": _noop_handler() for i in range(n)}
+    buttons = {f"Кнопка {i}": _noop_handler() for i in range(n)}
+
+    @router.callback_query(ModerationCallback.filter())
+    async def on_callback(callback: CallbackQuery, callback_data: ModerationCallback):
+        return await actions[callback_data.action](callback)
+
+    @router.message(F.text.in_(buttons))
+    async def on_button(message: Message):
+        return await buttons[message.text](message)
+
+    return router
+
+
+def make_updates(n: int, count: int, table: bool):
+    last = n - 1
+    callback_data = (
+        ModerationCallback(action=f"action{last}", telegram_id=123).pack()
+        if table else f"action{last}_123"
+    )
+    message = Message(
+        message_id=1,
+        date=datetime.datetime.now(),
+        chat=Chat(id=USER.id, type="private"),
+        from_user=USER,
+        text=f"Кнопка {last}",
+    )
+    updates = []
+    for i in range(count):
+        if i % 2:
+            updates.append(Update(update_id=i, message=message))
+        else:
+            updates.append(Update(
+                update_id=i,
+                callback_query=CallbackQuery(id=str(i), from_user=USER, chat_instance="c", data=callback_data),
+            ))
+    return updates
+
+
+async def measure(router: Router, updates) -> float:
+    """Среднее время маршрутизации одного апдейта в микросекундах."""
+    dp = Dispatcher()
+    dp.include_router(router)
+    bot = create_mock_bot()
+    # Прогрев
+    for update in updates[:50]:
+        await dp.feed_update(bot, update)
+    started = time.perf_counter()
+    for update in updates:
+        await dp.feed_update(bot, update)
+    return (time.perf_counter() - started) / len(updates) * 1_000_000
+
+
+async def run(count: int):
+    print(f"{'хендлеров':>10} {'legacy, мкс':>12} {'table, мкс':>12}")
+    for n in HANDLER_COUNTS:
+        legacy = await measure(build_legacy_router(n), make_updates(n, count, table=False))
+        table = await measure(build_table_router(n), make_updates(n, count, table=True))
+        print(f"{n:>10} {legacy:>12.1f} {table:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк маршрутизации апдейтов")
+    parser.add_argument("--updates", type=int, default=2000, help="апдейтов на замер")
+    args = parser.parse_args()
+    asyncio.run(run(args.updates))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Фабрики callback-данных для inline-кнопок."""
+from typing import Optional
+
+from aiogram.filters.callback_data import CallbackData
+
+# Версия формата callback-данных. При несовместимом изменении полей версию нужно
+# увеличить, а обработку кнопок старого формата оставить в parse_* функциях.
+CALLBACK_VERSION = 1
+
+
+class ModerationCallback(CallbackData, prefix="mod"):
+    """Кнопки модерации заявки: mod:<action>:<telegram_id>:<v>."""
+    action: str
+    telegram_id: int
+    v: int = CALLBACK_VERSION
+
+
+def parse_legacy_moderation(data: Optional[str]) -> Optional[ModerationCallback]:
+    """
+    Разобрать кнопки старого формата `approve_<id>` / `reject_<id>`.
+
+    Такие кнопки остаются в уже отправленных админам сообщениях.
+    """
+    if not data:
+        return None
+    action, sep, telegram_id = data.partition("_")
+    if not sep or action not in ("approve", "reject") or not telegram_id.isdigit():
+        return None
+    return ModerationCallback(action=action, telegram_id=int(telegram_id), v=0)
+
+
+class DigestCallback(CallbackData, prefix="dg"):
+    """
+    Кнопки сводки заявок: dg:<action>:<digest_id>:<telegram_id>:<v>.
+
+    action: approve, reject, doc (документ заявки) или approve_all (все
+    нерассмотренные заявки сводки, telegram_id не используется).
+    """
+    action: str
+    digest_id: int
+    telegram_id: int = 0
+    v: int = CALLBACK_VERSION
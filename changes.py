@@ -0,0 +1,127 @@
+"""Чтение журнала изменений пользователей (таблица user_changes)."""
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from database import (
+    generation_event, get_user_changes, get_last_change_seq, get_change_cursor, save_change_cursor,
+    purge_user_changes
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeFeed:
+    """
+    Потребитель журнала изменений users.
+
+    Записи читаются по возрастанию seq пачками по `batch_size`, каждая
+    выборка идет по первичному ключу журнала, без повторного просмотра
+    таблицы. Записи этого процесса замечаются сразу (по событию поколения
+    данных database.py), записи других процессов - при опросе раз в `poll_interval`.
+
+    Если задано имя потребителя, его позиция хранится в базе: после
+    перезапуска чтение продолжается с последней подтвержденной пачки.
+    """
+
+    def __init__(
+        self,
+        consumer: Optional[str] = None,
+        after_seq: Optional[int] = None,
+        from_end: bool = False,
+        batch_size: int = 500,
+        poll_interval: float = 1.0
+    ):
+        self.consumer = consumer
+        self.seq = after_seq
+        self.from_end = from_end
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._committed: Optional[int] = None
+
+    async def _start_position(self) -> int:
+        if self.consumer:
+            saved = await get_change_cursor(self.consumer)
+            if saved is not None:
+                return saved
+        if self.from_end:
+            return await get_last_change_seq()
+        return 0
+
+    async def fetch(self) -> List[Dict[str, Any]]:
+        """Следующая пачка изменений (пустой список - новых нет)."""
+        if self.seq is None:
+            self.seq = await self._start_position()
+            self._committed = self.seq
+        changes = await get_user_changes(self.seq, self.batch_size)
+        if changes:
+            self.seq = changes[-1]["seq"]
+        return changes
+
+    async def commit(self):
+        """Сохранить позицию потребителя (только для именованных)."""
+        if self.consumer and self.seq is not None and self.seq != self._committed:
+            await save_change_cursor(self.consumer, self.seq)
+            self._committed = self.seq
+
+    async def _wait(self, changed: asyncio.Event):
+        """Ждать записи в этом процессе (события `changed`), но не дольше poll_interval."""
+        try:
+            await asyncio.wait_for(changed.wait(), timeout=self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+
+    async def tail(self) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Бесконечно выдавать новые пачки изменений.
+
+        Позиция сохраняется, когда потребитель запрашивает следующую пачку,
+        то есть после обработки предыдущей: при сбое пачка будет прочитана
+        повторно, но не потеряна.
+        """
+        while True:
+            # Событие берется до выборки: запись во время выборки не будет пропущена
+            changed = generation_event()
+            changes = await self.fetch()
+            if changes:
+                yield changes
+                await self.commit()
+                if len(changes) == self.batch_size:
+                    continue
+            await self._wait(changed)
+
+
+class ChangeLogCleaner:
+    """
+    Периодическая очистка журнала изменений.
+
+    Раз в `interval` секунд удаляются записи, которые прочитали все
+    именованные потребители, и записи старше `retention_days` дней, чтобы
+    журнал, который ведут триггеры, не рос без ограничений.
+    """
+
+    def __init__(self, interval: float, retention_days: int):
+        self.interval = interval
+        self.retention_days = retention_days
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Запустить очистку в текущем event loop."""
+        self._task = asyncio.create_task(self._run(), name="change-log-cleaner")
+
+    async def stop(self):
+        """Остановить очистку."""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                deleted = await purge_user_changes(self.retention_days)
+                if deleted:
+                    logger.info(f"Из журнала изменений удалено записей: {deleted}")
+            except Exception as e:
+                logger.error(f"Ошибка при очистке журнала изменений: {e}", exc_info=True)
+            await asyncio.sleep(self.interval)
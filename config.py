@@ -32,9 +32,87 @@ except ValueError:
     # Если не число, значит это username группы (например, @mygroup)
     GROUP_ID = GROUP_ID_STR
 
+# Адрес Bot API (например, локальный фейковый сервер tools/fake_telegram.py для нагрузочных тестов)
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "")
+
+# Максимальное число одновременно выполняемых обработчиков
+MAX_CONCURRENT_UPDATES = int(os.getenv("MAX_CONCURRENT_UPDATES", "50"))
+
+# Длина очереди, после которой малоценные апдейты (повторный /start) отбрасываются
+SHED_QUEUE_THRESHOLD = int(os.getenv("SHED_QUEUE_THRESHOLD", "100"))
+
+# HTTP-эндпоинт с метриками Prometheus (0 - выключен)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# Апдейты дольше порога (секунды) сохраняются с разбивкой по времени в TRACE_FILE
+TRACE_SLOW_THRESHOLD = float(os.getenv("TRACE_SLOW_THRESHOLD", "2.0"))
+TRACE_FILE = os.getenv("TRACE_FILE", "slow_updates.jsonl")
+
+# Контроль задержки event loop: интервал измерения и порог блокировки (секунды)
+LOOP_WATCHDOG_INTERVAL = float(os.getenv("LOOP_WATCHDOG_INTERVAL", "0.5"))
+LOOP_BLOCK_THRESHOLD = float(os.getenv("LOOP_BLOCK_THRESHOLD", "1.0"))
+
+# Запись входящих апдейтов для воспроизведения (gzip JSONL, пусто - выключена).
+# Персональные данные хешируются с солью RECORD_SALT, без нее соль случайная на каждый запуск
+RECORD_UPDATES_FILE = os.getenv("RECORD_UPDATES_FILE", "")
+RECORD_SALT = os.getenv("RECORD_SALT", "")
+
+# Локальный кеш документов заявок (пусто - выключен) и его предельный размер в байтах
+DOCUMENT_CACHE_DIR = os.getenv("DOCUMENT_CACHE_DIR", "")
+DOCUMENT_CACHE_MAX_BYTES = int(os.getenv("DOCUMENT_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+# Сколько последних поисковых запросов админов хранится в кеше результатов
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "256"))
+# Индекс реестра в памяти: поиск админов без запросов LIKE к SQLite (1 - включен)
+REGISTRY_INDEX = os.getenv("REGISTRY_INDEX", "0") == "1"
+
+# Сводка заявок для админов (включается каждым админом командой /digest):
+# как часто проверяется очередь (секунды), заявок в сводке по умолчанию
+# и сколько дней работают кнопки отправленной сводки
+DIGEST_CHECK_INTERVAL = float(os.getenv("DIGEST_CHECK_INTERVAL", "30"))
+DIGEST_MAX_ITEMS = int(os.getenv("DIGEST_MAX_ITEMS", "10"))
+DIGEST_RETENTION_DAYS = int(os.getenv("DIGEST_RETENTION_DAYS", "7"))
+
+# Журнал изменений пользователей: как часто чистить (секунды) и сколько дней
+# хранить записи, которые еще не прочитал какой-то из потребителей
+CHANGES_PURGE_INTERVAL = float(os.getenv("CHANGES_PURGE_INTERVAL", "3600"))
+CHANGES_RETENTION_DAYS = int(os.getenv("CHANGES_RETENTION_DAYS", "30"))
+
+# Логирование
+LOG_FILE = os.getenv("LOG_FILE", "bot.log")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Уровни отдельных модулей: "aiogram=WARNING,handlers.registration=DEBUG"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT_JSON = os.getenv("LOG_FORMAT", "text").lower() == "json"
+# Ротация по размеру (LOG_MAX_BYTES) или по времени, если указан LOG_ROTATE_WHEN (например, midnight)
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+LOG_ROTATE_WHEN = os.getenv("LOG_ROTATE_WHEN", "")
+
+
+# Текущий набор админов: админы из .env и добавленные через бота (хранятся в БД)
+_admin_set = frozenset(ADMIN_IDS)
+
 
 def is_admin(user_id: int) -> bool:
     """Проверить, является ли пользователь админом."""
-    return user_id in ADMIN_IDS
+    return user_id in _admin_set
+
+
+def get_admin_ids() -> frozenset:
+    """Получить текущий набор ID админов."""
+    return _admin_set
+
+
+def set_admin_ids(admin_ids) -> frozenset:
+    """
+    Заменить набор админов без перезапуска бота.
+    
+    Админы из .env остаются всегда, чтобы нельзя было потерять доступ к боту.
+    """
+    global _admin_set
+    _admin_set = frozenset(ADMIN_IDS) | frozenset(admin_ids)
+    return _admin_set
 
 
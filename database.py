@@ -1,13 +1,51 @@
 """Модуль для работы с базой данных SQLite."""
+import asyncio
 import aiosqlite
 import logging
-from typing import Optional, Dict, Any
+import time
+from typing import Optional, Dict, Any, AsyncIterator, List, Tuple
+
+from metrics import timed_query, DB_QUERY_SECONDS
+from security import parse_cadastral_number, normalize_plot
 
 logger = logging.getLogger(__name__)
 
 DB_NAME = "village.db"
 
+# Поколение данных пользователей: увеличивается при каждой записи через этот модуль,
+# по нему кеши результатов поиска узнают, что устарели
+_generation = 0
+# Событие текущего поколения: при записи устанавливается и заменяется новым
+_generation_changed = asyncio.Event()
+
+
+def data_generation() -> int:
+    """Текущее поколение данных пользователей."""
+    return _generation
+
+
+def generation_event() -> asyncio.Event:
+    """Событие, которое установится при следующей записи пользователей через этот модуль."""
+    return _generation_changed
+
+
+def _bump_generation():
+    global _generation, _generation_changed
+    _generation += 1
+    _generation_changed.set()
+    _generation_changed = asyncio.Event()
+
+
+# SQLite LIKE не различает регистр только у латиницы
+_ascii_lower = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
 
+
+def like_fold(value: str) -> str:
+    """Строка в нижнем регистре по правилам LIKE (только латиница)."""
+    return value.translate(_ascii_lower)
+
+
+@timed_query
 async def init_db():
     """Инициализация базы данных."""
     async with aiosqlite.connect(DB_NAME) as db:
@@ -24,30 +62,250 @@ async def init_db():
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         """)
+        await _migrate_users(db)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                sha256 TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                stored INTEGER NOT NULL DEFAULT 1,
+                last_access REAL NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_documents_lru ON documents (stored, last_access)")
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS owners (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                plot_number TEXT NOT NULL,
+                plot_key TEXT NOT NULL,
+                owner_name TEXT NOT NULL,
+                surname_key TEXT NOT NULL,
+                phone TEXT,
+                imported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        # Реестр собственников ищется по нормализованным ключам
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_owners_plot_key ON owners (plot_key)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_owners_surname_key ON owners (surname_key)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_owners_phone ON owners (phone)")
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS admins (
+                telegram_id INTEGER PRIMARY KEY,
+                added_by INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        await _create_change_feed(db)
+        await _create_digest_tables(db)
         await db.commit()
         logger.info("База данных инициализирована")
 
 
+async def _create_digest_tables(db: aiosqlite.Connection):
+    """
+    Режим сводки уведомлений админов.
+
+    digest_settings - админы, получающие заявки сводкой, digest_items -
+    заявки для сводки. Пока digest_id пуст, заявка ждет отправки; после
+    отправки digest_id указывает на сообщение-сводку, к которой относятся
+    ее кнопки, а sent_at - время отправки.
+    """
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS digest_settings (
+            admin_id INTEGER PRIMARY KEY,
+            interval_minutes INTEGER NOT NULL,
+            max_items INTEGER NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS digest_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            admin_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            details TEXT NOT NULL DEFAULT '',
+            digest_id INTEGER,
+            created_at REAL NOT NULL,
+            sent_at REAL
+        )
+    """)
+    await _add_column_if_missing(db, "digest_items", "sent_at", "REAL")
+    # У заявок, отправленных до появления колонки, время отправки неизвестно: берем время постановки в очередь
+    await db.execute("UPDATE digest_items SET sent_at = created_at WHERE digest_id IS NOT NULL AND sent_at IS NULL")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_digest_items_admin ON digest_items (admin_id, digest_id)")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_digest_items_digest ON digest_items (digest_id)")
+
+
+async def _create_change_feed(db: aiosqlite.Connection):
+    """
+    Журнал изменений users, который ведут триггеры SQLite.
+
+    Изменения попадают в журнал при любой записи в users, в том числе не через
+    этот модуль. Обновления служебных полей (например, хеша документа) не
+    записываются: триггер на UPDATE срабатывает только при смене статуса,
+    ФИО, телефона или участка.
+    """
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS user_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            telegram_id INTEGER NOT NULL,
+            operation TEXT NOT NULL,
+            old_status TEXT,
+            new_status TEXT,
+            changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_users_insert AFTER INSERT ON users
+        BEGIN
+            INSERT INTO user_changes (user_id, telegram_id, operation, new_status)
+            VALUES (NEW.id, NEW.telegram_id, 'insert', NEW.status);
+        END
+    """)
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_users_update AFTER UPDATE ON users
+        WHEN OLD.status IS NOT NEW.status OR OLD.full_name IS NOT NEW.full_name
+            OR OLD.phone IS NOT NEW.phone OR OLD.plot_number IS NOT NEW.plot_number
+        BEGIN
+            INSERT INTO user_changes (user_id, telegram_id, operation, old_status, new_status)
+            VALUES (NEW.id, NEW.telegram_id, 'update', OLD.status, NEW.status);
+        END
+    """)
+    await db.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_users_delete AFTER DELETE ON users
+        BEGIN
+            INSERT INTO user_changes (user_id, telegram_id, operation, old_status)
+            VALUES (OLD.id, OLD.telegram_id, 'delete', OLD.status);
+        END
+    """)
+    # Позиции потребителей журнала, чтобы после перезапуска продолжать с того же места
+    await db.execute("""
+        CREATE TABLE IF NOT EXISTS change_cursors (
+            consumer TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+async def _add_column_if_missing(db: aiosqlite.Connection, table: str, column: str, declaration: str):
+    """Добавить колонку в существующую таблицу (для баз, созданных старой версией)."""
+    async with db.execute(f"PRAGMA table_info({table})") as cursor:
+        columns = {row[1] for row in await cursor.fetchall()}
+    if column not in columns:
+        await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+        logger.info(f"Добавлена колонка {table}.{column}")
+
+
+async def _migrate_users(db: aiosqlite.Connection):
+    """Колонки users, появившиеся после первой версии, и их индексы."""
+    # Идентификатор содержимого файла в Telegram и SHA-256 скачанного документа
+    await _add_column_if_missing(db, "users", "document_unique_id", "TEXT")
+    await _add_column_if_missing(db, "users", "document_sha256", "TEXT")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_users_document_unique_id ON users (document_unique_id)")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_users_document_sha256 ON users (document_sha256)")
+    # Цифры телефона в обратном порядке: поиск по последним цифрам идет по индексу
+    await _add_column_if_missing(db, "users", "phone_rev", "TEXT")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_users_phone_rev ON users (phone_rev)")
+    await _backfill_phone_rev(db)
+    # Части кадастрового номера участка для запросов по кварталу и диапазонам
+    await _add_column_if_missing(db, "users", "cad_region", "INTEGER")
+    await _add_column_if_missing(db, "users", "cad_district", "INTEGER")
+    await _add_column_if_missing(db, "users", "cad_quarter", "TEXT")
+    await _add_column_if_missing(db, "users", "cad_parcel", "INTEGER")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_users_cad_quarter ON users (cad_quarter, cad_parcel)")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_users_cadastral ON users (cad_region, cad_district, cad_quarter, cad_parcel)")
+    await _backfill_cadastral(db)
+    # Ключ участка для поиска повторных регистраций того же участка
+    await _add_column_if_missing(db, "users", "plot_key", "TEXT")
+    await db.execute("CREATE INDEX IF NOT EXISTS idx_users_plot_key ON users (plot_key)")
+    await _backfill_plot_key(db)
+
+
+def cadastral_columns(plot_number: str) -> Tuple[Optional[int], Optional[int], Optional[str], Optional[int]]:
+    """Значения cad_region, cad_district, cad_quarter, cad_parcel для номера участка."""
+    return parse_cadastral_number(plot_number) or (None, None, None, None)
+
+
+async def _backfill_cadastral(db: aiosqlite.Connection):
+    """
+    Разобрать номера участков строк без cad_quarter.
+    
+    Некадастровые номера остаются без частей и разбираются заново при каждом
+    запуске, но такие строки единичны.
+    """
+    async with db.execute("SELECT id, plot_number FROM users WHERE cad_quarter IS NULL") as cursor:
+        rows = await cursor.fetchall()
+    parsed = [(*parts, user_id) for user_id, plot in rows if (parts := parse_cadastral_number(plot))]
+    if parsed:
+        await db.executemany(
+            "UPDATE users SET cad_region = ?, cad_district = ?, cad_quarter = ?, cad_parcel = ? WHERE id = ?",
+            parsed
+        )
+        logger.info(f"Разобраны кадастровые номера {len(parsed)} пользователей")
+
+
+async def _backfill_plot_key(db: aiosqlite.Connection):
+    """Заполнить plot_key у строк, созданных до появления колонки."""
+    async with db.execute("SELECT id, plot_number FROM users WHERE plot_key IS NULL") as cursor:
+        rows = await cursor.fetchall()
+    if rows:
+        await db.executemany(
+            "UPDATE users SET plot_key = ? WHERE id = ?",
+            [(normalize_plot(plot), user_id) for user_id, plot in rows]
+        )
+        logger.info(f"Заполнен plot_key для {len(rows)} пользователей")
+
+
+def reverse_phone_digits(phone: str) -> str:
+    """Цифры номера телефона в обратном порядке: "+7 900 123-45-67" -> "76543210097"."""
+    return "".join(ch for ch in phone if ch.isdigit())[::-1]
+
+
+async def _backfill_phone_rev(db: aiosqlite.Connection):
+    """Заполнить phone_rev у строк, добавленных до появления колонки или в обход create_user."""
+    async with db.execute("SELECT id, phone FROM users WHERE phone_rev IS NULL") as cursor:
+        rows = await cursor.fetchall()
+    if rows:
+        await db.executemany(
+            "UPDATE users SET phone_rev = ? WHERE id = ?",
+            [(reverse_phone_digits(phone), user_id) for user_id, phone in rows]
+        )
+        logger.info(f"Заполнено phone_rev у {len(rows)} пользователей")
+
+
+@timed_query
 async def create_user(
     telegram_id: int,
     username: Optional[str],
     full_name: str,
     phone: str,
     plot_number: str,
-    document_file_id: str
+    document_file_id: str,
+    document_unique_id: Optional[str] = None
 ) -> int:
     """Создать нового пользователя."""
     async with aiosqlite.connect(DB_NAME) as db:
         cursor = await db.execute("""
-            INSERT INTO users (telegram_id, username, full_name, phone, plot_number, document_file_id, status)
-            VALUES (?, ?, ?, ?, ?, ?, 'pending')
-        """, (telegram_id, username, full_name, phone, plot_number, document_file_id))
+            INSERT INTO users (
+                telegram_id, username, full_name, phone, phone_rev, plot_number, plot_key,
+                cad_region, cad_district, cad_quarter, cad_parcel,
+                document_file_id, document_unique_id, status
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'pending')
+        """, (
+            telegram_id, username, full_name, phone, reverse_phone_digits(phone), plot_number,
+            normalize_plot(plot_number), *cadastral_columns(plot_number), document_file_id, document_unique_id
+        ))
         await db.commit()
+        _bump_generation()
         user_id = cursor.lastrowid
         logger.info(f"Создан пользователь: telegram_id={telegram_id}, user_id={user_id}")
         return user_id
 
 
+@timed_query
 async def get_user_by_telegram_id(telegram_id: int) -> Optional[Dict[str, Any]]:
     """Получить пользователя по telegram_id."""
     async with aiosqlite.connect(DB_NAME) as db:
@@ -62,6 +320,7 @@ async def get_user_by_telegram_id(telegram_id: int) -> Optional[Dict[str, Any]]:
             return None
 
 
+@timed_query
 async def update_user_status(telegram_id: int, status: str):
     """Обновить статус пользователя."""
     async with aiosqlite.connect(DB_NAME) as db:
@@ -70,9 +329,11 @@ async def update_user_status(telegram_id: int, status: str):
             (status, telegram_id)
         )
         await db.commit()
+        _bump_generation()
         logger.info(f"Обновлен статус пользователя {telegram_id}: {status}")
 
 
+@timed_query
 async def get_pending_users() -> list:
     """Получить список пользователей со статусом 'pending'."""
     async with aiosqlite.connect(DB_NAME) as db:
@@ -84,6 +345,7 @@ async def get_pending_users() -> list:
             return [dict(row) for row in rows]
 
 
+@timed_query
 async def search_by_plot_number(plot_number: str) -> list:
     """Поиск пользователей по номеру участка."""
     async with aiosqlite.connect(DB_NAME) as db:
@@ -96,6 +358,7 @@ async def search_by_plot_number(plot_number: str) -> list:
             return [dict(row) for row in rows]
 
 
+@timed_query
 async def search_by_phone(phone: str) -> list:
     """Поиск пользователей по номеру телефона."""
     async with aiosqlite.connect(DB_NAME) as db:
@@ -108,6 +371,70 @@ async def search_by_phone(phone: str) -> list:
             return [dict(row) for row in rows]
 
 
+@timed_query
+async def search_by_phone_suffix(digits: str) -> list:
+    """Поиск пользователей по последним цифрам телефона (диапазон по индексу phone_rev)."""
+    prefix = digits[::-1]
+    # Все строки, начинающиеся с prefix, лежат в [prefix, prefix с увеличенным последним символом)
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    async with aiosqlite.connect(DB_NAME) as db:
+        db.row_factory = aiosqlite.Row
+        async with db.execute(
+            "SELECT * FROM users WHERE phone_rev >= ? AND phone_rev < ? ORDER BY created_at DESC",
+            (prefix, upper)
+        ) as cursor:
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows]
+
+
+@timed_query
+async def search_by_cadastral(
+    region: Optional[int] = None,
+    district: Optional[int] = None,
+    quarter_from: Optional[str] = None,
+    quarter_to: Optional[str] = None,
+    parcel_from: Optional[int] = None,
+    parcel_to: Optional[int] = None,
+    limit: Optional[int] = None
+) -> list:
+    """
+    Поиск по частям кадастрового номера (границы диапазонов включаются).
+    
+    Кварталы - строки из 7 цифр (см. parse_cadastral_number). Нужен квартал
+    или регион с районом: тогда запрос идет по индексу idx_users_cad_quarter
+    или idx_users_cadastral.
+    """
+    conditions = []
+    params: List[Any] = []
+    for column, operator, value in (
+        ("cad_region", "=", region),
+        ("cad_district", "=", district),
+        ("cad_quarter", ">=", quarter_from),
+        ("cad_quarter", "<=", quarter_to),
+        ("cad_parcel", ">=", parcel_from),
+        ("cad_parcel", "<=", parcel_to),
+    ):
+        if value is not None:
+            conditions.append(f"{column} {operator} ?")
+            params.append(value)
+    if quarter_from is None and (region is None or district is None):
+        raise ValueError("Нужен квартал или регион с районом")
+    
+    async with aiosqlite.connect(DB_NAME) as db:
+        db.row_factory = aiosqlite.Row
+        async with db.execute(
+            f"""
+            SELECT * FROM users WHERE {' AND '.join(conditions)}
+            ORDER BY cad_region, cad_district, cad_quarter, cad_parcel
+            LIMIT ?
+            """,
+            (*params, -1 if limit is None else limit)
+        ) as cursor:
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows]
+
+
+@timed_query
 async def search_by_full_name(full_name: str) -> list:
     """Поиск пользователей по ФИО."""
     async with aiosqlite.connect(DB_NAME) as db:
@@ -120,6 +447,124 @@ async def search_by_full_name(full_name: str) -> list:
             return [dict(row) for row in rows]
 
 
+@timed_query
+async def get_users_by_ids(ids: List[int]) -> list:
+    """Пользователи по списку id в том же порядке; отсутствующие пропускаются."""
+    if not ids:
+        return []
+    users = {}
+    async with aiosqlite.connect(DB_NAME) as db:
+        db.row_factory = aiosqlite.Row
+        # Пачками, чтобы не упереться в лимит параметров SQLite
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            async with db.execute(
+                f"SELECT * FROM users WHERE id IN ({','.join('?' * len(chunk))})",
+                chunk
+            ) as cursor:
+                for row in await cursor.fetchall():
+                    users[row["id"]] = dict(row)
+    return [users[user_id] for user_id in ids if user_id in users]
+
+
+@timed_query
+async def get_search_columns(after_id: int = 0, limit: int = 10000) -> list:
+    """Поля поиска (id, ФИО, телефон, участок) пользователей с id больше `after_id`."""
+    async with aiosqlite.connect(DB_NAME) as db:
+        async with db.execute(
+            "SELECT id, full_name, phone, plot_number FROM users WHERE id > ? ORDER BY id LIMIT ?",
+            (after_id, limit)
+        ) as cursor:
+            return await cursor.fetchall()
+
+
+@timed_query
+async def search_users(query: str, limit: int = 200) -> list:
+    """Поиск пользователей по ФИО, телефону или номеру участка (не больше `limit`)."""
+    async with aiosqlite.connect(DB_NAME) as db:
+        db.row_factory = aiosqlite.Row
+        pattern = f"%{query}%"
+        async with db.execute(
+            """
+            SELECT * FROM users
+            WHERE full_name LIKE ? OR phone LIKE ? OR plot_number LIKE ?
+            ORDER BY created_at DESC
+            LIMIT ?
+            """,
+            (pattern, pattern, pattern, limit)
+        ) as cursor:
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows]
+
+
+@timed_query
+async def get_user_changes(after_seq: int, limit: int = 500) -> list:
+    """Записи журнала изменений users с номером больше `after_seq`."""
+    async with aiosqlite.connect(DB_NAME) as db:
+        db.row_factory = aiosqlite.Row
+        async with db.execute(
+            "SELECT * FROM user_changes WHERE seq > ? ORDER BY seq LIMIT ?",
+            (after_seq, limit)
+        ) as cursor:
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows]
+
+
+@timed_query
+async def get_last_change_seq() -> int:
+    """Номер последней записи журнала изменений (0 - журнал пуст)."""
+    async with aiosqlite.connect(DB_NAME) as db:
+        async with db.execute("SELECT COALESCE(MAX(seq), 0) FROM user_changes") as cursor:
+            row = await cursor.fetchone()
+            return row[0]
+
+
+@timed_query
+async def get_change_cursor(consumer: str) -> Optional[int]:
+    """Сохраненная позиция потребителя журнала или None."""
+    async with aiosqlite.connect(DB_NAME) as db:
+        async with db.execute(
+            "SELECT seq FROM change_cursors WHERE consumer = ?",
+            (consumer,)
+        ) as cursor:
+            row = await cursor.fetchone()
+            return row[0] if row else None
+
+
+@timed_query
+async def save_change_cursor(consumer: str, seq: int):
+    """Сохранить позицию потребителя журнала."""
+    async with aiosqlite.connect(DB_NAME) as db:
+        await db.execute(
+            """
+            INSERT INTO change_cursors (consumer, seq) VALUES (?, ?)
+            ON CONFLICT(consumer) DO UPDATE SET seq = excluded.seq, updated_at = CURRENT_TIMESTAMP
+            """,
+            (consumer, seq)
+        )
+        await db.commit()
+
+
+@timed_query
+async def purge_user_changes(retention_days: int) -> int:
+    """
+    Удалить записи журнала изменений, которые прочитали все именованные
+    потребители, и все записи старше `retention_days` дней.
+    """
+    async with aiosqlite.connect(DB_NAME) as db:
+        cursor = await db.execute(
+            """
+            DELETE FROM user_changes
+            WHERE seq <= (SELECT COALESCE(MIN(seq), 0) FROM change_cursors)
+                OR changed_at < datetime('now', ?)
+            """,
+            (f"-{retention_days} days",)
+        )
+        await db.commit()
+        return cursor.rowcount
+
+
+@timed_query
 async def get_statistics() -> dict:
     """Получить статистику по пользователям."""
     async with aiosqlite.connect(DB_NAME) as db:
@@ -141,6 +586,7 @@ async def get_statistics() -> dict:
         }
 
 
+@timed_query
 async def get_all_users() -> list:
     """Получить всех пользователей."""
     async with aiosqlite.connect(DB_NAME) as db:
@@ -151,3 +597,389 @@ async def get_all_users() -> list:
             rows = await cursor.fetchall()
             return [dict(row) for row in rows]
 
+
+async def iter_users(
+    status: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    batch_size: int = 500
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Перебрать пользователей пачками по `batch_size` в порядке id.
+    
+    Следующая пачка выбирается по условию `id > последний id` (keyset-пагинация),
+    поэтому каждый запрос идет по первичному ключу и в памяти одновременно
+    находится не больше одной пачки. `since` и `until` - границы created_at
+    в формате "YYYY-MM-DD" (`until` не включается).
+    """
+    conditions = ["id > ?"]
+    params: List[Any] = []
+    if status:
+        conditions.append("status = ?")
+        params.append(status)
+    if since:
+        conditions.append("created_at >= ?")
+        params.append(since)
+    if until:
+        conditions.append("created_at < ?")
+        params.append(until)
+    query = f"SELECT * FROM users WHERE {' AND '.join(conditions)} ORDER BY id LIMIT ?"
+    
+    last_id = 0
+    async with aiosqlite.connect(DB_NAME) as db:
+        db.row_factory = aiosqlite.Row
+        while True:
+            # Время учитывается по пачкам: генератор нельзя обернуть в timed_query
+            started = time.perf_counter()
+            async with db.execute(query, (last_id, *params, batch_size)) as cursor:
+                rows = await cursor.fetchall()
+            DB_QUERY_SECONDS.observe(time.perf_counter() - started, function="iter_users")
+            if not rows:
+                return
+            yield [dict(row) for row in rows]
+            if len(rows) < batch_size:
+                return
+            last_id = rows[-1]["id"]
+
+
+@timed_query
+async def get_admin_ids() -> list:
+    """Получить ID админов, добавленных через бота."""
+    async with aiosqlite.connect(DB_NAME) as db:
+        async with db.execute("SELECT telegram_id FROM admins") as cursor:
+            return [row[0] for row in await cursor.fetchall()]
+
+
+@timed_query
+async def add_admin(telegram_id: int, added_by: Optional[int] = None) -> bool:
+    """Добавить админа. Возвращает False, если он уже был добавлен."""
+    async with aiosqlite.connect(DB_NAME) as db:
+        cursor = await db.execute(
+            "INSERT OR IGNORE INTO admins (telegram_id, added_by) VALUES (?, ?)",
+            (telegram_id, added_by)
+        )
+        await db.commit()
+        logger.info(f"Добавлен админ {telegram_id} (добавил {added_by})")
+        return cursor.rowcount > 0
+
+
+@timed_query
+async def remove_admin(telegram_id: int) -> bool:
+    """Удалить админа. Возвращает False, если такого админа не было."""
+    async with aiosqlite.connect(DB_NAME) as db:
+        cursor = await db.execute("DELETE FROM admins WHERE telegram_id = ?", (telegram_id,))
+        await db.commit()
+        logger.info(f"Удален админ {telegram_id}")
+        return cursor.rowcount > 0
+
+
+@timed_query
+async def replace_owners(rows: List[tuple]) -> int:
+    """
+    Заменить реестр собственников целиком.
+    
+    `rows` - кортежи (plot_number, plot_key, owner_name, surname_key, phone).
+    Старый реестр удаляется в той же транзакции, поэтому поиск не видит
+    наполовину загруженный реестр.
+    """
+    async with aiosqlite.connect(DB_NAME) as db:
+        await db.execute("DELETE FROM owners")
+        await db.executemany(
+            "INSERT INTO owners (plot_number, plot_key, owner_name, surname_key, phone) VALUES (?, ?, ?, ?, ?)",
+            rows
+        )
+        await db.commit()
+        logger.info(f"Реестр собственников загружен: {len(rows)} записей")
+        return len(rows)
+
+
+@timed_query
+async def count_owners() -> int:
+    """Число записей в реестре собственников."""
+    async with aiosqlite.connect(DB_NAME) as db:
+        async with db.execute("SELECT COUNT(*) FROM owners") as cursor:
+            return (await cursor.fetchone())[0]
+
+
+@timed_query
+async def has_owners() -> bool:
+    """Загружен ли реестр собственников (без подсчета всех записей)."""
+    async with aiosqlite.connect(DB_NAME) as db:
+        async with db.execute("SELECT EXISTS (SELECT 1 FROM owners)") as cursor:
+            return bool((await cursor.fetchone())[0])
+
+
+@timed_query
+async def find_owner_candidates(plot_key: str, phone: str, surname_key: str, limit: int = 20) -> list:
+    """Записи реестра, совпадающие с заявкой по участку, телефону или фамилии."""
+    async with aiosqlite.connect(DB_NAME) as db:
+        db.row_factory = aiosqlite.Row
+        async with db.execute(
+            """
+            SELECT * FROM owners WHERE plot_key = ?
+            UNION SELECT * FROM owners WHERE phone = ?
+            UNION SELECT * FROM owners WHERE surname_key = ?
+            LIMIT ?
+            """,
+            (plot_key, phone, surname_key, limit)
+        ) as cursor:
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows]
+
+
+@timed_query
+async def find_users_by_document(
+    unique_id: Optional[str] = None,
+    sha256: Optional[str] = None,
+    exclude_telegram_id: Optional[int] = None
+) -> list:
+    """Пользователи с тем же документом: по file_unique_id Telegram или по SHA-256 содержимого."""
+    async with aiosqlite.connect(DB_NAME) as db:
+        db.row_factory = aiosqlite.Row
+        async with db.execute(
+            """
+            SELECT * FROM users WHERE document_unique_id = ? AND telegram_id != ?
+            UNION SELECT * FROM users WHERE document_sha256 = ? AND telegram_id != ?
+            ORDER BY created_at
+            """,
+            (unique_id, exclude_telegram_id or 0, sha256, exclude_telegram_id or 0)
+        ) as cursor:
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows]
+
+
+# Сколько последних цифр телефона сравнивается: номер без кода страны и 8/+7
+NATIONAL_PHONE_DIGITS = 10
+
+
+@timed_query
+async def find_registration_conflicts(
+    telegram_id: int,
+    phone: str,
+    plot_number: str,
+    limit: int = 20
+) -> list:
+    """
+    Другие заявки с тем же телефоном или участком.
+    
+    Телефоны сравниваются по последним 10 цифрам (диапазон по индексу
+    phone_rev), участки - по ключу normalize_plot (индекс plot_key).
+    У каждой строки поле conflicts - список совпавших полей ("phone", "plot").
+    """
+    prefix = reverse_phone_digits(phone)[:NATIONAL_PHONE_DIGITS]
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1) if prefix else ""
+    async with aiosqlite.connect(DB_NAME) as db:
+        db.row_factory = aiosqlite.Row
+        async with db.execute(
+            """
+            SELECT *, 'phone' AS conflict FROM users
+            WHERE phone_rev >= ? AND phone_rev < ? AND telegram_id != ?
+            UNION ALL
+            SELECT *, 'plot' AS conflict FROM users WHERE plot_key = ? AND telegram_id != ?
+            LIMIT ?
+            """,
+            (prefix, upper, telegram_id, normalize_plot(plot_number), telegram_id, limit)
+        ) as cursor:
+            rows = await cursor.fetchall()
+    
+    users: Dict[int, Dict[str, Any]] = {}
+    for row in rows:
+        user = dict(row)
+        conflict = user.pop("conflict")
+        users.setdefault(user["id"], {**user, "conflicts": []})["conflicts"].append(conflict)
+    return sorted(users.values(), key=lambda user: user["created_at"])
+
+
+@timed_query
+async def get_document_sha256(unique_id: str) -> Optional[str]:
+    """SHA-256 уже скачанного файла с тем же file_unique_id."""
+    async with aiosqlite.connect(DB_NAME) as db:
+        async with db.execute(
+            "SELECT document_sha256 FROM users WHERE document_unique_id = ? AND document_sha256 IS NOT NULL LIMIT 1",
+            (unique_id,)
+        ) as cursor:
+            row = await cursor.fetchone()
+            return row[0] if row else None
+
+
+@timed_query
+async def set_user_document_sha256(telegram_id: int, sha256: str):
+    """Записать SHA-256 документа пользователя."""
+    async with aiosqlite.connect(DB_NAME) as db:
+        await db.execute(
+            "UPDATE users SET document_sha256 = ? WHERE telegram_id = ?",
+            (sha256, telegram_id)
+        )
+        await db.commit()
+
+
+@timed_query
+async def touch_document(sha256: str, size: int, stored: bool, accessed: float) -> bool:
+    """
+    Отметить обращение к документу в кеше (или добавить его).
+    
+    Возвращает True, если документ уже был в кеше на диске.
+    """
+    async with aiosqlite.connect(DB_NAME) as db:
+        async with db.execute("SELECT stored FROM documents WHERE sha256 = ?", (sha256,)) as cursor:
+            row = await cursor.fetchone()
+        await db.execute(
+            """
+            INSERT INTO documents (sha256, size, stored, last_access) VALUES (?, ?, ?, ?)
+            ON CONFLICT(sha256) DO UPDATE SET stored = excluded.stored, last_access = excluded.last_access
+            """,
+            (sha256, size, int(stored), accessed)
+        )
+        await db.commit()
+        return bool(row and row[0])
+
+
+@timed_query
+async def get_cached_documents_size() -> int:
+    """Суммарный размер документов, лежащих в кеше на диске."""
+    async with aiosqlite.connect(DB_NAME) as db:
+        async with db.execute("SELECT COALESCE(SUM(size), 0) FROM documents WHERE stored = 1") as cursor:
+            return (await cursor.fetchone())[0]
+
+
+@timed_query
+async def get_least_recent_documents(limit: int) -> list:
+    """Документы в кеше, к которым дольше всего не обращались."""
+    async with aiosqlite.connect(DB_NAME) as db:
+        async with db.execute(
+            "SELECT sha256, size FROM documents WHERE stored = 1 ORDER BY last_access LIMIT ?",
+            (limit,)
+        ) as cursor:
+            return [(row[0], row[1]) for row in await cursor.fetchall()]
+
+
+@timed_query
+async def mark_documents_evicted(hashes: List[str]):
+    """Отметить документы как удаленные из кеша (хеши остаются для поиска дубликатов)."""
+    async with aiosqlite.connect(DB_NAME) as db:
+        await db.executemany("UPDATE documents SET stored = 0 WHERE sha256 = ?", [(h,) for h in hashes])
+        await db.commit()
+
+
+@timed_query
+async def get_digest_settings() -> Dict[int, Tuple[int, int]]:
+    """Админы в режиме сводки: admin_id -> (интервал в минутах, заявок в сводке)."""
+    async with aiosqlite.connect(DB_NAME) as db:
+        async with db.execute("SELECT admin_id, interval_minutes, max_items FROM digest_settings") as cursor:
+            rows = await cursor.fetchall()
+            return {admin_id: (interval, max_items) for admin_id, interval, max_items in rows}
+
+
+@timed_query
+async def save_digest_settings(admin_id: int, interval_minutes: int, max_items: int):
+    """Включить админу режим сводки или изменить его параметры."""
+    async with aiosqlite.connect(DB_NAME) as db:
+        await db.execute(
+            """
+            INSERT INTO digest_settings (admin_id, interval_minutes, max_items) VALUES (?, ?, ?)
+            ON CONFLICT (admin_id) DO UPDATE SET
+                interval_minutes = excluded.interval_minutes,
+                max_items = excluded.max_items,
+                updated_at = CURRENT_TIMESTAMP
+            """,
+            (admin_id, interval_minutes, max_items)
+        )
+        await db.commit()
+
+
+@timed_query
+async def delete_digest_settings(admin_id: int) -> bool:
+    """Вернуть админу мгновенные уведомления. False - режим сводки не был включен."""
+    async with aiosqlite.connect(DB_NAME) as db:
+        cursor = await db.execute("DELETE FROM digest_settings WHERE admin_id = ?", (admin_id,))
+        await db.commit()
+        return cursor.rowcount > 0
+
+
+@timed_query
+async def add_digest_items(admin_ids: List[int], user_id: int, details: str):
+    """Отложить заявку для сводок указанных админов."""
+    now = time.time()
+    async with aiosqlite.connect(DB_NAME) as db:
+        await db.executemany(
+            "INSERT INTO digest_items (admin_id, user_id, details, created_at) VALUES (?, ?, ?, ?)",
+            [(admin_id, user_id, details, now) for admin_id in admin_ids]
+        )
+        await db.commit()
+
+
+@timed_query
+async def get_digest_queue() -> List[Tuple[int, int, float]]:
+    """Неотправленные заявки по админам: (admin_id, число заявок, время самой старой)."""
+    async with aiosqlite.connect(DB_NAME) as db:
+        async with db.execute(
+            """
+            SELECT admin_id, COUNT(*), MIN(created_at) FROM digest_items
+            WHERE digest_id IS NULL GROUP BY admin_id
+            """
+        ) as cursor:
+            return list(await cursor.fetchall())
+
+
+@timed_query
+async def get_queued_digest_items(admin_id: int) -> List[Dict[str, Any]]:
+    """Неотправленные заявки админа в порядке поступления."""
+    async with aiosqlite.connect(DB_NAME) as db:
+        db.row_factory = aiosqlite.Row
+        async with db.execute(
+            "SELECT * FROM digest_items WHERE admin_id = ? AND digest_id IS NULL ORDER BY id",
+            (admin_id,)
+        ) as cursor:
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows]
+
+
+@timed_query
+async def get_digest_items(digest_id: int) -> List[Dict[str, Any]]:
+    """Заявки отправленной сводки."""
+    async with aiosqlite.connect(DB_NAME) as db:
+        db.row_factory = aiosqlite.Row
+        async with db.execute(
+            "SELECT * FROM digest_items WHERE digest_id = ? ORDER BY id", (digest_id,)
+        ) as cursor:
+            rows = await cursor.fetchall()
+            return [dict(row) for row in rows]
+
+
+@timed_query
+async def mark_digest_sent(item_ids: List[int], digest_id: int):
+    """Отметить заявки отправленными в сводке digest_id."""
+    sent_at = time.time()
+    async with aiosqlite.connect(DB_NAME) as db:
+        await db.executemany(
+            "UPDATE digest_items SET digest_id = ?, sent_at = ? WHERE id = ?",
+            [(digest_id, sent_at, item_id) for item_id in item_ids]
+        )
+        await db.commit()
+
+
+@timed_query
+async def delete_digest_items(item_ids: List[int]):
+    """Удалить заявки из сводок по id."""
+    async with aiosqlite.connect(DB_NAME) as db:
+        await db.executemany("DELETE FROM digest_items WHERE id = ?", [(item_id,) for item_id in item_ids])
+        await db.commit()
+
+
+@timed_query
+async def delete_queued_digest_items(admin_id: int):
+    """Удалить неотправленные заявки админа (например, после удаления админа)."""
+    async with aiosqlite.connect(DB_NAME) as db:
+        await db.execute("DELETE FROM digest_items WHERE admin_id = ? AND digest_id IS NULL", (admin_id,))
+        await db.commit()
+
+
+@timed_query
+async def purge_sent_digest_items(before: float) -> int:
+    """Удалить заявки сводок, отправленных до `before`; кнопки этих сводок перестают работать."""
+    async with aiosqlite.connect(DB_NAME) as db:
+        cursor = await db.execute(
+            "DELETE FROM digest_items WHERE sent_at < ?", (before,)
+        )
+        await db.commit()
+        return cursor.rowcount
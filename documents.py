@@ -0,0 +1,180 @@
+"""Локальный кеш документов заявок и поиск одинаковых документов."""
+import asyncio
+import hashlib
+import html
+import io
+import logging
+import os
+import time
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.enums import ParseMode
+
+from config import get_admin_ids
+from database import (
+    find_users_by_document, get_document_sha256, set_user_document_sha256, touch_document,
+    get_cached_documents_size, get_least_recent_documents, mark_documents_evicted
+)
+from metrics import DOCUMENT_CACHE_BYTES, DOCUMENT_DOWNLOADS, DOCUMENT_DUPLICATES
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentCache:
+    """
+    Хранилище файлов по SHA-256 содержимого.
+
+    Файл лежит в `<каталог>/<первые 2 символа хеша>/<хеш>`, поэтому одинаковые
+    документы хранятся один раз. Когда общий размер превышает `max_bytes`,
+    удаляются файлы, к которым дольше всего не обращались. Хеши удаленных
+    файлов остаются в базе, так что дубликаты находятся и после вытеснения.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._lock = asyncio.Lock()
+
+    async def load(self):
+        """Подготовить каталог и прочитать текущий размер кеша."""
+        os.makedirs(self.directory, exist_ok=True)
+        self.size = await get_cached_documents_size()
+        DOCUMENT_CACHE_BYTES.set(self.size)
+
+    def path_for(self, sha256: str) -> str:
+        return os.path.join(self.directory, sha256[:2], sha256)
+
+    def get(self, sha256: str) -> Optional[str]:
+        """Путь к файлу в кеше или None, если файла нет."""
+        path = self.path_for(sha256)
+        return path if os.path.exists(path) else None
+
+    def _write(self, sha256: str, content: bytes):
+        path = self.path_for(sha256)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Запись через временный файл: при сбое в кеше не останется обрезанного документа
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    async def store(self, content: bytes) -> str:
+        """Сохранить содержимое, вернуть его SHA-256."""
+        sha256 = await asyncio.to_thread(lambda: hashlib.sha256(content).hexdigest())
+        async with self._lock:
+            if not self.get(sha256):
+                await asyncio.to_thread(self._write, sha256, content)
+                self.size += len(content)
+            await touch_document(sha256, len(content), stored=True, accessed=time.time())
+            await self._evict()
+        DOCUMENT_CACHE_BYTES.set(self.size)
+        return sha256
+
+    async def _evict(self):
+        """Удалять давно не использованные файлы, пока кеш больше лимита."""
+        while self.size > self.max_bytes:
+            victims = await get_least_recent_documents(limit=50)
+            if not victims:
+                break
+            evicted = []
+            for sha256, size in victims:
+                if self.size <= self.max_bytes:
+                    break
+                try:
+                    os.remove(self.path_for(sha256))
+                except FileNotFoundError:
+                    pass
+                self.size -= size
+                evicted.append(sha256)
+            await mark_documents_evicted(evicted)
+            logger.info(f"Из кеша документов удалено файлов: {len(evicted)}")
+
+
+class DocumentDownloader:
+    """
+    Фоновое скачивание документов заявок.
+
+    Регистрация только ставит документ в очередь и не ждет скачивания.
+    Файл с уже известным file_unique_id повторно не скачивается. После
+    скачивания документ сверяется по SHA-256 с документами других заявок,
+    и при совпадении админы получают предупреждение.
+    """
+
+    def __init__(self, bot: Bot, cache: DocumentCache, workers: int = 2):
+        self.bot = bot
+        self.cache = cache
+        self.workers = workers
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._tasks: list = []
+
+    def start(self):
+        """Запустить обработчики очереди в текущем event loop."""
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"document-downloader-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info(f"Кеш документов: {self.cache.directory} (лимит {self.cache.max_bytes} байт)")
+
+    async def stop(self):
+        """Остановить обработчики; документы, оставшиеся в очереди, не скачиваются."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, telegram_id: int, file_id: str, unique_id: Optional[str]):
+        """Поставить документ заявки в очередь на скачивание."""
+        self._queue.put_nowait((telegram_id, file_id, unique_id))
+
+    async def _worker(self):
+        while True:
+            telegram_id, file_id, unique_id = await self._queue.get()
+            try:
+                await self._process(telegram_id, file_id, unique_id)
+            except Exception as e:
+                logger.error(f"Ошибка при скачивании документа пользователя {telegram_id}: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, telegram_id: int, file_id: str, unique_id: Optional[str]):
+        sha256 = await get_document_sha256(unique_id) if unique_id else None
+        if sha256 is None or not self.cache.get(sha256):
+            buffer = io.BytesIO()
+            await self.bot.download(file_id, destination=buffer)
+            DOCUMENT_DOWNLOADS.inc()
+            sha256 = await self.cache.store(buffer.getvalue())
+        await set_user_document_sha256(telegram_id, sha256)
+
+        duplicates = await find_users_by_document(sha256=sha256, exclude_telegram_id=telegram_id)
+        # Совпадения по file_unique_id админы уже увидели в уведомлении о заявке
+        duplicates = [user for user in duplicates if not unique_id or user["document_unique_id"] != unique_id]
+        if duplicates:
+            DOCUMENT_DUPLICATES.inc(match="sha256")
+            await self._notify_duplicate(telegram_id, duplicates)
+
+    async def _notify_duplicate(self, telegram_id: int, duplicates: list):
+        text = (
+            "⚠️ <b>Повторно использованный документ</b>\n\n"
+            f"Документ заявки пользователя {telegram_id} совпадает по содержимому с документом:\n"
+            + format_duplicates(duplicates)
+        )
+        for admin_id in get_admin_ids():
+            try:
+                await self.bot.send_message(admin_id, text, parse_mode=ParseMode.HTML)
+            except Exception as e:
+                logger.error(f"Ошибка при отправке сообщения админу {admin_id}: {e}")
+        logger.warning(f"Документ пользователя {telegram_id} совпадает с документами {len(duplicates)} заявок")
+
+
+def format_duplicates(users: list, limit: int = 5) -> str:
+    """Список заявок с тем же документом для сообщения админу."""
+    lines = [
+        f"• {html.escape(html.unescape(user['full_name']))}, участок {html.escape(html.unescape(user['plot_number']))}, "
+        f"ID {user['telegram_id']} ({user['status']})"
+        for user in users[:limit]
+    ]
+    if len(users) > limit:
+        lines.append(f"• ... и еще {len(users) - limit}")
+    return "\n".join(lines)
@@ -0,0 +1,90 @@
+"""Выгрузка реестра пользователей в CSV и XLSX."""
+import asyncio
+import csv
+import html
+import logging
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # openpyxl не обязателен: без него выгрузка возможна только в CSV
+    Workbook = None
+
+# Колонки выгрузки: поле таблицы users и заголовок
+EXPORT_COLUMNS: List[Tuple[str, str]] = [
+    ("id", "ID"),
+    ("telegram_id", "Telegram ID"),
+    ("username", "Username"),
+    ("full_name", "ФИО"),
+    ("phone", "Телефон"),
+    ("plot_number", "Участок"),
+    ("status", "Статус"),
+    ("created_at", "Дата регистрации"),
+]
+
+# Символы, с которых табличные редакторы начинают формулу
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def xlsx_available() -> bool:
+    """Установлен ли openpyxl."""
+    return Workbook is not None
+
+
+def _cell(value: Any) -> Any:
+    """Значение ячейки: HTML-экранирование снимается, формулы не допускаются."""
+    if value is None:
+        return ""
+    if not isinstance(value, str):
+        return value
+    value = html.unescape(value)
+    # Телефон +7... - не формула, остальное с такими префиксами экранируем апострофом
+    if value.startswith(FORMULA_PREFIXES) and not value[1:].isdigit():
+        return "'" + value
+    return value
+
+
+def _row(user: Dict[str, Any]) -> List[Any]:
+    return [_cell(user.get(field)) for field, _ in EXPORT_COLUMNS]
+
+
+async def write_csv(path: str, batches: AsyncIterator[List[Dict[str, Any]]]) -> int:
+    """
+    Записать пачки пользователей в CSV, вернуть число строк.
+
+    Разделитель ";" и BOM нужны, чтобы файл сразу открывался в Excel
+    с русской локалью.
+    """
+    count = 0
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow([title for _, title in EXPORT_COLUMNS])
+        async for batch in batches:
+            writer.writerows(_row(user) for user in batch)
+            count += len(batch)
+    return count
+
+
+async def write_xlsx(path: str, batches: AsyncIterator[List[Dict[str, Any]]]) -> int:
+    """
+    Записать пачки пользователей в XLSX, вернуть число строк.
+
+    Книга создается в режиме write_only: строки сразу уходят во временный
+    файл openpyxl, а не накапливаются в памяти. Сжатие и сохранение книги
+    выполняются в отдельном потоке.
+    """
+    if Workbook is None:
+        raise RuntimeError("Для выгрузки в XLSX установите openpyxl")
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Пользователи")
+    sheet.append([title for _, title in EXPORT_COLUMNS])
+    count = 0
+    async for batch in batches:
+        for user in batch:
+            sheet.append(_row(user))
+        count += len(batch)
+    await asyncio.to_thread(workbook.save, path)
+    return count
@@ -0,0 +1,143 @@
+"""Нечеткий поиск по ФИО: опечатки, латиница вместо кириллицы, ё и е."""
+import heapq
+import html
+import math
+import re
+from array import array
+from typing import Dict, FrozenSet, List, Tuple
+
+from database import get_users_by_ids
+from registry_index import IncrementalIndex
+
+# Доля триграмм запроса, которая должна найтись в ФИО
+MIN_SIMILARITY = 0.5
+DEFAULT_LIMIT = 10
+# Сколько строк из списков триграмм просматривается за один поиск
+MAX_CANDIDATES = 5000
+
+TRANSLIT = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "e", "ж": "zh",
+    "з": "z", "и": "i", "й": "y", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o",
+    "п": "p", "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "kh", "ц": "ts",
+    "ч": "ch", "ш": "sh", "щ": "shch", "ъ": "", "ы": "y", "ь": "", "э": "e", "ю": "yu",
+    "я": "ya",
+}
+_translit_table = str.maketrans(TRANSLIT)
+
+# Разные латинские написания одних и тех же звуков сводятся к одному
+LATIN_VARIANTS = [
+    ("shch", "sch"), ("kh", "h"), ("x", "ks"), ("w", "v"), ("q", "k"), ("j", "y"),
+    ("tz", "ts"), ("ia", "ya"), ("iu", "yu"),
+]
+# Окончания вида Dmitriy/Dmitrij/Dmitry, Sergei/Sergey
+_endings = re.compile(r"(?:iy|yi|yy|ii)\b|ei\b")
+
+
+def skeleton(full_name: str) -> List[str]:
+    """Слова ФИО в общей латинской записи: "Дмитрий Ёлкин" и "Dmitry Elkin" -> ["dmitry", "elkin"]."""
+    text = html.unescape(full_name).lower().translate(_translit_table)
+    for variant, canonical in LATIN_VARIANTS:
+        text = text.replace(variant, canonical)
+    text = _endings.sub(lambda match: "y" if match.group(0) != "ei" else "ey", text)
+    return re.findall(r"[a-z]+", text)
+
+
+def trigrams(full_name: str) -> FrozenSet[str]:
+    """Триграммы слов ФИО; начало слова дополняется двумя пробелами, конец - одним."""
+    grams = set()
+    for word in skeleton(full_name):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+class NameMatcher(IncrementalIndex):
+    """
+    Триграммный индекс ФИО всех пользователей.
+
+    Кандидаты набираются только из списков самых редких триграмм запроса:
+    если ФИО должно содержать не меньше m из n триграмм запроса, оно
+    обязательно встретится среди любых n - m + 1 из них. Частые триграммы
+    (окончания "ов", "на") поэтому не просматриваются.
+
+    Просмотр ограничен MAX_CANDIDATES строками, поэтому время поиска не
+    растет с размером реестра. Если списков нужных триграмм больше лимита
+    (запрос из одних частых триграмм, например распространенная фамилия),
+    просматриваются только самые редкие из них: гарантированно находятся
+    ФИО, совпадающие по большей доле триграмм, а менее похожие могут быть
+    пропущены. Из списка самой редкой триграммы, если он сам длиннее
+    лимита, берутся только новые заявки.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._gram_ids: Dict[str, int] = {}
+        self._postings: List[array] = []
+        self._row_grams: List[FrozenSet[int]] = []
+
+    def _add(self, row: int, full_name: str, phone: str, plot_number: str):
+        gram_ids = []
+        for gram in trigrams(full_name):
+            gram_id = self._gram_ids.get(gram)
+            if gram_id is None:
+                gram_id = self._gram_ids[gram] = len(self._postings)
+                self._postings.append(array("l"))
+            self._postings[gram_id].append(row)
+            gram_ids.append(gram_id)
+        self._row_grams.append(frozenset(gram_ids))
+
+    async def search(self, query: str, limit: int = DEFAULT_LIMIT) -> List[Tuple[int, float]]:
+        """Лучшие совпадения: (id пользователя, сходство от 0 до 1), самые похожие первыми."""
+        await self.sync()
+        grams = trigrams(query)
+        if not grams:
+            return []
+        needed = math.ceil(MIN_SIMILARITY * len(grams))
+        # Триграммы, которых нет в индексе, совпасть не могут, но учитываются в доле
+        known = sorted(
+            (self._gram_ids[gram] for gram in grams if gram in self._gram_ids),
+            key=lambda gram_id: len(self._postings[gram_id])
+        )
+        query_ids = frozenset(known)
+        # Отсутствующие в индексе триграммы - самые редкие (ноль строк), их место в префиксе пустое
+        prefix = len(grams) - needed + 1 - (len(grams) - len(known))
+        candidates = set()
+        scanned = 0
+        for gram_id in known[:max(prefix, 0)]:
+            postings = self._postings[gram_id]
+            if scanned and scanned + len(postings) > MAX_CANDIDATES:
+                break
+            # Строки в списках идут по порядку загрузки: в конце новые заявки
+            candidates.update(postings[-MAX_CANDIDATES:])
+            scanned += len(postings)
+
+        scored = []
+        for row in candidates:
+            row_grams = self._row_grams[row]
+            shared = len(query_ids & row_grams)
+            if shared < needed:
+                continue
+            # При равной доле выше ФИО без лишних частей, затем новые заявки
+            scored.append((shared / len(grams), shared / (len(grams) + len(row_grams) - shared), row))
+        best = heapq.nlargest(limit, scored)
+        return [(self._ids[row], similarity) for similarity, _, row in best]
+
+
+name_matcher = NameMatcher()
+
+
+async def find_similar_users(query: str, limit: int = DEFAULT_LIMIT) -> List[Tuple[dict, float]]:
+    """Пользователи с похожими ФИО и сходство, самые похожие первыми."""
+    matches = await name_matcher.search(query, limit)
+    users = {user["id"]: user for user in await get_users_by_ids([user_id for user_id, _ in matches])}
+    return [(users[user_id], similarity) for user_id, similarity in matches if user_id in users]
+
+
+def format_similar_users(matches: List[Tuple[dict, float]]) -> str:
+    """Сообщение админу о похожих ФИО, когда точных совпадений нет."""
+    lines = [
+        f"• {html.escape(html.unescape(user['full_name']))}, участок {html.escape(html.unescape(user['plot_number']))}, "
+        f"{user['phone']} (ID {user['telegram_id']}, сходство {similarity * 100:.0f}%)"
+        for user, similarity in matches
+    ]
+    return "🔎 <b>Точных совпадений нет, похожие ФИО:</b>\n\n" + "\n".join(lines)
@@ -0,0 +1,87 @@
+"""Управление списком админов."""
+from aiogram import Router
+from aiogram.types import Message
+from aiogram.filters import Command
+from aiogram.enums import ParseMode
+import logging
+
+from config import ADMIN_IDS, get_admin_ids, set_admin_ids
+from database import get_admin_ids as get_db_admin_ids, add_admin, remove_admin
+
+logger = logging.getLogger(__name__)
+router = Router()
+
+
+async def reload_admins() -> frozenset:
+    """Перечитать список админов из БД."""
+    admin_ids = set_admin_ids(await get_db_admin_ids())
+    logger.info(f"Список админов загружен: {len(admin_ids)}")
+    return admin_ids
+
+
+def _parse_telegram_id(message: Message):
+    args = message.text.split(maxsplit=1)
+    if len(args) < 2:
+        return None
+    try:
+        return int(args[1].strip())
+    except ValueError:
+        return None
+
+
+@router.message(Command("admins"))
+async def cmd_admins(message: Message):
+    """Показать список админов."""
+    lines = []
+    for admin_id in sorted(get_admin_ids()):
+        suffix = " (из .env)" if admin_id in ADMIN_IDS else ""
+        lines.append(f"• <code>{admin_id}</code>{suffix}")
+    await message.answer(
+        "👨‍💼 <b>Админы</b>\n\n" + "\n".join(lines) + "\n\n"
+        "/add_admin [telegram_id] - добавить админа\n"
+        "/del_admin [telegram_id] - удалить админа\n"
+        "/reload_admins - перечитать список из базы данных",
+        parse_mode=ParseMode.HTML
+    )
+
+
+@router.message(Command("add_admin"))
+async def cmd_add_admin(message: Message):
+    """Добавить админа."""
+    telegram_id = _parse_telegram_id(message)
+    if telegram_id is None:
+        await message.answer("❌ Укажите числовой Telegram ID.\nПример: /add_admin 123456789")
+        return
+    
+    await add_admin(telegram_id, added_by=message.from_user.id)
+    await reload_admins()
+    await message.answer(f"✅ Пользователь {telegram_id} теперь админ.")
+    logger.info(f"Админ {message.from_user.id} добавил админа {telegram_id}")
+
+
+@router.message(Command("del_admin"))
+async def cmd_del_admin(message: Message):
+    """Удалить админа."""
+    telegram_id = _parse_telegram_id(message)
+    if telegram_id is None:
+        await message.answer("❌ Укажите числовой Telegram ID.\nПример: /del_admin 123456789")
+        return
+    
+    if telegram_id in ADMIN_IDS:
+        await message.answer("❌ Этот админ указан в .env и не может быть удален через бота.")
+        return
+    
+    if not await remove_admin(telegram_id):
+        await message.answer(f"❌ Пользователь {telegram_id} не является админом.")
+        return
+    
+    await reload_admins()
+    await message.answer(f"✅ Пользователь {telegram_id} больше не админ.")
+    logger.info(f"Админ {message.from_user.id} удалил админа {telegram_id}")
+
+
+@router.message(Command("reload_admins"))
+async def cmd_reload_admins(message: Message):
+    """Перечитать список админов из БД (например, после ручного изменения базы)."""
+    admin_ids = await reload_admins()
+    await message.answer(f"🔄 Список админов обновлен. Всего админов: {len(admin_ids)}")
@@ -1,13 +1,13 @@
 """Админ-меню с кнопками."""
-from aiogram import Router
+from aiogram import Router, F
 from aiogram.types import Message, ReplyKeyboardMarkup, KeyboardButton
 from aiogram.filters import Command, StateFilter
 from aiogram.fsm.context import FSMContext
 import logging
 
-from config import is_admin
 from states import AdminSearchStates
-from database import search_by_plot_number, search_by_phone, search_by_full_name
+from fuzzy import find_similar_users, format_similar_users
+from query_cache import search_cache
 from security import sanitize_search_query
 
 
@@ -42,17 +42,53 @@ logger = logging.getLogger(__name__)
 router = Router()
 
 
+# Кнопки админ-меню
+BUTTON_SEARCH_PLOT = "🔍 Поиск по участку"
+BUTTON_SEARCH_PHONE = "📱 Поиск по телефону"
+BUTTON_SEARCH_NAME = "👤 Поиск по ФИО"
+BUTTON_SEARCH_UNIVERSAL = "🔎 Универсальный поиск"
+
+# Таблица кнопок: текст кнопки -> (состояние поиска, подсказка).
+# Один хендлер с поиском по словарю вместо отдельного фильтра на каждую кнопку.
+MENU_BUTTONS = {
+    BUTTON_SEARCH_PLOT: (
+        AdminSearchStates.waiting_for_plot,
+        "🔍 <b>Поиск по номеру участка</b>\n\n"
+        "Введите номер участка для поиска.\n"
+        "Пример: 50:28:0090247"
+    ),
+    BUTTON_SEARCH_PHONE: (
+        AdminSearchStates.waiting_for_phone,
+        "📱 <b>Поиск по номеру телефона</b>\n\n"
+        "Введите номер телефона или его последние 4-7 цифр.\n"
+        "Пример: +79001234567 или 4567"
+    ),
+    BUTTON_SEARCH_NAME: (
+        AdminSearchStates.waiting_for_name,
+        "👤 <b>Поиск по ФИО</b>\n\n"
+        "Введите ФИО для поиска.\n"
+        "Пример: Иванов Иван Иванович"
+    ),
+    BUTTON_SEARCH_UNIVERSAL: (
+        AdminSearchStates.waiting_for_universal,
+        "🔎 <b>Универсальный поиск</b>\n\n"
+        "Введите данные для поиска (номер участка, телефон или ФИО).\n"
+        "Поиск будет выполнен по всем полям."
+    ),
+}
+
+
 def get_admin_menu() -> ReplyKeyboardMarkup:
     """Создать админ-меню с кнопками."""
     keyboard = ReplyKeyboardMarkup(
         keyboard=[
             [
-                KeyboardButton(text="🔍 Поиск по участку"),
-                KeyboardButton(text="📱 Поиск по телефону")
+                KeyboardButton(text=BUTTON_SEARCH_PLOT),
+                KeyboardButton(text=BUTTON_SEARCH_PHONE)
             ],
             [
-                KeyboardButton(text="👤 Поиск по ФИО"),
-                KeyboardButton(text="🔎 Универсальный поиск")
+                KeyboardButton(text=BUTTON_SEARCH_NAME),
+                KeyboardButton(text=BUTTON_SEARCH_UNIVERSAL)
             ]
         ],
         resize_keyboard=True,
@@ -64,10 +100,6 @@ def get_admin_menu() -> ReplyKeyboardMarkup:
 @router.message(Command("admin"))
 async def cmd_admin(message: Message):
     """Команда для открытия админ-меню."""
-    if not is_admin(message.from_user.id):
-        await message.answer("❌ У вас нет прав для выполнения этой команды.")
-        return
-    
     menu = get_admin_menu()
     await message.answer(
         "👨‍💼 <b>Админ-панель</b>\n\n"
@@ -76,6 +108,7 @@ async def cmd_admin(message: Message):
         "/search_plot [номер участка]\n"
         "/search_phone [номер телефона]\n"
         "/search_name [ФИО]\n"
+        "/search_quarter [кадастровый квартал]\n"
         "/search - универсальный поиск",
         reply_markup=menu,
         parse_mode="HTML"
@@ -83,85 +116,24 @@ async def cmd_admin(message: Message):
     logger.info(f"Админ {message.from_user.id} открыл админ-меню")
 
 
-@router.message(lambda m: m.text == "🔍 Поиск по участку")
-async def search_by_plot_button(message: Message, state: FSMContext):
-    """Обработка кнопки поиска по участку."""
-    if not is_admin(message.from_user.id):
-        await message.answer("❌ У вас нет прав для выполнения этой команды.")
-        return
-    
-    await state.set_state(AdminSearchStates.waiting_for_plot)
-    await message.answer(
-        "🔍 <b>Поиск по номеру участка</b>\n\n"
-        "Введите номер участка для поиска.\n"
-        "Пример: 50:28:0090247",
-        parse_mode="HTML"
-    )
-
-
-@router.message(lambda m: m.text == "📱 Поиск по телефону")
-async def search_by_phone_button(message: Message, state: FSMContext):
-    """Обработка кнопки поиска по телефону."""
-    if not is_admin(message.from_user.id):
-        await message.answer("❌ У вас нет прав для выполнения этой команды.")
-        return
-    
-    await state.set_state(AdminSearchStates.waiting_for_phone)
-    await message.answer(
-        "📱 <b>Поиск по номеру телефона</b>\n\n"
-        "Введите номер телефона для поиска.\n"
-        "Пример: +79001234567",
-        parse_mode="HTML"
-    )
-
-
-@router.message(lambda m: m.text == "👤 Поиск по ФИО")
-async def search_by_name_button(message: Message, state: FSMContext):
-    """Обработка кнопки поиска по ФИО."""
-    if not is_admin(message.from_user.id):
-        await message.answer("❌ У вас нет прав для выполнения этой команды.")
-        return
-    
-    await state.set_state(AdminSearchStates.waiting_for_name)
-    await message.answer(
-        "👤 <b>Поиск по ФИО</b>\n\n"
-        "Введите ФИО для поиска.\n"
-        "Пример: Иванов Иван Иванович",
-        parse_mode="HTML"
-    )
-
-
-@router.message(lambda m: m.text == "🔎 Универсальный поиск")
-async def universal_search_button(message: Message, state: FSMContext):
-    """Обработка кнопки универсального поиска."""
-    if not is_admin(message.from_user.id):
-        await message.answer("❌ У вас нет прав для выполнения этой команды.")
-        return
-    
-    await state.set_state(AdminSearchStates.waiting_for_universal)
-    await message.answer(
-        "🔎 <b>Универсальный поиск</b>\n\n"
-        "Введите данные для поиска (номер участка, телефон или ФИО).\n"
-        "Поиск будет выполнен по всем полям.",
-        parse_mode="HTML"
-    )
+@router.message(F.text.in_(MENU_BUTTONS))
+async def menu_button(message: Message, state: FSMContext):
+    """Обработка кнопок админ-меню."""
+    next_state, prompt = MENU_BUTTONS[message.text]
+    await state.set_state(next_state)
+    await message.answer(prompt, parse_mode="HTML")
 
 
 @router.message(StateFilter(AdminSearchStates.waiting_for_plot))
 async def process_plot_search(message: Message, state: FSMContext):
     """Обработка поиска по участку из меню."""
-    if not is_admin(message.from_user.id):
-        await message.answer("❌ У вас нет прав для выполнения этой команды.")
-        await state.clear()
-        return
-    
     query = message.text.strip()
     is_valid, error_msg, sanitized = sanitize_search_query(query)
     if not is_valid:
         await message.answer(f"❌ {error_msg}")
         return
     
-    users = await search_by_plot_number(sanitized)
+    users = await search_cache.search("plot", sanitized)
     
     if not users:
         await message.answer(f"❌ Пользователи с номером участка '{sanitized}' не найдены.")
@@ -180,18 +152,13 @@ async def process_plot_search(message: Message, state: FSMContext):
 @router.message(StateFilter(AdminSearchStates.waiting_for_phone))
 async def process_phone_search(message: Message, state: FSMContext):
     """Обработка поиска по телефону из меню."""
-    if not is_admin(message.from_user.id):
-        await message.answer("❌ У вас нет прав для выполнения этой команды.")
-        await state.clear()
-        return
-    
     query = message.text.strip()
     is_valid, error_msg, sanitized = sanitize_search_query(query)
     if not is_valid:
         await message.answer(f"❌ {error_msg}")
         return
     
-    users = await search_by_phone(sanitized)
+    users = await search_cache.search("phone", sanitized)
     
     if not users:
         await message.answer(f"❌ Пользователи с номером телефона '{sanitized}' не найдены.")
@@ -210,21 +177,21 @@ async def process_phone_search(message: Message, state: FSMContext):
 @router.message(StateFilter(AdminSearchStates.waiting_for_name))
 async def process_name_search(message: Message, state: FSMContext):
     """Обработка поиска по ФИО из меню."""
-    if not is_admin(message.from_user.id):
-        await message.answer("❌ У вас нет прав для выполнения этой команды.")
-        await state.clear()
-        return
-    
     query = message.text.strip()
     is_valid, error_msg, sanitized = sanitize_search_query(query)
     if not is_valid:
         await message.answer(f"❌ {error_msg}")
         return
     
-    users = await search_by_full_name(sanitized)
+    users = await search_cache.search("name", sanitized)
     
     if not users:
-        await message.answer(f"❌ Пользователи с ФИО '{sanitized}' не найдены.")
+        # Опечатка или ФИО латиницей: предлагаем похожие
+        similar = await find_similar_users(sanitized)
+        if similar:
+            await message.answer(format_similar_users(similar), parse_mode="HTML")
+        else:
+            await message.answer(f"❌ Пользователи с ФИО '{sanitized}' не найдены.")
         await state.clear()
         return
     
@@ -240,11 +207,6 @@ async def process_name_search(message: Message, state: FSMContext):
 @router.message(StateFilter(AdminSearchStates.waiting_for_universal))
 async def process_universal_search(message: Message, state: FSMContext):
     """Обработка универсального поиска из меню."""
-    if not is_admin(message.from_user.id):
-        await message.answer("❌ У вас нет прав для выполнения этой команды.")
-        await state.clear()
-        return
-    
     query = message.text.strip()
     is_valid, error_msg, sanitized = sanitize_search_query(query)
     if not is_valid:
@@ -253,9 +215,9 @@ async def process_universal_search(message: Message, state: FSMContext):
         return
     
     # Поиск по всем критериям
-    results_plot = await search_by_plot_number(sanitized)
-    results_phone = await search_by_phone(sanitized)
-    results_name = await search_by_full_name(sanitized)
+    results_plot = await search_cache.search("plot", sanitized)
+    results_phone = await search_cache.search("phone", sanitized)
+    results_name = await search_cache.search("name", sanitized)
     
     # Объединяем результаты, убирая дубликаты
     all_results = {}
@@ -265,7 +227,11 @@ async def process_universal_search(message: Message, state: FSMContext):
     users = list(all_results.values())
     
     if not users:
-        await message.answer(f"❌ По запросу '{sanitized}' ничего не найдено.")
+        similar = await find_similar_users(sanitized)
+        if similar:
+            await message.answer(format_similar_users(similar), parse_mode="HTML")
+        else:
+            await message.answer(f"❌ По запросу '{sanitized}' ничего не найдено.")
         await state.clear()
         return
     
@@ -0,0 +1,159 @@
+"""Режим сводки заявок: настройка и кнопки сводок."""
+from aiogram import Router, Bot
+from aiogram.types import CallbackQuery, Message
+from aiogram.filters import Command, CommandObject
+from aiogram.enums import ParseMode
+from aiogram.exceptions import TelegramBadRequest
+import logging
+from typing import Optional
+
+from callbacks import DigestCallback, CALLBACK_VERSION
+from config import DIGEST_MAX_ITEMS
+from database import get_digest_items, get_users_by_ids
+from handlers.admin import grant_access, deny_access
+from notifications import AdminDigest, format_digest, digest_keyboard
+
+logger = logging.getLogger(__name__)
+router = Router()
+
+DIGEST_USAGE = (
+    "/digest [минуты] [заявок] - присылать новые заявки одной сводкой раз в указанное "
+    f"число минут или когда наберется указанное число заявок (по умолчанию {DIGEST_MAX_ITEMS})\n"
+    "/digest off - присылать каждую заявку сразу\n\n"
+    "Пример: /digest 60 5"
+)
+
+# Действия кнопок сводки: одобрение всех заявок и одной выполняет одна функция
+DIGEST_ACTIONS = {
+    "approve": grant_access,
+    "approve_all": grant_access,
+    "reject": deny_access,
+}
+
+
+def parse_digest_args(args: Optional[str]) -> Optional[tuple]:
+    """
+    Разобрать аргументы /digest: None - выключить сводку,
+    иначе (минуты, заявок). Некорректный аргумент вызывает ValueError.
+    """
+    parts = (args or "").split()
+    if parts == ["off"]:
+        return None
+    if not 1 <= len(parts) <= 2:
+        raise ValueError(args)
+    interval = int(parts[0])
+    max_items = int(parts[1]) if len(parts) > 1 else DIGEST_MAX_ITEMS
+    if interval < 1 or max_items < 1:
+        raise ValueError(args)
+    return interval, max_items
+
+
+@router.message(Command("digest"))
+async def cmd_digest(message: Message, command: CommandObject, digest: Optional[AdminDigest] = None):
+    """Включить, изменить или выключить сводку заявок для себя."""
+    if digest is None:
+        await message.answer("❌ Сводки заявок недоступны.")
+        return
+    
+    admin_id = message.from_user.id
+    if not command.args:
+        settings = digest.settings.get(admin_id)
+        mode = (
+            f"сводка раз в {settings[0]} мин или по {settings[1]} заявок" if settings
+            else "каждая заявка приходит сразу"
+        )
+        await message.answer(
+            f"🗂 <b>Сводка заявок</b>\n\nСейчас: {mode}\n\n" + DIGEST_USAGE,
+            parse_mode=ParseMode.HTML
+        )
+        return
+    
+    try:
+        settings = parse_digest_args(command.args)
+    except ValueError:
+        await message.answer("❌ Неверные параметры.\n\n" + DIGEST_USAGE)
+        return
+    
+    if settings is None:
+        await digest.set_mode(admin_id, None)
+        await message.answer("✅ Заявки снова приходят сразу. Накопленные придут последней сводкой.")
+    else:
+        await digest.set_mode(admin_id, *settings)
+        await message.answer(
+            f"✅ Заявки будут приходить сводкой раз в {settings[0]} мин или по {settings[1]} заявок."
+        )
+    logger.info(f"Админ {admin_id} изменил режим сводки: {settings}")
+
+
+async def send_document(callback: CallbackQuery, user: dict):
+    """Прислать админу документ заявки из сводки."""
+    caption = f"Документ пользователя: {user['full_name']}"
+    try:
+        await callback.message.answer_photo(user["document_file_id"], caption=caption)
+    except Exception:
+        try:
+            await callback.message.answer_document(user["document_file_id"], caption=caption)
+        except Exception as e:
+            logger.error(f"Ошибка при отправке документа: {e}")
+            await callback.answer("❌ Не удалось отправить документ", show_alert=True)
+            return
+    await callback.answer()
+
+
+@router.callback_query(DigestCallback.filter())
+async def digest_callback(callback: CallbackQuery, bot: Bot, callback_data: DigestCallback):
+    """Кнопки сводки: одобрить или отклонить заявку, показать документ, одобрить все."""
+    items = await get_digest_items(callback_data.digest_id)
+    if not items or callback_data.v > CALLBACK_VERSION:
+        await callback.answer("❌ Сводка устарела", show_alert=True)
+        return
+    
+    users = {user["id"]: user for user in await get_users_by_ids([item["user_id"] for item in items])}
+    if callback_data.action == "doc":
+        user = next((user for user in users.values() if user["telegram_id"] == callback_data.telegram_id), None)
+        if user is None:
+            await callback.answer("❌ Заявка удалена", show_alert=True)
+            return
+        await send_document(callback, user)
+        return
+    
+    action = DIGEST_ACTIONS.get(callback_data.action)
+    if action is None:
+        logger.warning(f"Неизвестная кнопка сводки: {callback.data}")
+        await callback.answer("❌ Кнопка устарела", show_alert=True)
+        return
+    
+    targets = [
+        user["telegram_id"] for user in users.values()
+        if user["status"] == "pending"
+        and (callback_data.action == "approve_all" or user["telegram_id"] == callback_data.telegram_id)
+    ]
+    failed = 0
+    for telegram_id in targets:
+        try:
+            await action(bot, telegram_id)
+        except Exception as e:
+            failed += 1
+            logger.error(f"Ошибка при обработке заявки {telegram_id} из сводки: {e}", exc_info=True)
+    
+    # Статусы могли измениться и по кнопкам других админов: показываем актуальные
+    users = {user["id"]: user for user in await get_users_by_ids([item["user_id"] for item in items])}
+    try:
+        await callback.message.edit_text(
+            format_digest(items, users),
+            parse_mode=ParseMode.HTML,
+            reply_markup=digest_keyboard(callback_data.digest_id, items, users)
+        )
+    except TelegramBadRequest:
+        # Сообщение не изменилось
+        pass
+    
+    if not targets:
+        await callback.answer("Заявка уже рассмотрена", show_alert=True)
+    elif failed:
+        await callback.answer(f"❌ Ошибка при обработке {failed} из {len(targets)} заявок", show_alert=True)
+    else:
+        done = "✅ Одобрено" if action is grant_access else "❌ Отклонено"
+        await callback.answer(f"{done}: {len(targets)}", show_alert=True)
+    
+    logger.info(f"Админ {callback.from_user.id} обработал {len(targets) - failed} заявок из сводки {callback_data.digest_id}")
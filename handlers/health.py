@@ -0,0 +1,74 @@
+"""Команда /health: состояние бота."""
+import html
+from typing import Optional
+
+from aiogram import Router
+from aiogram.types import Message
+from aiogram.filters import Command
+from aiogram.enums import ParseMode
+import logging
+
+from middlewares.concurrency import ConcurrencyMiddleware
+from query_cache import CACHES
+from watchdog import LoopWatchdog
+
+logger = logging.getLogger(__name__)
+router = Router()
+
+
+def _format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    return f"{days}д {hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+@router.message(Command("health"))
+async def cmd_health(
+    message: Message,
+    watchdog: Optional[LoopWatchdog] = None,
+    concurrency: Optional[ConcurrencyMiddleware] = None
+):
+    """Показать задержку event loop и состояние очереди апдейтов."""
+    text = "🩺 <b>Состояние бота</b>\n\n"
+    
+    if watchdog is not None:
+        lag = watchdog.stats()
+        text += (
+            f"<b>Время работы:</b> {_format_duration(lag['uptime'])}\n"
+            f"<b>Задержка event loop:</b> {lag['current'] * 1000:.1f} мс "
+            f"(p95 {lag['p95'] * 1000:.1f} мс, макс. {lag['max'] * 1000:.1f} мс)\n"
+            f"<b>Блокировок event loop:</b> {lag['blocks']}\n"
+        )
+        last_block = lag["last_block"]
+        if last_block:
+            text += (
+                f"<b>Последняя блокировка:</b> {last_block['at']}, "
+                f"{last_block['stalled']:.2f} с\n"
+                f"<code>{html.escape(last_block['location'])}</code>\n"
+            )
+    else:
+        text += "Контроль event loop выключен\n"
+    
+    if concurrency is not None:
+        queue = concurrency.stats()
+        shed = sum(queue["shed"].values())
+        text += (
+            f"\n<b>Апдейтов в работе:</b> {queue['in_flight']}\n"
+            f"<b>В очереди:</b> {queue['waiting']}\n"
+            f"<b>Среднее ожидание:</b> {queue['avg_wait'] * 1000:.1f} мс "
+            f"(макс. {queue['max_wait'] * 1000:.1f} мс)\n"
+            f"<b>Отброшено при перегрузке:</b> {shed}\n"
+        )
+    
+    text += "\n<b>Кеши поиска:</b>\n"
+    for cache in CACHES:
+        cache_stats = cache.stats()
+        text += (
+            f"• {cache_stats['name']}: попаданий {cache_stats['hit_ratio'] * 100:.0f}% "
+            f"({cache_stats['hits']} из {cache_stats['hits'] + cache_stats['misses']}), "
+            f"записей {cache_stats['entries']}\n"
+        )
+    
+    await message.answer(text, parse_mode=ParseMode.HTML)
+    logger.info(f"Админ {message.from_user.id} запросил состояние бота")
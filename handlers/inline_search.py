@@ -0,0 +1,144 @@
+"""Inline-поиск пользователей для админов: @бот запрос в любом чате."""
+import asyncio
+import html
+import itertools
+import logging
+from typing import Dict, List, Optional
+
+from aiogram import Router
+from aiogram.enums import ParseMode
+from aiogram.types import InlineQuery, InlineQueryResultArticle, InputTextMessageContent
+
+from config import QUERY_CACHE_SIZE
+from database import data_generation, get_pending_users, like_fold
+from handlers.admin_menu import format_user_info
+from query_cache import QueryCache, phone_suffix, search_any
+from security import sanitize_search_query
+
+logger = logging.getLogger(__name__)
+router = Router()
+
+# Пауза перед запросом к базе: пока админ печатает, промежуточные запросы отбрасываются
+DEBOUNCE_DELAY = 0.3
+# Сколько кандидатов выбирается из базы; неполный список нельзя сужать в памяти
+CANDIDATE_LIMIT = 200
+# Сколько карточек показывается (ограничение Telegram - 50)
+MAX_RESULTS = 50
+# Время кеширования ответа на стороне Telegram (секунды)
+INLINE_CACHE_TIME = 30
+
+STATUS_EMOJI = {"pending": "⏳", "approved": "✅", "rejected": "❌"}
+
+
+def matches(user: dict, query: str) -> bool:
+    """То же условие, что в search_any: подстрока ФИО, телефона или участка, 4-7 цифр - конец телефона."""
+    query = like_fold(query)
+    digits = phone_suffix(query)
+    if digits is not None:
+        return (user["phone_rev"] or "").startswith(digits[::-1]) or query in like_fold(user["plot_number"] or "")
+    return any(query in like_fold(user[field] or "") for field in ("full_name", "phone", "plot_number"))
+
+
+def rank(user: dict, query: str) -> int:
+    """Группа карточки: точный участок, начало слова ФИО, конец телефона, остальное."""
+    query = like_fold(query)
+    if like_fold(user["plot_number"]) == query:
+        return 0
+    if any(word.startswith(query) for word in like_fold(html.unescape(user["full_name"])).split()):
+        return 1
+    if user["phone"].endswith(query):
+        return 2
+    return 3
+
+
+class PrefixCache(QueryCache):
+    """
+    Кеш результатов inline-поиска с сужением по префиксу.
+
+    Если для запроса "Ива" в кеше лежит полный список кандидатов, то для
+    "Иван" достаточно отфильтровать его в памяти: все строки с подстрокой
+    "Иван" содержат и "Ива". Неполные списки (упершиеся в CANDIDATE_LIMIT)
+    и списки по концу телефона ("1234" не содержит телефонов на "12345")
+    для сужения не используются. Как и другие кеши поиска, сбрасывается
+    при любой записи пользователя в базу.
+    """
+
+    def lookup(self, query: str) -> Optional[List[dict]]:
+        """Кандидаты для запроса из кеша (точное совпадение или сужение префикса)."""
+        self._sync()
+        for length in range(len(query), 0, -1):
+            prefix = query[:length]
+            entry = self._entries.get(prefix)
+            if entry is None:
+                continue
+            users, complete = entry
+            if length == len(query) or (complete and phone_suffix(prefix) is None):
+                self._entries.move_to_end(prefix)
+                self._record(True)
+                return users if length == len(query) else [user for user in users if matches(user, query)]
+        self._record(False)
+        return None
+
+
+prefix_cache = PrefixCache("inline", QUERY_CACHE_SIZE)
+# Номер последнего запроса каждого админа: по нему отбрасываются устаревшие нажатия клавиш
+_latest: Dict[int, int] = {}
+_sequence = itertools.count(1)
+
+
+def _card(user: dict) -> InlineQueryResultArticle:
+    emoji = STATUS_EMOJI.get(user["status"], "❓")
+    return InlineQueryResultArticle(
+        id=str(user["id"]),
+        title=f"{emoji} {html.unescape(user['full_name'])}",
+        description=f"Участок {html.unescape(user['plot_number'])} · {user['phone']}",
+        input_message_content=InputTextMessageContent(
+            message_text=format_user_info(user),
+            parse_mode=ParseMode.HTML
+        )
+    )
+
+
+async def _load(query: str) -> List[dict]:
+    generation = data_generation()
+    users = await search_any(query, limit=CANDIDATE_LIMIT)
+    prefix_cache.store(query, (users, len(users) < CANDIDATE_LIMIT), generation)
+    return users
+
+
+@router.inline_query()
+async def inline_search(inline_query: InlineQuery):
+    """Карточки пользователей по запросу; пустой запрос - заявки на рассмотрении."""
+    user_id = inline_query.from_user.id
+    query = inline_query.query.strip()
+    
+    if not query:
+        users = (await get_pending_users())[:MAX_RESULTS]
+    else:
+        is_valid, _, sanitized = sanitize_search_query(query)
+        if not is_valid:
+            await inline_query.answer([], cache_time=INLINE_CACHE_TIME, is_personal=True)
+            return
+    
+        # LIKE не различает регистр латиницы: "Ivan" и "ivan" - один запрос
+        sanitized = like_fold(sanitized)
+        candidates = prefix_cache.lookup(sanitized)
+        if candidates is None:
+            # Без попадания в кеш ждем, не придет ли следующее нажатие клавиши
+            sequence = _latest[user_id] = next(_sequence)
+            await asyncio.sleep(DEBOUNCE_DELAY)
+            if _latest.get(user_id) != sequence:
+                # Telegram ждет ответ только на последний запрос, этот можно не отправлять
+                return
+            _latest.pop(user_id, None)
+            candidates = await _load(sanitized)
+        # Кандидаты упорядочены по дате (новые выше), стабильная сортировка сохраняет этот порядок в группе
+        users = sorted(candidates, key=lambda user: rank(user, sanitized))[:MAX_RESULTS]
+    
+    # is_personal: Telegram не должен отдавать закешированные карточки другим пользователям
+    await inline_query.answer(
+        [_card(user) for user in users],
+        cache_time=INLINE_CACHE_TIME,
+        is_personal=True
+    )
+    logger.debug(f"Inline-поиск админа {user_id}: '{query}', найдено {len(users)}")
@@ -0,0 +1,115 @@
+"""Загрузка реестра собственников участков."""
+import csv
+import html
+import io
+import logging
+import os
+import tempfile
+
+from aiogram import Router, Bot, F
+from aiogram.types import Message, FSInputFile
+from aiogram.filters import Command, StateFilter
+from aiogram.fsm.context import FSMContext
+from aiogram.enums import ParseMode
+from aiogram.exceptions import TelegramAPIError
+
+from database import count_owners
+from register import import_register
+from states import AdminImportStates
+
+logger = logging.getLogger(__name__)
+router = Router()
+
+# Максимальный размер файла реестра (5 МБ)
+MAX_REGISTER_SIZE = 5 * 1024 * 1024
+# Сколько ошибок показывать в сообщении; полный список уходит файлом
+ERRORS_IN_MESSAGE = 10
+
+
+def _decode(content: bytes) -> str:
+    """Файлы из Excel бывают в UTF-8 (с BOM или без) и в cp1251."""
+    try:
+        return content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return content.decode("cp1251")
+
+
+@router.message(Command("import_register"))
+async def cmd_import_register(message: Message, state: FSMContext):
+    """Начать загрузку реестра собственников."""
+    owners = await count_owners()
+    await state.set_state(AdminImportStates.waiting_for_file)
+    await message.answer(
+        "📚 <b>Загрузка реестра собственников</b>\n\n"
+        "Отправьте CSV-файл с колонками: <b>участок; ФИО собственника; телефон</b> "
+        "(телефон необязателен, разделитель ; или ,).\n"
+        "Новый реестр полностью заменит текущий.\n\n"
+        f"Сейчас в реестре: {owners} записей.\n"
+        "Для отмены отправьте /cancel",
+        parse_mode=ParseMode.HTML
+    )
+
+
+@router.message(StateFilter(AdminImportStates.waiting_for_file), Command("cancel"))
+async def cancel_import(message: Message, state: FSMContext):
+    """Отменить загрузку реестра."""
+    await state.clear()
+    await message.answer("Загрузка реестра отменена.")
+
+
+@router.message(StateFilter(AdminImportStates.waiting_for_file), F.document)
+async def process_register_file(message: Message, state: FSMContext, bot: Bot):
+    """Проверить файл реестра и загрузить корректные строки."""
+    document = message.document
+    if document.file_size and document.file_size > MAX_REGISTER_SIZE:
+        await message.answer("❌ Файл слишком большой (максимум 5 МБ).")
+        return
+    
+    await state.clear()
+    buffer = io.BytesIO()
+    try:
+        await bot.download(document, destination=buffer)
+    except TelegramAPIError as e:
+        logger.error(f"Ошибка при скачивании файла реестра: {e}")
+        await message.answer("❌ Не удалось скачать файл. Отправьте /import_register и попробуйте еще раз.")
+        return
+    
+    try:
+        result = await import_register(_decode(buffer.getvalue()))
+    except (UnicodeDecodeError, csv.Error) as e:
+        logger.error(f"Ошибка при разборе файла реестра: {e}")
+        await message.answer("❌ Не удалось прочитать файл. Проверьте, что это CSV.")
+        return
+    
+    if not result.rows:
+        summary = "❌ <b>Реестр не загружен:</b> в файле нет корректных строк, текущий реестр не изменен."
+    else:
+        summary = f"✅ <b>Реестр загружен:</b> {len(result.rows)} из {result.total} строк."
+    if result.errors:
+        summary += f"\n\n⚠️ Строк с ошибками: {len(result.errors)}\n"
+        summary += "\n".join(
+            f"Строка {line_no}: {html.escape(error)}" for line_no, error in result.errors[:ERRORS_IN_MESSAGE]
+        )
+    await message.answer(summary, parse_mode=ParseMode.HTML)
+    logger.info(f"Админ {message.from_user.id} загрузил реестр: {len(result.rows)} из {result.total}")
+    
+    # Полный отчет об ошибках отправляем файлом
+    if len(result.errors) > ERRORS_IN_MESSAGE:
+        fd, path = tempfile.mkstemp(prefix="register_errors_", suffix=".csv")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8-sig", newline="") as f:
+                writer = csv.writer(f, delimiter=";")
+                writer.writerow(["Строка", "Ошибка"])
+                writer.writerows(result.errors)
+            await message.answer_document(
+                FSInputFile(path, filename="register_errors.csv"),
+                caption="Все строки с ошибками"
+            )
+        finally:
+            os.remove(path)
+
+
+@router.message(StateFilter(AdminImportStates.waiting_for_file))
+async def process_register_invalid(message: Message):
+    """Ожидается файл, а пришло что-то другое."""
+    await message.answer("❌ Отправьте CSV-файл реестра или /cancel для отмены.")
@@ -7,11 +7,18 @@ from aiogram.types import (
 from aiogram.fsm.context import FSMContext
 from aiogram.filters import StateFilter
 from aiogram.enums import ParseMode
+import html
 import logging
+from typing import Optional
 
 from states import RegistrationStates
-from database import create_user
-from config import is_admin, ADMIN_IDS
+from callbacks import ModerationCallback
+from database import create_user, has_owners, find_users_by_document, find_registration_conflicts
+from documents import DocumentDownloader, format_duplicates
+from notifications import AdminDigest
+from metrics import DOCUMENT_DUPLICATES, REGISTRATION_CONFLICTS
+from config import get_admin_ids
+from register import match_owner, format_match
 from security import (
     validate_full_name, validate_phone, validate_plot_number,
     validate_file_extension, validate_file_size, normalize_phone,
@@ -21,6 +28,21 @@ from security import (
 logger = logging.getLogger(__name__)
 router = Router()
 
+CONFLICT_LABELS = {"phone": "телефон", "plot": "участок"}
+
+
+def format_conflicts(users: list, limit: int = 5) -> str:
+    """Блок "также зарегистрированы" для уведомления админа."""
+    lines = [
+        f"• {html.escape(html.unescape(user['full_name']))}, участок {html.escape(html.unescape(user['plot_number']))}, "
+        f"{user['phone']}, ID {user['telegram_id']} ({user['status']}; совпадает "
+        f"{', '.join(CONFLICT_LABELS[field] for field in user['conflicts'])})"
+        for user in users[:limit]
+    ]
+    if len(users) > limit:
+        lines.append(f"• ... и еще {len(users) - limit}")
+    return "\n\n👥 <b>Также зарегистрированы:</b>\n" + "\n".join(lines)
+
 
 @router.message(StateFilter(RegistrationStates.waiting_for_full_name))
 async def process_full_name(message: Message, state: FSMContext):
@@ -141,9 +163,16 @@ async def process_plot_number(message: Message, state: FSMContext):
 
 
 @router.message(StateFilter(RegistrationStates.waiting_for_document), F.photo | F.document)
-async def process_document(message: Message, state: FSMContext, bot: Bot):
+async def process_document(
+    message: Message,
+    state: FSMContext,
+    bot: Bot,
+    documents: Optional[DocumentDownloader] = None,
+    digest: Optional[AdminDigest] = None
+):
     """Обработка загрузки документа."""
     file_id = None
+    unique_id = None
     filename = None
     file_size = None
     is_document = False
@@ -151,10 +180,12 @@ async def process_document(message: Message, state: FSMContext, bot: Bot):
     if message.photo:
         # Берем фото наибольшего размера
         file_id = message.photo[-1].file_id
+        unique_id = message.photo[-1].file_unique_id
         file_size = message.photo[-1].file_size
         filename = "photo.jpg"  # Для фото имя не критично
     elif message.document:
         file_id = message.document.file_id
+        unique_id = message.document.file_unique_id
         filename = message.document.file_name
         file_size = message.document.file_size
         is_document = True
@@ -200,9 +231,44 @@ async def process_document(message: Message, state: FSMContext, bot: Bot):
             full_name=full_name,
             phone=phone,
             plot_number=plot_number,
-            document_file_id=file_id
+            document_file_id=file_id,
+            document_unique_id=unique_id
         )
         
+        # Тот же файл Telegram уже прикреплен к другой заявке
+        duplicate_text = ""
+        try:
+            duplicates = await find_users_by_document(unique_id=unique_id, exclude_telegram_id=message.from_user.id)
+            if duplicates:
+                DOCUMENT_DUPLICATES.inc(match="file_unique_id")
+                duplicate_text = "\n\n⚠️ <b>Этот документ уже прикреплен к заявке:</b>\n" + format_duplicates(duplicates)
+        except Exception as e:
+            logger.error(f"Ошибка при поиске заявок с тем же документом: {e}", exc_info=True)
+        
+        # Тот же телефон или участок в заявке с другого аккаунта Telegram
+        conflicts_text = ""
+        try:
+            conflicts = await find_registration_conflicts(message.from_user.id, phone, plot_number)
+            if conflicts:
+                for field in {field for user in conflicts for field in user["conflicts"]}:
+                    REGISTRATION_CONFLICTS.inc(field=field)
+                conflicts_text = format_conflicts(conflicts)
+        except Exception as e:
+            logger.error(f"Ошибка при поиске повторных регистраций: {e}", exc_info=True)
+        
+        # Документ скачивается в локальный кеш в фоне, совпадения по содержимому придут отдельно
+        if documents is not None:
+            documents.submit(message.from_user.id, file_id, unique_id)
+        
+        # Сверка с реестром собственников (если он загружен)
+        register_text = ""
+        try:
+            if await has_owners():
+                match = await match_owner(full_name, phone, plot_number)
+                register_text = "\n\n" + format_match(match)
+        except Exception as e:
+            logger.error(f"Ошибка при сверке с реестром: {e}", exc_info=True)
+        
         # Отправляем уведомление админу
         admin_text = (
             "🔔 <b>Новая заявка на регистрацию</b>\n\n"
@@ -212,21 +278,37 @@ async def process_document(message: Message, state: FSMContext, bot: Bot):
             f"<b>Telegram ID:</b> {message.from_user.id}\n"
             f"<b>Username:</b> @{message.from_user.username or 'не указан'}\n"
             f"<b>ID заявки:</b> {user_id}"
+            f"{register_text}"
+            f"{conflicts_text}"
+            f"{duplicate_text}"
         )
         
         keyboard = InlineKeyboardMarkup(inline_keyboard=[[
             InlineKeyboardButton(
                 text="✅ Одобрить",
-                callback_data=f"approve_{message.from_user.id}"
+                callback_data=ModerationCallback(action="approve", telegram_id=message.from_user.id).pack()
             ),
             InlineKeyboardButton(
                 text="❌ Отклонить",
-                callback_data=f"reject_{message.from_user.id}"
+                callback_data=ModerationCallback(action="reject", telegram_id=message.from_user.id).pack()
             )
         ]])
         
+        # Админы в режиме сводки получат заявку позже одним сообщением с другими
+        admin_ids = get_admin_ids()
+        digest_admins = digest.digest_admins(admin_ids) if digest is not None else []
+        if digest_admins:
+            try:
+                details = "\n".join(text.strip() for text in (register_text, conflicts_text, duplicate_text) if text)
+                await digest.enqueue(digest_admins, user_id, details)
+            except Exception as e:
+                logger.error(f"Ошибка при добавлении заявки в сводку: {e}", exc_info=True)
+                digest_admins = []
+        
         # Отправляем текст и документ отдельно для лучшей читаемости всем админам
-        for admin_id in ADMIN_IDS:
+        for admin_id in admin_ids:
+            if admin_id in digest_admins:
+                continue
             try:
                 await bot.send_message(
                     admin_id,
@@ -1,19 +1,51 @@
 """Обработчики поиска для администраторов."""
 from aiogram import Router, Bot, F
 from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton
-from aiogram.filters import Command, StateFilter
+from aiogram.filters import Command, CommandObject, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.enums import ParseMode
+import html
 import logging
+import re
+from typing import Optional
 
-from config import is_admin
-from database import search_by_plot_number, search_by_phone, search_by_full_name
-from security import sanitize_search_query
+from database import search_by_cadastral
+from fuzzy import find_similar_users, format_similar_users
+from query_cache import search_cache
+from security import sanitize_search_query, CADASTRAL_QUARTER_DIGITS
 
 logger = logging.getLogger(__name__)
 router = Router()
 
+# Больше строк в ответе /search_quarter не выводится
+QUARTER_LIST_LIMIT = 300
+# Запас до лимита Telegram в 4096 символов на сообщение
+MESSAGE_LIMIT = 4000
+
+QUARTER_USAGE = (
+    "❌ Укажите кадастровый квартал или его часть.\n\n"
+    "Примеры:\n"
+    "/search_quarter 0090247 - все участки квартала\n"
+    "/search_quarter 50:28:0090247 - квартал в районе 50:28\n"
+    "/search_quarter 50:28 - весь район\n"
+    "/search_quarter 50:28:0090240..0090250 - диапазон кварталов\n"
+    "/search_quarter 50:28:0090247:100..200 - участки с 100 по 200"
+)
+
+# Части запроса /search_quarter с длиной, как в кадастровом номере (см. parse_cadastral_number):
+# регион и район - одно число, квартал и участок - число или диапазон "С..ПО"
+_district_part = re.compile(r"(\d{1,2})")
+_quarter_part = re.compile(rf"(\d{{1,{CADASTRAL_QUARTER_DIGITS}}})(?:\.\.(\d{{1,{CADASTRAL_QUARTER_DIGITS}}}))?")
+_parcel_part = re.compile(r"(\d{1,6})(?:\.\.(\d{1,6}))?")
+# Шаблоны частей по их числу в запросе
+CADASTRAL_QUERY_PARTS = {
+    1: (_quarter_part,),
+    2: (_district_part, _district_part),
+    3: (_district_part, _district_part, _quarter_part),
+    4: (_district_part, _district_part, _quarter_part, _parcel_part),
+}
+
 
 class SearchStates(StatesGroup):
     """Состояния для поиска."""
@@ -51,10 +83,6 @@ def format_user_info(user: dict) -> str:
 @router.message(Command("search"))
 async def cmd_search(message: Message, state: FSMContext):
     """Команда для начала поиска."""
-    if not is_admin(message.from_user.id):
-        await message.answer("❌ У вас нет прав для выполнения этой команды.")
-        return
-    
     await state.set_state(SearchStates.waiting_for_query)
     await message.answer(
         "🔍 <b>Поиск пользователей</b>\n\n"
@@ -65,7 +93,8 @@ async def cmd_search(message: Message, state: FSMContext):
         "Или используйте команды:\n"
         "/search_plot [номер участка]\n"
         "/search_phone [номер телефона]\n"
-        "/search_name [ФИО]",
+        "/search_name [ФИО]\n"
+        "/search_quarter [кадастровый квартал]",
         parse_mode=ParseMode.HTML
     )
 
@@ -73,10 +102,6 @@ async def cmd_search(message: Message, state: FSMContext):
 @router.message(Command("search_plot"))
 async def cmd_search_plot(message: Message):
     """Поиск по номеру участка."""
-    if not is_admin(message.from_user.id):
-        await message.answer("❌ У вас нет прав для выполнения этой команды.")
-        return
-    
     args = message.text.split(maxsplit=1)
     if len(args) < 2:
         await message.answer(
@@ -93,7 +118,7 @@ async def cmd_search_plot(message: Message):
         await message.answer(f"❌ {error_msg}")
         return
     
-    users = await search_by_plot_number(sanitized)
+    users = await search_cache.search("plot", sanitized)
     
     if not users:
         await message.answer(f"❌ Пользователи с номером участка '{plot_number}' не найдены.")
@@ -128,15 +153,11 @@ async def cmd_search_plot(message: Message):
 @router.message(Command("search_phone"))
 async def cmd_search_phone(message: Message):
     """Поиск по номеру телефона."""
-    if not is_admin(message.from_user.id):
-        await message.answer("❌ У вас нет прав для выполнения этой команды.")
-        return
-    
     args = message.text.split(maxsplit=1)
     if len(args) < 2:
         await message.answer(
-            "❌ Укажите номер телефона для поиска.\n"
-            "Пример: /search_phone +79001234567"
+            "❌ Укажите номер телефона или его последние 4-7 цифр.\n"
+            "Пример: /search_phone +79001234567 или /search_phone 4567"
         )
         return
     
@@ -148,7 +169,7 @@ async def cmd_search_phone(message: Message):
         await message.answer(f"❌ {error_msg}")
         return
     
-    users = await search_by_phone(sanitized)
+    users = await search_cache.search("phone", sanitized)
     
     if not users:
         await message.answer(f"❌ Пользователи с номером телефона '{phone}' не найдены.")
@@ -183,10 +204,6 @@ async def cmd_search_phone(message: Message):
 @router.message(Command("search_name"))
 async def cmd_search_name(message: Message):
     """Поиск по ФИО."""
-    if not is_admin(message.from_user.id):
-        await message.answer("❌ У вас нет прав для выполнения этой команды.")
-        return
-    
     args = message.text.split(maxsplit=1)
     if len(args) < 2:
         await message.answer(
@@ -203,9 +220,14 @@ async def cmd_search_name(message: Message):
         await message.answer(f"❌ {error_msg}")
         return
     
-    users = await search_by_full_name(sanitized)
+    users = await search_cache.search("name", sanitized)
     
     if not users:
+        # Опечатка или ФИО латиницей: предлагаем похожие
+        similar = await find_similar_users(sanitized)
+        if similar:
+            await message.answer(format_similar_users(similar), parse_mode=ParseMode.HTML)
+            return
         await message.answer(f"❌ Пользователи с ФИО '{full_name}' не найдены.")
         return
     
@@ -235,14 +257,82 @@ async def cmd_search_name(message: Message):
                     logger.error(f"Ошибка при отправке документа: {e}")
 
 
+def parse_cadastral_query(text: Optional[str]) -> dict:
+    """
+    Разобрать запрос /search_quarter в аргументы database.search_by_cadastral.
+    
+    Формы: "квартал", "регион:район", "регион:район:квартал",
+    "регион:район:квартал:участок"; квартал и участок могут быть
+    диапазоном "С..ПО". Некорректный запрос вызывает ValueError.
+    """
+    parts = [part.strip() for part in (text or "").split(":")]
+    patterns = CADASTRAL_QUERY_PARTS.get(len(parts), ())
+    matches = [pattern.fullmatch(part) for pattern, part in zip(patterns, parts)]
+    if not matches or not all(matches):
+        raise ValueError(text)
+    # (начало, конец) каждой части; у одиночного значения они совпадают
+    bounds = [(match.group(1), match.groups()[-1] or match.group(1)) for match in matches]
+    
+    options = {}
+    if len(bounds) == 1:
+        quarter = bounds[0]
+    else:
+        options.update(region=int(bounds[0][0]), district=int(bounds[1][0]))
+        quarter = bounds[2] if len(bounds) > 2 else None
+    if quarter:
+        options["quarter_from"] = quarter[0].zfill(CADASTRAL_QUARTER_DIGITS)
+        options["quarter_to"] = quarter[1].zfill(CADASTRAL_QUARTER_DIGITS)
+    if len(bounds) == 4:
+        options["parcel_from"], options["parcel_to"] = int(bounds[3][0]), int(bounds[3][1])
+    return options
+
+
+def format_plot_list(users: list) -> list:
+    """Короткие строки "участок - ФИО, телефон", собранные в сообщения до MESSAGE_LIMIT символов."""
+    status_emoji = {"pending": "⏳", "approved": "✅", "rejected": "❌"}
+    messages, current = [], ""
+    for user in users:
+        line = (
+            f"{status_emoji.get(user['status'], '❓')} {html.escape(html.unescape(user['plot_number']))} - "
+            f"{html.escape(html.unescape(user['full_name']))}, {user['phone']} (ID {user['telegram_id']})\n"
+        )
+        if len(current) + len(line) > MESSAGE_LIMIT:
+            messages.append(current)
+            current = ""
+        current += line
+    if current:
+        messages.append(current)
+    return messages
+
+
+@router.message(Command("search_quarter"))
+async def cmd_search_quarter(message: Message, command: CommandObject):
+    """Поиск по кадастровому кварталу, району или диапазону участков."""
+    try:
+        options = parse_cadastral_query(command.args)
+        users = await search_by_cadastral(**options, limit=QUARTER_LIST_LIMIT + 1)
+    except (ValueError, OverflowError):
+        await message.answer(QUARTER_USAGE)
+        return
+    
+    if not users:
+        await message.answer(f"❌ Участки по запросу '{html.escape(command.args)}' не найдены.")
+        return
+    
+    header = f"📋 <b>Найдено пользователей: {min(len(users), QUARTER_LIST_LIMIT)}</b>"
+    if len(users) > QUARTER_LIST_LIMIT:
+        header = f"📋 <b>Показаны первые {QUARTER_LIST_LIMIT} пользователей</b>, уточните запрос"
+    await message.answer(header, parse_mode=ParseMode.HTML)
+    
+    for text in format_plot_list(users[:QUARTER_LIST_LIMIT]):
+        await message.answer(text, parse_mode=ParseMode.HTML)
+    
+    logger.info(f"Админ {message.from_user.id} искал по кадастровому запросу {options}")
+
+
 @router.message(StateFilter(SearchStates.waiting_for_query))
 async def process_search_query(message: Message, state: FSMContext):
     """Обработка запроса поиска (универсальный поиск)."""
-    if not is_admin(message.from_user.id):
-        await message.answer("❌ У вас нет прав для выполнения этой команды.")
-        await state.clear()
-        return
-    
     query = message.text.strip()
     
     if not query:
@@ -257,9 +347,9 @@ async def process_search_query(message: Message, state: FSMContext):
         return
     
     # Пробуем найти по всем критериям
-    results_plot = await search_by_plot_number(sanitized)
-    results_phone = await search_by_phone(sanitized)
-    results_name = await search_by_full_name(sanitized)
+    results_plot = await search_cache.search("plot", sanitized)
+    results_phone = await search_cache.search("phone", sanitized)
+    results_name = await search_cache.search("name", sanitized)
     
     # Объединяем результаты, убирая дубликаты
     all_results = {}
@@ -269,6 +359,11 @@ async def process_search_query(message: Message, state: FSMContext):
     users = list(all_results.values())
     
     if not users:
+        similar = await find_similar_users(sanitized)
+        if similar:
+            await message.answer(format_similar_users(similar), parse_mode=ParseMode.HTML)
+            await state.clear()
+            return
         await message.answer(
             f"❌ По запросу '{query}' ничего не найдено.\n\n"
             "Попробуйте использовать команды:\n"
@@ -1,12 +1,18 @@
 """Обработчики статистики и управления пользователями."""
 from aiogram import Router, Bot, F
-from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
-from aiogram.filters import Command
+from aiogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery, FSInputFile
+from aiogram.filters import Command, CommandObject
 from aiogram.enums import ParseMode
 import logging
+import os
+import re
+import tempfile
+from datetime import date, datetime, timedelta
+from typing import Optional
 
-from config import is_admin, GROUP_ID
-from database import get_statistics, get_all_users, get_user_by_telegram_id
+from config import GROUP_ID
+from database import get_statistics, get_all_users, get_user_by_telegram_id, iter_users
+from export import write_csv, write_xlsx, xlsx_available
 
 logger = logging.getLogger(__name__)
 router = Router()
@@ -15,10 +21,6 @@ router = Router()
 @router.message(Command("stats"))
 async def cmd_stats(message: Message):
     """Показать статистику пользователей."""
-    if not is_admin(message.from_user.id):
-        await message.answer("❌ У вас нет прав для выполнения этой команды.")
-        return
-    
     try:
         stats = await get_statistics()
         
@@ -41,10 +43,6 @@ async def cmd_stats(message: Message):
 @router.message(Command("list_users"))
 async def cmd_list_users(message: Message):
     """Показать список всех пользователей."""
-    if not is_admin(message.from_user.id):
-        await message.answer("❌ У вас нет прав для выполнения этой команды.")
-        return
-    
     try:
         users = await get_all_users()
         
@@ -54,7 +52,8 @@ async def cmd_list_users(message: Message):
         
         await message.answer(
             f"📋 <b>Всего пользователей: {len(users)}</b>\n\n"
-            "Используйте /remove_user [telegram_id] для удаления пользователя из группы.",
+            "Используйте /remove_user [telegram_id] для удаления пользователя из группы.\n"
+            "Весь список одним файлом: /export",
             parse_mode=ParseMode.HTML
         )
         
@@ -85,10 +84,6 @@ async def cmd_list_users(message: Message):
 @router.message(Command("remove_user"))
 async def cmd_remove_user(message: Message, bot: Bot):
     """Удалить пользователя из группы."""
-    if not is_admin(message.from_user.id):
-        await message.answer("❌ У вас нет прав для выполнения этой команды.")
-        return
-    
     try:
         args = message.text.split(maxsplit=1)
         if len(args) < 2:
@@ -174,3 +169,79 @@ async def cmd_remove_user(message: Message, bot: Bot):
         logger.error(f"Ошибка при обработке команды удаления: {e}", exc_info=True)
         await message.answer("❌ Произошла ошибка при обработке команды.")
 
+
+
+EXPORT_STATUSES = {"pending", "approved", "rejected"}
+EXPORT_USAGE = (
+    "📤 <b>Выгрузка пользователей</b>\n\n"
+    "/export [csv|xlsx] [pending|approved|rejected] [ГГГГ-ММ-ДД[..ГГГГ-ММ-ДД]]\n\n"
+    "Примеры:\n"
+    "/export\n"
+    "/export xlsx approved\n"
+    "/export pending 2024-05-01..2024-06-01"
+)
+_date_range = re.compile(r"^(\d{4}-\d{2}-\d{2})(?:\.\.(\d{4}-\d{2}-\d{2}))?$")
+
+
+def parse_export_args(args: Optional[str]) -> dict:
+    """
+    Разобрать аргументы /export в любом порядке.
+    
+    Одна дата - выгрузка с этого дня, диапазон "С..ПО" включает оба дня.
+    Некорректный аргумент вызывает ValueError.
+    """
+    options = {"format": "csv", "status": None, "since": None, "until": None}
+    for arg in (args or "").lower().split():
+        if arg in ("csv", "xlsx"):
+            options["format"] = arg
+        elif arg in EXPORT_STATUSES:
+            options["status"] = arg
+        elif match := _date_range.match(arg):
+            since = date.fromisoformat(match.group(1))
+            options["since"] = since.isoformat()
+            if match.group(2):
+                until = date.fromisoformat(match.group(2)) + timedelta(days=1)
+                options["until"] = until.isoformat()
+        else:
+            raise ValueError(arg)
+    return options
+
+
+@router.message(Command("export"))
+async def cmd_export(message: Message, command: CommandObject):
+    """Выгрузить пользователей одним файлом CSV или XLSX."""
+    try:
+        options = parse_export_args(command.args)
+    except ValueError:
+        await message.answer(EXPORT_USAGE, parse_mode=ParseMode.HTML)
+        return
+    
+    if options["format"] == "xlsx" and not xlsx_available():
+        options["format"] = "csv"
+        await message.answer("⚠️ XLSX недоступен (не установлен openpyxl), выгружаю в CSV.")
+    
+    extension = options["format"]
+    fd, path = tempfile.mkstemp(prefix="export_", suffix=f".{extension}")
+    os.close(fd)
+    try:
+        await message.answer("⏳ Готовлю выгрузку...")
+        batches = iter_users(options["status"], options["since"], options["until"])
+        writer = write_xlsx if extension == "xlsx" else write_csv
+        count = await writer(path, batches)
+        
+        if not count:
+            await message.answer("📋 Пользователи по заданным условиям не найдены.")
+            return
+        
+        filename = f"users_{datetime.now():%Y%m%d_%H%M}.{extension}"
+        await message.answer_document(
+            FSInputFile(path, filename=filename),
+            caption=f"📤 Пользователей в выгрузке: {count}"
+        )
+        logger.info(f"Админ {message.from_user.id} выгрузил {count} пользователей ({options})")
+        
+    except Exception as e:
+        logger.error(f"Ошибка при выгрузке пользователей: {e}", exc_info=True)
+        await message.answer("❌ Произошла ошибка при выгрузке пользователей.")
+    finally:
+        os.remove(path)
@@ -0,0 +1,89 @@
+"""Настройка логирования без блокировки event loop."""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+from datetime import datetime, timezone
+from typing import List
+
+from config import (
+    LOG_FILE, LOG_LEVEL, LOG_LEVELS, LOG_FORMAT_JSON,
+    LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_ROTATE_WHEN
+)
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+_listeners: List[logging.handlers.QueueListener] = []
+
+
+class JsonFormatter(logging.Formatter):
+    """Форматирует запись лога в одну JSON-строку."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            data["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+def queue_handler(*handlers: logging.Handler) -> logging.handlers.QueueHandler:
+    """
+    Обернуть обработчики в очередь.
+
+    Логгер только кладет запись в очередь, а запись на диск и в консоль
+    выполняет отдельный поток QueueListener.
+    """
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
+    return logging.handlers.QueueHandler(log_queue)
+
+
+def stop_logging():
+    """Дописать оставшиеся в очередях записи и остановить потоки логирования."""
+    while _listeners:
+        _listeners.pop().stop()
+
+
+def _file_handler(path: str) -> logging.Handler:
+    """Файловый обработчик с ротацией по времени (LOG_ROTATE_WHEN) или по размеру."""
+    if LOG_ROTATE_WHEN:
+        return logging.handlers.TimedRotatingFileHandler(
+            path, when=LOG_ROTATE_WHEN, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+        )
+    return logging.handlers.RotatingFileHandler(
+        path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+    )
+
+
+def _apply_module_levels(levels: str):
+    """Выставить уровни отдельных логгеров: "aiogram=WARNING,handlers.search=DEBUG"."""
+    for item in levels.split(","):
+        name, sep, level = item.partition("=")
+        if not sep or not name.strip():
+            continue
+        logging.getLogger(name.strip()).setLevel(level.strip().upper())
+
+
+def setup_logging():
+    """Настроить логирование: файл с ротацией и консоль через очередь."""
+    formatter = JsonFormatter() if LOG_FORMAT_JSON else logging.Formatter(LOG_FORMAT)
+
+    file_handler = _file_handler(LOG_FILE)
+    stream_handler = logging.StreamHandler()
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler(file_handler, stream_handler)]
+    root.setLevel(LOG_LEVEL)
+    _apply_module_levels(LOG_LEVELS)
+
+    atexit.register(stop_logging)
@@ -1,46 +1,164 @@
 """Главный файл для запуска бота."""
 import asyncio
 import logging
-from aiogram import Bot, Dispatcher
+from typing import Optional
+
+from aiogram import Bot, Dispatcher, Router
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.fsm.storage.memory import MemoryStorage
 
-from config import BOT_TOKEN
+from config import (
+    BOT_TOKEN, TELEGRAM_API_URL, MAX_CONCURRENT_UPDATES, SHED_QUEUE_THRESHOLD, METRICS_HOST, METRICS_PORT,
+    TRACE_SLOW_THRESHOLD, TRACE_FILE, LOOP_WATCHDOG_INTERVAL, LOOP_BLOCK_THRESHOLD,
+    RECORD_UPDATES_FILE, RECORD_SALT, DOCUMENT_CACHE_DIR, DOCUMENT_CACHE_MAX_BYTES, REGISTRY_INDEX,
+    DIGEST_CHECK_INTERVAL, DIGEST_RETENTION_DAYS, CHANGES_PURGE_INTERVAL, CHANGES_RETENTION_DAYS
+)
+from changes import ChangeLogCleaner
 from database import init_db
-from handlers import start, registration, admin, search, admin_menu, stats
-
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('bot.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
+from documents import DocumentCache, DocumentDownloader
+from handlers import (
+    start, registration, admin, search, inline_search, admin_menu, stats, admin_manage, health, owner_register,
+    digest
 )
+from metrics import UPDATES_IN_FLIGHT, UPDATES_WAITING, FSM_SESSIONS, start_metrics_server
+from middlewares.admin import AdminGateMiddleware
+from middlewares.concurrency import ConcurrencyMiddleware
+from middlewares.metrics import (
+    UpdateMetricsMiddleware, HandlerMetricsMiddleware, BotApiMetricsMiddleware
+)
+from middlewares.recording import RecordingMiddleware
+from middlewares.throttling import ThrottlingMiddleware
+from middlewares.tracing import TracingMiddleware
+from notifications import AdminDigest
+from recording import UpdateRecorder, setup_update_recording
+from registry_index import registry_index
+from tracing import Tracer, setup_trace_log
+from logging_config import setup_logging, stop_logging
+from watchdog import LoopWatchdog
+
 logger = logging.getLogger(__name__)
 
 
+def create_dispatcher(tracer: Optional[Tracer] = None, recorder: Optional[UpdateRecorder] = None) -> Dispatcher:
+    """
+    Создать диспетчер с middleware и роутерами.
+    
+    `tracer` позволяет подменить сборщик трасс (например, в нагрузочном тесте),
+    `recorder` включает запись входящих апдейтов.
+    """
+    dp = Dispatcher()
+    
+    # Запись стоит перед всеми middleware, чтобы сохранялись и отброшенные апдейты
+    if recorder is not None:
+        dp.update.outer_middleware(RecordingMiddleware(recorder))
+    
+    # Трассировка подключается первой, чтобы учитывать и ожидание в очереди
+    dp.update.outer_middleware(TracingMiddleware(tracer or Tracer(TRACE_SLOW_THRESHOLD)))
+    
+    # Метрики: счетчик апдейтов и время хендлеров всех роутеров
+    dp.update.outer_middleware(UpdateMetricsMiddleware())
+    handler_metrics = HandlerMetricsMiddleware()
+    for event_name, observer in dp.observers.items():
+        if event_name not in ("update", "error"):
+            observer.middleware(handler_metrics)
+    
+    # Защита от флуда: лишние апдейты отбрасываются до постановки в очередь
+    dp.update.outer_middleware(ThrottlingMiddleware())
+    
+    # Апдейты одного пользователя обрабатываются по очереди, общее число ограничено,
+    # апдейты админов и нажатия кнопок обслуживаются в первую очередь
+    concurrency = ConcurrencyMiddleware(MAX_CONCURRENT_UPDATES, SHED_QUEUE_THRESHOLD)
+    dp.update.outer_middleware(concurrency)
+    dp["concurrency"] = concurrency
+    UPDATES_IN_FLIGHT.set_function(lambda: concurrency.in_flight)
+    UPDATES_WAITING.set_function(lambda: concurrency.waiting)
+    if isinstance(dp.storage, MemoryStorage):
+        storage = dp.storage.storage
+        FSM_SESSIONS.set_function(lambda: sum(1 for record in storage.values() if record.state))
+    
+    # Админские роутеры объединены под одной проверкой прав и подключены последними,
+    # чтобы сообщения жильцов не проходили через их фильтры
+    admin_router = Router(name="admin")
+    admin_gate = AdminGateMiddleware(admin_router)
+    admin_router.message.outer_middleware(admin_gate)
+    admin_router.callback_query.outer_middleware(admin_gate)
+    admin_router.inline_query.outer_middleware(admin_gate)
+    admin_router.include_routers(
+        admin.router,
+        search.router,
+        inline_search.router,
+        admin_menu.router,
+        stats.router,
+        admin_manage.router,
+        owner_register.router,
+        digest.router,
+        health.router
+    )
+    
+    # Регистрация роутеров
+    dp.include_router(start.router)
+    dp.include_router(registration.router)
+    dp.include_router(admin_router)
+    
+    return dp
+
+
 async def main():
     """Главная функция запуска бота."""
     # Инициализация бота и диспетчера
+    session = None
+    if TELEGRAM_API_URL:
+        session = AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL))
+        logger.info(f"Используется Bot API по адресу {TELEGRAM_API_URL}")
     bot = Bot(
         token=BOT_TOKEN,
+        session=session,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML)
     )
-    dp = Dispatcher()
-    
-    # Регистрация роутеров
-    dp.include_router(start.router)
-    dp.include_router(registration.router)
-    dp.include_router(admin.router)
-    dp.include_router(search.router)
-    dp.include_router(admin_menu.router)
-    dp.include_router(stats.router)
+    bot.session.middleware(BotApiMetricsMiddleware())
+    setup_trace_log(TRACE_FILE)
+    recorder = None
+    if RECORD_UPDATES_FILE:
+        # Кнопки меню админа не содержат персональных данных и нужны для воспроизведения
+        recorder = setup_update_recording(RECORD_UPDATES_FILE, RECORD_SALT, keep_texts=admin_menu.MENU_BUTTONS)
+    dp = create_dispatcher(recorder=recorder)
     
     # Инициализация базы данных
     await init_db()
     logger.info("База данных инициализирована")
+    await admin_manage.reload_admins()
+    if REGISTRY_INDEX:
+        await registry_index.load()
+    
+    watchdog = LoopWatchdog(LOOP_WATCHDOG_INTERVAL, LOOP_BLOCK_THRESHOLD)
+    watchdog.start()
+    dp["watchdog"] = watchdog
+    
+    # Фоновое скачивание документов заявок в локальный кеш
+    documents = None
+    if DOCUMENT_CACHE_DIR:
+        cache = DocumentCache(DOCUMENT_CACHE_DIR, DOCUMENT_CACHE_MAX_BYTES)
+        await cache.load()
+        documents = DocumentDownloader(bot, cache)
+        documents.start()
+        dp["documents"] = documents
+    
+    # Сводки заявок для админов, включивших их командой /digest
+    admin_digest = AdminDigest(bot, DIGEST_CHECK_INTERVAL, DIGEST_RETENTION_DAYS)
+    await admin_digest.load()
+    admin_digest.start()
+    dp["digest"] = admin_digest
+    
+    # Очистка журнала изменений, который ведут триггеры users
+    change_log_cleaner = ChangeLogCleaner(CHANGES_PURGE_INTERVAL, CHANGES_RETENTION_DAYS)
+    change_log_cleaner.start()
+    
+    metrics_runner = None
+    if METRICS_PORT:
+        metrics_runner = await start_metrics_server(METRICS_HOST, METRICS_PORT)
     
     # Запуск бота
     logger.info("Бот запущен")
@@ -49,12 +167,23 @@ async def main():
     except Exception as e:
         logger.error(f"Ошибка при работе бота: {e}", exc_info=True)
     finally:
+        await watchdog.stop()
+        await admin_digest.stop()
+        await change_log_cleaner.stop()
+        if documents:
+            await documents.stop()
+        if metrics_runner:
+            await metrics_runner.cleanup()
         await bot.session.close()
 
 
 if __name__ == "__main__":
+    # Логи пишутся в файл и консоль из отдельного потока, хендлеры не ждут диска
+    setup_logging()
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
         logger.info("Бот остановлен пользователем")
+    finally:
+        stop_logging()
 
@@ -0,0 +1,313 @@
+"""Метрики бота в текстовом формате Prometheus."""
+import functools
+import logging
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from aiohttp import web
+
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм задержек (секунды)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """Базовый класс метрики с метками."""
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        """Отрисовать метрику в текстовом формате Prometheus."""
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+            *self._samples(),
+        ]
+
+
+class Counter(_Metric):
+    """Монотонно растущий счетчик."""
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, value: float = 1, **labels: str):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + value
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+            for key, value in self._values.items()
+        ]
+
+
+class Gauge(_Metric):
+    """
+    Текущее значение.
+
+    Значение можно выставлять вручную (`set`, `inc`, `dec`) или задать функцию,
+    которая вычисляет его в момент сбора метрик.
+    """
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        function: Optional[Callable[[], float]] = None
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._function = function
+
+    def set_function(self, function: Callable[[], float]):
+        self._function = function
+
+    def set(self, value: float, **labels: str):
+        self._values[self._key(labels)] = value
+
+    def inc(self, value: float = 1, **labels: str):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + value
+
+    def dec(self, value: float = 1, **labels: str):
+        self.inc(-value, **labels)
+
+    def get(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        if self._function is not None:
+            try:
+                self._values[()] = float(self._function())
+            except Exception as e:
+                logger.error(f"Ошибка при вычислении метрики {self.name}: {e}")
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+            for key, value in self._values.items()
+        ]
+
+
+class Histogram(_Metric):
+    """Гистограмма значений (обычно задержек в секундах)."""
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # метки -> [счетчики по корзинам..., сумма, количество]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        row = self._values.get(key)
+        if row is None:
+            row = self._values[key] = [0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                row[i] += 1
+        row[-2] += value
+        row[-1] += 1
+
+    def get_count(self, **labels: str) -> float:
+        row = self._values.get(self._key(labels))
+        return row[-1] if row else 0
+
+    def get_sum(self, **labels: str) -> float:
+        row = self._values.get(self._key(labels))
+        return row[-2] if row else 0.0
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, row in self._values.items():
+            for bound, count in zip(self.buckets, row):
+                labels = _format_labels(self.labelnames, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {row[-1]}")
+            plain = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{plain} {row[-2]}")
+            lines.append(f"{self.name}_count{plain} {row[-1]}")
+        return lines
+
+
+class Registry:
+    """Набор метрик, отдаваемых по HTTP."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Метрика {metric.name} уже зарегистрирована")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# Апдейты и хендлеры
+UPDATES_TOTAL = REGISTRY.register(Counter(
+    "bot_updates_total", "Обработанные апдейты по типу", ["type"]
+))
+HANDLER_SECONDS = REGISTRY.register(Histogram(
+    "bot_handler_seconds", "Время выполнения хендлеров", ["handler", "router"]
+))
+HANDLER_ERRORS = REGISTRY.register(Counter(
+    "bot_handler_errors_total", "Исключения в хендлерах", ["handler", "router"]
+))
+QUEUE_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "bot_update_queue_wait_seconds", "Ожидание апдейта в очереди перед обработкой"
+))
+UPDATES_IN_FLIGHT = REGISTRY.register(Gauge(
+    "bot_updates_in_flight", "Апдейты, обрабатываемые сейчас"
+))
+UPDATES_WAITING = REGISTRY.register(Gauge(
+    "bot_updates_waiting", "Апдейты, ожидающие в очереди"
+))
+UPDATES_SHED = REGISTRY.register(Counter(
+    "bot_updates_shed_total", "Апдейты, отброшенные при перегрузке", ["reason"]
+))
+UPDATES_THROTTLED = REGISTRY.register(Counter(
+    "bot_updates_throttled_total", "Апдейты, отброшенные защитой от флуда", ["key"]
+))
+FSM_SESSIONS = REGISTRY.register(Gauge(
+    "bot_fsm_sessions", "Пользователи в незавершенном FSM-сценарии"
+))
+
+# Event loop
+LOOP_LAG = REGISTRY.register(Gauge(
+    "bot_event_loop_lag_seconds", "Последняя измеренная задержка event loop"
+))
+LOOP_LAG_SECONDS = REGISTRY.register(Histogram(
+    "bot_event_loop_lag_histogram_seconds", "Распределение задержки event loop"
+))
+LOOP_BLOCKS = REGISTRY.register(Counter(
+    "bot_event_loop_blocks_total", "Случаи блокировки event loop дольше порога"
+))
+
+# База данных
+DB_QUERY_SECONDS = REGISTRY.register(Histogram(
+    "bot_db_query_seconds", "Время выполнения функций database.py", ["function"]
+))
+DB_QUERY_ERRORS = REGISTRY.register(Counter(
+    "bot_db_query_errors_total", "Ошибки функций database.py", ["function"]
+))
+QUERY_CACHE_REQUESTS = REGISTRY.register(Counter(
+    "bot_query_cache_requests_total", "Обращения к кешам результатов поиска", ["cache", "result"]
+))
+
+# Bot API
+API_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "bot_api_request_seconds", "Время запросов к Bot API", ["method"]
+))
+API_REQUEST_ERRORS = REGISTRY.register(Counter(
+    "bot_api_request_errors_total", "Ошибки запросов к Bot API", ["method", "error"]
+))
+API_REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "bot_api_requests_in_flight", "Исходящие запросы к Bot API, ожидающие ответа"
+))
+
+# Кеш документов
+DOCUMENT_CACHE_BYTES = REGISTRY.register(Gauge(
+    "bot_document_cache_bytes", "Размер документов в локальном кеше"
+))
+DOCUMENT_DOWNLOADS = REGISTRY.register(Counter(
+    "bot_document_downloads_total", "Документы, скачанные из Telegram"
+))
+DOCUMENT_DUPLICATES = REGISTRY.register(Counter(
+    "bot_document_duplicates_total", "Заявки с документом, уже прикрепленным к другой заявке", ["match"]
+))
+ADMIN_DIGESTS = REGISTRY.register(Counter(
+    "bot_admin_digests_total", "Отправленные админам сводки заявок"
+))
+ADMIN_DIGEST_ITEMS = REGISTRY.register(Counter(
+    "bot_admin_digest_items_total", "Заявки, отложенные для сводок админов"
+))
+REGISTRATION_CONFLICTS = REGISTRY.register(Counter(
+    "bot_registration_conflicts_total", "Заявки с телефоном или участком из другой заявки", ["field"]
+))
+
+
+def timed_query(func):
+    """Декоратор: учитывать время и ошибки функции работы с БД (и открыть отрезок трассы)."""
+    name = func.__name__
+    span_name = f"db.{name}"
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            with span(span_name):
+                return await func(*args, **kwargs)
+        except Exception:
+            DB_QUERY_ERRORS.inc(function=name)
+            raise
+        finally:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - started, function=name)
+
+    return wrapper
+
+
+async def _metrics_view(request: web.Request) -> web.Response:
+    return web.Response(
+        body=REGISTRY.render().encode("utf-8"),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+    )
+
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    """Запустить HTTP-сервер с метриками на /metrics."""
+    app = web.Application()
+    app.router.add_get("/metrics", _metrics_view)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    logger.info(f"Метрики доступны на http://{host}:{port}/metrics")
+    return runner
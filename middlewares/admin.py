@@ -0,0 +1,99 @@
+"""Middleware, пропускающий в роутер только админов."""
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Iterable, Optional
+
+from aiogram import BaseMiddleware, Router
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.filters import Command, StateFilter
+from aiogram.types import BotCommand
+from aiogram.types import CallbackQuery, InlineQuery, Message, TelegramObject, User
+
+from config import is_admin
+
+NO_RIGHTS_TEXT = "❌ У вас нет прав для выполнения этой команды."
+NO_RIGHTS_ACTION_TEXT = "❌ У вас нет прав для выполнения этого действия"
+
+
+def router_commands(router: Router, skip: Iterable[Router] = (), with_states: bool = True) -> FrozenSet[str]:
+    """
+    Имена команд из фильтров Command хендлеров сообщений роутера и вложенных
+    роутеров, кроме роутеров из `skip`. При with_states=False не учитываются
+    хендлеры с фильтром состояния: такие команды (например, /cancel) действуют
+    только внутри своего сценария.
+    """
+    skip = set(skip)
+    commands = set()
+    for sub_router in router.chain_tail:
+        if sub_router in skip:
+            continue
+        for handler in sub_router.message.handlers:
+            callbacks = [filter_object.callback for filter_object in handler.filters or ()]
+            if not with_states and any(isinstance(callback, StateFilter) for callback in callbacks):
+                continue
+            for callback in callbacks:
+                if isinstance(callback, Command):
+                    for command in callback.commands:
+                        if isinstance(command, BotCommand):
+                            commands.add(command.command)
+                        elif isinstance(command, str):
+                            commands.add(command)
+    return frozenset(commands)
+
+
+def admin_only_commands(router: Router) -> FrozenSet[str]:
+    """
+    Команды, которые обрабатывает только админский роутер `router`: без
+    фильтра состояния и без хендлеров с той же командой в других роутерах
+    диспетчера.
+    """
+    root = router
+    while root.parent_router is not None:
+        root = root.parent_router
+    shared = router_commands(root, skip=router.chain_tail) if root is not router else frozenset()
+    return router_commands(router, with_states=False) - shared
+
+
+class AdminGateMiddleware(BaseMiddleware):
+    """
+    Проверка прав для всего админского роутера (включая вложенные роутеры).
+
+    Для не-админов фильтры хендлеров не вычисляются вовсе: обычные сообщения
+    возвращаются как необработанные, на кнопки отвечаем отказом. Отказ на
+    команду отправляется, только если ее обрабатывает лишь админский роутер
+    `router` (см. admin_only_commands): общие с жильцами команды вроде /cancel
+    и неизвестные команды уходят дальше необработанными, на спам бот молчит.
+    """
+
+    def __init__(self, router: Optional[Router] = None):
+        self.router = router
+        # Команды собираются при первом апдейте: вложенные роутеры подключаются после middleware
+        self._commands: Optional[FrozenSet[str]] = None
+
+    def is_admin_command(self, text: str) -> bool:
+        """Текст - команда только админского роутера (/cmd или /cmd@bot_name с аргументами)."""
+        if self.router is None or not text.startswith("/"):
+            return False
+        if self._commands is None:
+            self._commands = admin_only_commands(self.router)
+        return (text[1:].split(maxsplit=1) or [""])[0].split("@", 1)[0] in self._commands
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        user: Optional[User] = data.get("event_from_user")
+        if user is not None and is_admin(user.id):
+            return await handler(event, data)
+
+        if isinstance(event, CallbackQuery):
+            await event.answer(NO_RIGHTS_ACTION_TEXT, show_alert=True)
+            return None
+        if isinstance(event, InlineQuery):
+            # Пустой ответ, иначе клиент не-админа будет ждать результатов до таймаута
+            await event.answer([], cache_time=300, is_personal=True)
+            return None
+        if isinstance(event, Message) and event.text and self.is_admin_command(event.text):
+            await event.answer(NO_RIGHTS_TEXT)
+            return None
+        return UNHANDLED
@@ -0,0 +1,170 @@
+"""Middleware для последовательной обработки апдейтов одного пользователя."""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update, User
+
+from metrics import QUEUE_WAIT_SECONDS, UPDATES_SHED
+from middlewares.scheduler import (
+    PriorityLimiter, classify_update, PRIORITY_LOW, PRIORITY_NORMAL
+)
+
+logger = logging.getLogger(__name__)
+
+# Порог ожидания в очереди, после которого пишем предупреждение в лог (секунды)
+SLOW_QUEUE_WAIT = 1.0
+
+
+class ConcurrencyMiddleware(BaseMiddleware):
+    """
+    Сериализует апдейты одного пользователя и ограничивает общее число
+    одновременно выполняемых обработчиков.
+
+    Два быстрых сообщения от одного пользователя обрабатываются строго по очереди,
+    поэтому `state.update_data` и `set_state` не гоняются друг с другом.
+    Время ожидания в очереди передается в обработчики как `queue_wait`.
+
+    Свободные слоты в первую очередь получают апдейты админов и нажатия кнопок.
+    Когда очередь длиннее `shed_threshold`, малоценные апдейты (повторный /start)
+    отбрасываются, а при двойном превышении порога отбрасываются все такие апдейты.
+    """
+
+    def __init__(self, max_concurrent: int = 50, shed_threshold: int = 100):
+        self.max_concurrent = max_concurrent
+        self.shed_threshold = shed_threshold
+        self._limiter = PriorityLimiter(max_concurrent)
+        # Блокировки по пользователям и число апдейтов, которые их держат или ждут
+        self._user_locks: Dict[int, asyncio.Lock] = {}
+        self._user_waiters: Dict[int, int] = {}
+        self._in_flight = 0
+        self._waiting = 0
+        # Статистика ожидания в очереди
+        self.processed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        # Отброшенные апдейты по причинам
+        self.shed: Dict[str, int] = {}
+
+    @property
+    def in_flight(self) -> int:
+        """Количество выполняющихся сейчас обработчиков."""
+        return self._in_flight
+
+    @property
+    def waiting(self) -> int:
+        """Количество апдейтов, ожидающих своей очереди."""
+        return self._waiting
+
+    def stats(self) -> Dict[str, Any]:
+        """Получить статистику очереди."""
+        return {
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "users": len(self._user_locks),
+            "processed": self.processed,
+            "avg_wait": self.total_wait / self.processed if self.processed else 0.0,
+            "max_wait": self.max_wait,
+            "shed": dict(self.shed),
+        }
+
+    def _shed_reason(self, priority: int, user: Optional[User]) -> Optional[str]:
+        """Решить, нужно ли отбросить апдейт, и вернуть причину."""
+        if priority != PRIORITY_LOW or self._waiting < self.shed_threshold:
+            return None
+        if user is not None and user.id in self._user_waiters:
+            return "repeated_start"
+        if self._waiting >= self.shed_threshold * 2:
+            return "overload"
+        return None
+
+    def _record_shed(self, reason: str, user: Optional[User]):
+        UPDATES_SHED.inc(reason=reason)
+        count = self.shed.get(reason, 0) + 1
+        self.shed[reason] = count
+        # Пишем в лог первый случай и затем каждый сотый, чтобы не засорять лог под нагрузкой
+        if count == 1 or count % 100 == 0:
+            logger.warning(
+                f"Апдейт отброшен ({reason}) от пользователя {user.id if user else None}, "
+                f"в очереди: {self._waiting}, всего отброшено по причине: {count}"
+            )
+
+    def _acquire_user_lock(self, user_id: int) -> asyncio.Lock:
+        lock = self._user_locks.get(user_id)
+        if lock is None:
+            lock = self._user_locks[user_id] = asyncio.Lock()
+        self._user_waiters[user_id] = self._user_waiters.get(user_id, 0) + 1
+        return lock
+
+    def _release_user_lock(self, user_id: int):
+        # Удаляем блокировку, когда ее больше никто не ждет, чтобы словарь не рос бесконечно
+        left = self._user_waiters[user_id] - 1
+        if left:
+            self._user_waiters[user_id] = left
+        else:
+            del self._user_waiters[user_id]
+            del self._user_locks[user_id]
+
+    def _record_wait(self, wait: float):
+        QUEUE_WAIT_SECONDS.observe(wait)
+        self.processed += 1
+        self.total_wait += wait
+        if wait > self.max_wait:
+            self.max_wait = wait
+        if wait > SLOW_QUEUE_WAIT:
+            logger.warning(f"Апдейт ждал в очереди {wait:.2f} с (в работе: {self._in_flight})")
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        user: Optional[User] = data.get("event_from_user")
+        priority = classify_update(event, user) if isinstance(event, Update) else PRIORITY_NORMAL
+
+        reason = self._shed_reason(priority, user)
+        if reason:
+            self._record_shed(reason, user)
+            return None
+
+        # Апдейты без пользователя ограничиваем только общим лимитом. Inline-запросы не меняют
+        # состояние и идут на каждое нажатие клавиши: очередь за блокировкой сломала бы debounce
+        locked = user is not None and not (isinstance(event, Update) and event.inline_query)
+        lock = self._acquire_user_lock(user.id) if locked else None
+        started = time.monotonic()
+        self._waiting += 1
+        queued = True
+        try:
+            if lock is not None:
+                await lock.acquire()
+            try:
+                await self._limiter.acquire(priority)
+                self._waiting -= 1
+                queued = False
+                try:
+                    wait = time.monotonic() - started
+                    self._record_wait(wait)
+                    data["queue_wait"] = wait
+                    # FSMContextMiddleware прочитал состояние до нашей блокировки: пока апдейт
+                    # ждал, предыдущий апдейт пользователя мог его сменить
+                    state = data.get("state")
+                    if lock is not None and state is not None:
+                        data["raw_state"] = await state.get_state()
+                    self._in_flight += 1
+                    try:
+                        return await handler(event, data)
+                    finally:
+                        self._in_flight -= 1
+                finally:
+                    self._limiter.release()
+            finally:
+                if lock is not None:
+                    lock.release()
+        finally:
+            if queued:
+                self._waiting -= 1
+            if locked:
+                self._release_user_lock(user.id)
@@ -0,0 +1,82 @@
+"""Middleware для сбора метрик (и отрезков трассы) апдейтов, хендлеров и запросов к Bot API."""
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.methods import Response, TelegramMethod
+from aiogram.types import TelegramObject, Update
+
+from metrics import (
+    UPDATES_TOTAL, HANDLER_SECONDS, HANDLER_ERRORS,
+    API_REQUEST_SECONDS, API_REQUEST_ERRORS, API_REQUESTS_IN_FLIGHT
+)
+from tracing import span
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Считает входящие апдейты по типу (outer middleware для dp.update)."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        if isinstance(event, Update):
+            UPDATES_TOTAL.inc(type=event.event_type)
+        return await handler(event, data)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Измеряет время хендлеров (inner middleware).
+
+    Подключается к наблюдателям диспетчера и поэтому действует на хендлеры всех
+    вложенных роутеров. Роутер в метках - модуль, в котором объявлен хендлер.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        handler_object: HandlerObject = data.get("handler")
+        callback = handler_object.callback if handler_object else handler
+        name = getattr(callback, "__name__", "unknown")
+        router = getattr(callback, "__module__", "unknown")
+
+        started = time.perf_counter()
+        try:
+            with span(f"handler.{name}", router=router):
+                return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.inc(handler=name, router=router)
+            raise
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - started, handler=name, router=router)
+
+
+class BotApiMetricsMiddleware(BaseRequestMiddleware):
+    """Измеряет задержку и ошибки запросов к Bot API по методам."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType,
+        bot,
+        method: TelegramMethod
+    ) -> Response:
+        name = method.__api_method__
+        API_REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            with span(f"api.{name}"):
+                return await make_request(bot, method)
+        except Exception as e:
+            API_REQUEST_ERRORS.inc(method=name, error=type(e).__name__)
+            raise
+        finally:
+            API_REQUEST_SECONDS.observe(time.perf_counter() - started, method=name)
+            API_REQUESTS_IN_FLIGHT.dec()
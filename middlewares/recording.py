@@ -0,0 +1,34 @@
+"""Middleware записи входящих апдейтов."""
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update, User
+
+from config import is_admin
+from recording import UpdateRecorder
+
+
+class RecordingMiddleware(BaseMiddleware):
+    """
+    Сохраняет каждый входящий апдейт (outer middleware для dp.update).
+
+    Подключается до защиты от флуда и очереди, чтобы в запись попадал весь
+    входящий трафик, включая отброшенные апдейты.
+    """
+
+    def __init__(self, recorder: UpdateRecorder):
+        self.recorder = recorder
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        if isinstance(event, Update):
+            user: Optional[User] = data.get("event_from_user")
+            self.recorder.record(
+                event.model_dump(mode="json", exclude_none=True, by_alias=True),
+                is_admin=bool(user and is_admin(user.id))
+            )
+        return await handler(event, data)
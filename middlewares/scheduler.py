@@ -0,0 +1,73 @@
+"""Приоритетная очередь для допуска апдейтов к обработке."""
+import asyncio
+import heapq
+import itertools
+from typing import List, Optional
+
+from aiogram.types import Update, User
+
+from config import is_admin
+
+# Приоритеты апдейтов (меньше - важнее)
+PRIORITY_HIGH = 0    # Админы и нажатия inline-кнопок (модерация)
+PRIORITY_NORMAL = 1  # Обычные сообщения жильцов
+PRIORITY_LOW = 2     # Повторяемые команды, которые можно отложить или отбросить
+
+
+def classify_update(update: Update, user: Optional[User]) -> int:
+    """Определить приоритет апдейта."""
+    if update.callback_query is not None:
+        return PRIORITY_HIGH
+    if user is not None and is_admin(user.id):
+        return PRIORITY_HIGH
+    text = update.message.text if update.message is not None else None
+    if text and text.startswith("/"):
+        # /start@bot_name arg -> start; /startfoo - другая команда
+        command = (text[1:].split(maxsplit=1) or [""])[0].split("@", 1)[0].lower()
+        if command == "start":
+            return PRIORITY_LOW
+    return PRIORITY_NORMAL
+
+
+class PriorityLimiter:
+    """
+    Семафор с приоритетами: при освобождении слота его получает
+    ожидающий с наименьшим приоритетом, а при равных - пришедший раньше.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._active = 0
+        self._heap: List[list] = []
+        self._counter = itertools.count()
+
+    @property
+    def active(self) -> int:
+        """Количество занятых слотов."""
+        return self._active
+
+    async def acquire(self, priority: int = PRIORITY_NORMAL):
+        """Занять слот, дождавшись своей очереди."""
+        if self._active < self.limit and not self._heap:
+            self._active += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, [priority, next(self._counter), future])
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Слот мог быть передан нам прямо перед отменой - возвращаем его
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        """Освободить слот и передать его следующему ожидающему."""
+        while self._heap:
+            _, _, future = heapq.heappop(self._heap)
+            if not future.done():
+                # Слот переходит ожидающему, счетчик занятых не меняется
+                future.set_result(None)
+                return
+        self._active -= 1
@@ -0,0 +1,145 @@
+"""Middleware для защиты от флуда."""
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update, User
+
+from config import is_admin
+from metrics import UPDATES_THROTTLED
+
+logger = logging.getLogger(__name__)
+
+# Бюджеты по командам: (емкость корзины, пополнение токенов в секунду)
+COMMAND_BUDGETS: Dict[str, Tuple[float, float]] = {
+    "start": (3, 1 / 10),
+    "message": (10, 1.0),
+    "callback": (10, 1.0),
+}
+DEFAULT_BUDGET: Tuple[float, float] = (5, 1 / 2)
+
+# Окно, в течение которого пользователь получает не больше одного предупреждения (секунды)
+WARNING_WINDOW = 10.0
+# Как часто удалять неактивные корзины (секунды)
+EVICT_INTERVAL = 60.0
+
+SLOW_DOWN_TEXT = "⏳ Слишком много сообщений. Пожалуйста, подождите немного и попробуйте снова."
+
+
+class _Bucket:
+    """Корзина токенов одного пользователя для одной команды."""
+    __slots__ = ("tokens", "updated", "warned")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+        self.warned = 0.0
+
+
+def _throttle_key(update: Update, budgets: Dict[str, Tuple[float, float]]) -> Optional[str]:
+    """
+    Определить, по какому бюджету считать апдейт.
+
+    Отдельная корзина только у команд из `budgets`, остальные команды делят
+    одну корзину "command": иначе /a1, /a2, ... получали бы каждая свой бюджет.
+    """
+    if update.callback_query is not None:
+        return "callback"
+    message = update.message
+    if message is None:
+        return None
+    text = message.text or ""
+    if len(text) > 1 and text.startswith("/"):
+        # /start@bot_name arg -> start
+        command = (text[1:].split(maxsplit=1) or [""])[0].split("@", 1)[0].lower()
+        return command if command in budgets else "command"
+    return "message"
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """
+    Ограничивает частоту апдейтов от одного пользователя алгоритмом token bucket.
+
+    У команд из `COMMAND_BUDGETS` свой бюджет, остальные команды расходуют
+    общий бюджет по умолчанию. Апдейты сверх бюджета
+    отбрасываются до обращения к БД, а пользователь получает одно предупреждение за окно.
+    Админы не ограничиваются.
+    """
+
+    def __init__(
+        self,
+        budgets: Optional[Dict[str, Tuple[float, float]]] = None,
+        default_budget: Tuple[float, float] = DEFAULT_BUDGET
+    ):
+        self.budgets = COMMAND_BUDGETS if budgets is None else budgets
+        self.default_budget = default_budget
+        self._buckets: Dict[Tuple[int, str], _Bucket] = {}
+        self._next_eviction = time.monotonic() + EVICT_INTERVAL
+        self.throttled = 0
+
+    def _budget(self, key: str) -> Tuple[float, float]:
+        return self.budgets.get(key, self.default_budget)
+
+    def _evict(self, now: float):
+        """Удалить корзины, которые уже успели полностью пополниться."""
+        stale = []
+        for bucket_key, bucket in self._buckets.items():
+            capacity, rate = self._budget(bucket_key[1])
+            idle = now - bucket.updated
+            if bucket.tokens + idle * rate >= capacity and now - bucket.warned > WARNING_WINDOW:
+                stale.append(bucket_key)
+        for bucket_key in stale:
+            del self._buckets[bucket_key]
+        self._next_eviction = now + EVICT_INTERVAL
+
+    def _consume(self, user_id: int, key: str, now: float) -> Optional[_Bucket]:
+        """Списать токен. Возвращает корзину, если токенов не хватило."""
+        capacity, rate = self._budget(key)
+        bucket = self._buckets.get((user_id, key))
+        if bucket is None:
+            self._buckets[(user_id, key)] = _Bucket(capacity - 1, now)
+            return None
+
+        bucket.tokens = min(capacity, bucket.tokens + (now - bucket.updated) * rate)
+        bucket.updated = now
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return None
+        return bucket
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        user: Optional[User] = data.get("event_from_user")
+        if user is None or not isinstance(event, Update) or is_admin(user.id):
+            return await handler(event, data)
+
+        key = _throttle_key(event, self.budgets)
+        if key is None:
+            return await handler(event, data)
+
+        now = time.monotonic()
+        if now >= self._next_eviction:
+            self._evict(now)
+
+        bucket = self._consume(user.id, key, now)
+        if bucket is None:
+            return await handler(event, data)
+
+        self.throttled += 1
+        UPDATES_THROTTLED.inc(key=key)
+        if now - bucket.warned > WARNING_WINDOW:
+            bucket.warned = now
+            logger.warning(f"Пользователь {user.id} превысил лимит для '{key}'")
+            try:
+                if event.callback_query is not None:
+                    await event.callback_query.answer(SLOW_DOWN_TEXT)
+                else:
+                    await event.message.answer(SLOW_DOWN_TEXT)
+            except Exception as e:
+                logger.error(f"Ошибка при отправке предупреждения о флуде: {e}")
+        return None
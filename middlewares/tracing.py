@@ -0,0 +1,40 @@
+"""Middleware трассировки апдейтов."""
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update, User
+
+from tracing import Tracer
+
+
+class TracingMiddleware(BaseMiddleware):
+    """
+    Открывает корневой отрезок на каждый апдейт (outer middleware для dp.update).
+
+    Подключается первым, поэтому время трассы включает ожидание в очереди.
+    Отрезки хендлера, запросов к БД и Bot API вкладываются в него автоматически.
+    """
+
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        if not isinstance(event, Update):
+            return await handler(event, data)
+
+        user: Optional[User] = data.get("event_from_user")
+        with self.tracer.trace(
+            f"update.{event.event_type}",
+            update_id=event.update_id,
+            user_id=user.id if user else None
+        ) as root:
+            try:
+                return await handler(event, data)
+            finally:
+                if "queue_wait" in data:
+                    root.attrs["queue_wait"] = round(data["queue_wait"], 6)
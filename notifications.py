@@ -0,0 +1,212 @@
+"""Сводки заявок для админов: заявки копятся в базе и приходят одним сообщением."""
+import asyncio
+import html
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.enums import ParseMode
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+
+from callbacks import DigestCallback
+from config import get_admin_ids
+from database import (
+    get_users_by_ids, get_digest_settings, save_digest_settings, delete_digest_settings,
+    add_digest_items, get_digest_queue, get_queued_digest_items, mark_digest_sent,
+    delete_digest_items, delete_queued_digest_items, purge_sent_digest_items
+)
+from metrics import ADMIN_DIGESTS, ADMIN_DIGEST_ITEMS
+
+logger = logging.getLogger(__name__)
+
+# Заявок в одном сообщении: на каждую три кнопки, Telegram допускает до 100
+PAGE_ITEMS = 10
+# Запас до лимита Telegram в 4096 символов на сообщение
+MESSAGE_LIMIT = 4000
+
+STATUS_EMOJI = {"pending": "⏳", "approved": "✅", "rejected": "❌"}
+
+
+class AdminDigest:
+    """
+    Доставка заявок админам, включившим режим сводки (/digest).
+
+    Заявка для такого админа сразу записывается в digest_items и уходит в
+    сводке, когда их набралось max_items или самая старая ждет дольше
+    interval_minutes. Очередь проверяется раз в `check_interval` и сразу
+    после новой заявки. Очередь хранится в базе: после перезапуска бота
+    накопленные заявки не теряются, а просроченные сводки уходят при старте.
+    Если бот остановится между отправкой сводки и отметкой в базе, сводка
+    придет повторно.
+
+    Заявки, которые к моменту отправки уже рассмотрел другой админ, в сводку
+    не попадают.
+    """
+
+    def __init__(self, bot: Bot, check_interval: float, retention_days: int):
+        self.bot = bot
+        self.check_interval = check_interval
+        self.retention_days = retention_days
+        # admin_id -> (интервал в минутах, заявок в сводке)
+        self.settings: Dict[int, Tuple[int, int]] = {}
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def load(self):
+        """Загрузить настройки админов из базы."""
+        self.settings = await get_digest_settings()
+
+    def start(self):
+        """Запустить проверку очереди в текущем event loop."""
+        self._task = asyncio.create_task(self._run(), name="admin-digest")
+        logger.info(f"Сводки заявок: в режиме сводки {len(self.settings)} админов")
+
+    async def stop(self):
+        """Остановить проверку очереди; неотправленные заявки остаются в базе."""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def digest_admins(self, admin_ids: Iterable[int]) -> List[int]:
+        """Админы из списка, получающие заявки сводкой."""
+        return [admin_id for admin_id in admin_ids if admin_id in self.settings]
+
+    async def set_mode(self, admin_id: int, interval_minutes: Optional[int], max_items: int = 0):
+        """
+        Включить режим сводки или, при interval_minutes=None, вернуть
+        мгновенные уведомления (накопленные заявки уйдут последней сводкой).
+        """
+        if interval_minutes is None:
+            await delete_digest_settings(admin_id)
+            self.settings.pop(admin_id, None)
+        else:
+            await save_digest_settings(admin_id, interval_minutes, max_items)
+            self.settings[admin_id] = (interval_minutes, max_items)
+        self._wake.set()
+
+    async def enqueue(self, admin_ids: List[int], user_id: int, details: str):
+        """Отложить заявку для сводок админов; details - предупреждения к заявке (HTML)."""
+        await add_digest_items(admin_ids, user_id, details)
+        ADMIN_DIGEST_ITEMS.inc(len(admin_ids))
+        self._wake.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.flush_due()
+            except Exception as e:
+                logger.error(f"Ошибка при отправке сводок заявок: {e}", exc_info=True)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.check_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def flush_due(self):
+        """Отправить сводки, для которых набралось заявок или истек интервал."""
+        now = time.time()
+        admin_ids = get_admin_ids()
+        for admin_id, count, oldest in await get_digest_queue():
+            if admin_id not in admin_ids:
+                await delete_queued_digest_items(admin_id)
+                logger.info(f"Удалены заявки из сводки бывшего админа {admin_id}")
+                continue
+            settings = self.settings.get(admin_id)
+            # Без настроек админ вернулся к мгновенным уведомлениям: отправляем остаток сразу
+            if settings is None or count >= settings[1] or now - oldest >= settings[0] * 60:
+                await self.flush(admin_id)
+
+    async def flush(self, admin_id: int):
+        """Отправить админу все накопленные для него заявки."""
+        items = await get_queued_digest_items(admin_id)
+        users = {user["id"]: user for user in await get_users_by_ids([item["user_id"] for item in items])}
+        reviewed = {
+            item["id"] for item in items
+            if item["user_id"] not in users or users[item["user_id"]]["status"] != "pending"
+        }
+        if reviewed:
+            await delete_digest_items(list(reviewed))
+        items = [item for item in items if item["id"] not in reviewed]
+
+        for page in paginate(items, users):
+            # Кнопки сводки ссылаются на id первой заявки страницы
+            digest_id = page[0]["id"]
+            try:
+                await self.bot.send_message(
+                    admin_id,
+                    format_digest(page, users),
+                    parse_mode=ParseMode.HTML,
+                    reply_markup=digest_keyboard(digest_id, page, users)
+                )
+            except Exception as e:
+                # Остальные заявки будут отправлены при следующей проверке
+                logger.error(f"Ошибка при отправке сводки админу {admin_id}: {e}")
+                return
+            await mark_digest_sent([item["id"] for item in page], digest_id)
+            ADMIN_DIGESTS.inc()
+            logger.info(f"Админу {admin_id} отправлена сводка из {len(page)} заявок")
+
+        if items:
+            await purge_sent_digest_items(time.time() - self.retention_days * 86400)
+
+
+def format_digest_item(number: int, item: dict, user: Optional[dict]) -> str:
+    """Заявка в сводке: номер, статус, данные и предупреждения."""
+    if user is None:
+        return f"{number}. ❓ Заявка удалена"
+    text = (
+        f"{number}. {STATUS_EMOJI.get(user['status'], '❓')} <b>{html.escape(html.unescape(user['full_name']))}</b>\n"
+        f"Участок {html.escape(html.unescape(user['plot_number']))}, {user['phone']}, "
+        f"ID {user['telegram_id']}, @{user['username'] or 'не указан'}"
+    )
+    if item["details"]:
+        text += "\n" + item["details"]
+    return text
+
+
+def format_digest(items: List[dict], users: Dict[int, dict]) -> str:
+    """Текст сводки заявок."""
+    blocks = [
+        format_digest_item(number, item, users.get(item["user_id"]))
+        for number, item in enumerate(items, 1)
+    ]
+    return f"🗂 <b>Новые заявки: {len(items)}</b>\n\n" + "\n\n".join(blocks)
+
+
+def digest_keyboard(digest_id: int, items: List[dict], users: Dict[int, dict]) -> Optional[InlineKeyboardMarkup]:
+    """Кнопки нерассмотренных заявок сводки и "Одобрить все"; None - рассмотрены все."""
+    rows = []
+    for number, item in enumerate(items, 1):
+        user = users.get(item["user_id"])
+        if user is None or user["status"] != "pending":
+            continue
+        rows.append([
+            InlineKeyboardButton(
+                text=f"{emoji} {number}",
+                callback_data=DigestCallback(
+                    action=action, digest_id=digest_id, telegram_id=user["telegram_id"]
+                ).pack()
+            )
+            for emoji, action in (("✅", "approve"), ("❌", "reject"), ("📄", "doc"))
+        ])
+    if len(rows) > 1:
+        rows.append([InlineKeyboardButton(
+            text=f"✅ Одобрить все ({len(rows)})",
+            callback_data=DigestCallback(action="approve_all", digest_id=digest_id).pack()
+        )])
+    return InlineKeyboardMarkup(inline_keyboard=rows) if rows else None
+
+
+def paginate(items: List[dict], users: Dict[int, dict]) -> List[List[dict]]:
+    """Разбить заявки на сводки до PAGE_ITEMS заявок и MESSAGE_LIMIT символов."""
+    pages, page = [], []
+    for item in items:
+        if page and (len(page) == PAGE_ITEMS or len(format_digest(page + [item], users)) > MESSAGE_LIMIT):
+            pages.append(page)
+            page = []
+        page.append(item)
+    if page:
+        pages.append(page)
+    return pages
@@ -0,0 +1,158 @@
+"""Кеш результатов поиска админов с инвалидацией при записи в базу."""
+import logging
+import re
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+from config import QUERY_CACHE_SIZE
+from database import (
+    data_generation, get_users_by_ids, like_fold, search_by_plot_number, search_by_phone,
+    search_by_phone_suffix, search_by_full_name, search_users
+)
+from metrics import QUERY_CACHE_REQUESTS
+from registry_index import registry_index, KIND_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# Все созданные кеши, для /health
+CACHES: List["QueryCache"] = []
+
+# Короткий запрос из цифр при поиске по телефону - последние цифры номера
+_phone_suffix = re.compile(r"[0-9]{4,7}")
+
+
+def phone_suffix(query: str) -> Optional[str]:
+    """Цифры запроса, если это последние 4-7 цифр телефона, иначе None."""
+    digits = re.sub(r"[\s\-()]", "", query)
+    return digits if _phone_suffix.fullmatch(digits) else None
+
+
+class QueryCache:
+    """
+    LRU-кеш с инвалидацией по поколению данных.
+
+    Каждая запись пользователя в базу увеличивает database.data_generation(),
+    и при следующем обращении кеш очищается целиком. Результат, загрузка
+    которого началась до такой записи, в кеш не попадает.
+    """
+
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.size = size
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._generation = data_generation()
+        self.hits = 0
+        self.misses = 0
+        CACHES.append(self)
+
+    def _sync(self):
+        generation = data_generation()
+        if generation != self._generation:
+            self._entries.clear()
+            self._generation = generation
+
+    def _record(self, hit: bool):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        QUERY_CACHE_REQUESTS.inc(cache=self.name, result="hit" if hit else "miss")
+
+    def lookup(self, key: Hashable) -> Optional[Any]:
+        """Значение по ключу или None; обращение учитывается в статистике."""
+        self._sync()
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        self._record(value is not None)
+        return value
+
+    def store(self, key: Hashable, value: Any, generation: int):
+        """Сохранить значение, загруженное при поколении данных `generation`."""
+        self._sync()
+        if generation != self._generation:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "name": self.name,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+class SearchCache(QueryCache):
+    """
+    Кеш поиска по участку, телефону и ФИО.
+
+    Хранятся только id найденных пользователей: при попадании строки заново
+    читаются по первичному ключу вместо LIKE-сканирования таблицы. При
+    промахе поиск выполняет индекс в памяти, если он загружен.
+    """
+
+    SEARCHES = {
+        "plot": search_by_plot_number,
+        "phone": search_by_phone,
+        "phone_suffix": search_by_phone_suffix,
+        "name": search_by_full_name,
+    }
+
+    async def search(self, kind: str, query: str) -> list:
+        """
+        Результат search_by_* для вида поиска `kind` (plot, phone, name).
+
+        Поиск по телефону из 4-7 цифр ищет по окончанию номера: "4567" не
+        найдет +7 900 456-71-23.
+        """
+        if kind == "phone":
+            digits = phone_suffix(query)
+            if digits:
+                kind, query = "phone_suffix", digits
+        key = (kind, like_fold(query.strip()))
+        ids = self.lookup(key)
+        if ids is not None:
+            return await get_users_by_ids(ids)
+
+        generation = data_generation()
+        ids = None
+        if registry_index.loaded and kind in KIND_FIELDS:
+            ids = await registry_index.search(kind, query)
+        if ids is not None:
+            users = await get_users_by_ids(ids)
+        else:
+            users = await self.SEARCHES[kind](query)
+        self.store(key, [user["id"] for user in users], generation)
+        return users
+
+
+async def search_any(query: str, limit: int) -> list:
+    """
+    Поиск по ФИО, телефону или участку (индекс в памяти, если загружен, иначе search_users).
+
+    4-7 цифр, как и в поиске по телефону, - последние цифры номера: такие
+    телефоны ищутся по индексу phone_rev, участки - по подстроке.
+    """
+    digits = phone_suffix(query)
+    if digits is not None:
+        ids = await registry_index.search("plot", query) if registry_index.loaded else None
+        plots = await get_users_by_ids(ids) if ids is not None else await search_by_plot_number(query)
+        users = {user["id"]: user for user in await search_by_phone_suffix(digits) + plots}
+        return sorted(users.values(), key=lambda user: user["created_at"], reverse=True)[:limit]
+
+    ids = await registry_index.search("any", query, limit=limit) if registry_index.loaded else None
+    if ids is None:
+        return await search_users(query, limit=limit)
+    return await get_users_by_ids(ids)
+
+
+search_cache = SearchCache("search", QUERY_CACHE_SIZE)
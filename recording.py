@@ -0,0 +1,203 @@
+"""Запись входящих апдейтов со скрытыми персональными данными."""
+import gzip
+import hashlib
+import hmac
+import json
+import logging
+import os
+import re
+import time
+from typing import Any, Dict, FrozenSet, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+# Отдельный логгер для записи: одна JSON-строка на апдейт
+record_logger = logging.getLogger("updates")
+record_logger.propagate = False
+
+# Поля с числовыми идентификаторами пользователей и чатов
+ID_FIELDS = {"id", "user_id"}
+# Поля с именами: заменяются строкой той же длины и того же алфавита
+NAME_FIELDS = {"first_name", "last_name", "username", "title"}
+# Поля с произвольным текстом пользователя
+TEXT_FIELDS = {"text", "caption", "phone_number"}
+# Идентификаторы файлов
+FILE_FIELDS = {"file_id", "file_unique_id"}
+# Поля, которые не нужны для воспроизведения и удаляются целиком
+DROP_FIELDS = {"vcard", "bio", "email", "location", "venue", "invite_link", "file_name"}
+
+LOWER_CYRILLIC = "абвгдежзийклмнопрстуфхцчшщыэюя"
+LOWER_LATIN = "abcdefghijklmnopqrstuvwxyz"
+_callback_number = re.compile(r"\d{5,}")
+_word = re.compile(r"\w+")
+
+
+class Redactor:
+    """
+    Скрывает персональные данные в апдейте, сохраняя его форму.
+
+    Идентификаторы заменяются HMAC от исходного значения: один и тот же
+    пользователь в записи всегда получает один и тот же ID, поэтому сценарии
+    (регистрация, одобрение по кнопке) воспроизводятся целиком. Текст
+    маскируется посимвольно с сохранением длины и класса символов (буква
+    кириллицы, латиницы, цифра), чтобы валидация ФИО, телефона и номера
+    участка при воспроизведении проходила так же, как в исходном трафике.
+    """
+
+    def __init__(self, salt: str, keep_texts: Iterable[str] = ()):
+        self._key = salt.encode()
+        self.keep_texts: FrozenSet[str] = frozenset(keep_texts)
+
+    def _digest(self, value: str) -> bytes:
+        return hmac.new(self._key, value.encode(), hashlib.sha256).digest()
+
+    def hash_id(self, value: int) -> int:
+        """Стабильная замена ID с сохранением знака (ID групп отрицательные)."""
+        hashed = int.from_bytes(self._digest(str(abs(value)))[:6], "big") % 9_000_000_000 + 1_000_000_000
+        return -hashed if value < 0 else hashed
+
+    def _mask_word(self, word: str) -> str:
+        digest = self._digest(word)
+        result = []
+        for i, char in enumerate(word):
+            byte = digest[i % len(digest)] ^ (i // len(digest))
+            lower = char.lower()
+            if lower in LOWER_CYRILLIC or lower == "ё":
+                new = LOWER_CYRILLIC[byte % len(LOWER_CYRILLIC)]
+                result.append(new.upper() if char.isupper() else new)
+            elif lower in LOWER_LATIN:
+                new = LOWER_LATIN[byte % len(LOWER_LATIN)]
+                result.append(new.upper() if char.isupper() else new)
+            elif char.isdigit():
+                result.append(str(byte % 10))
+            else:
+                result.append(char)
+        return "".join(result)
+
+    def mask(self, text: str) -> str:
+        """
+        Заменить буквы и цифры псевдослучайными того же класса.
+
+        Каждое слово маскируется отдельно, поэтому фамилия в ФИО и та же
+        фамилия в поисковом запросе админа дают одинаковый результат.
+        """
+        return _word.sub(lambda m: self._mask_word(m.group()), text)
+
+    def mask_text(self, text: str) -> str:
+        """Текст сообщения: команда и кнопки меню сохраняются, аргументы маскируются."""
+        if text in self.keep_texts:
+            return text
+        if text.startswith("/"):
+            command, sep, args = text.partition(" ")
+            return command + sep + self.mask(args)
+        if text.startswith("+"):
+            return "+" + self.mask(text[1:])
+        return self.mask(text)
+
+    def mask_callback(self, data: str) -> str:
+        """В данных кнопок заменяются только длинные числа (ID пользователей)."""
+        return _callback_number.sub(lambda m: str(self.hash_id(int(m.group()))), data)
+
+    def redact(self, value: Any) -> Any:
+        """Скрыть персональные данные в словаре апдейта (рекурсивно)."""
+        if isinstance(value, list):
+            return [self.redact(item) for item in value]
+        if not isinstance(value, dict):
+            return value
+
+        result = {}
+        for key, item in value.items():
+            if key in DROP_FIELDS:
+                continue
+            if key in ID_FIELDS and isinstance(item, int):
+                result[key] = self.hash_id(item)
+            elif key in NAME_FIELDS and isinstance(item, str):
+                result[key] = self.mask(item)
+            elif key in TEXT_FIELDS and isinstance(item, str):
+                result[key] = self.mask_text(item)
+            elif key in FILE_FIELDS and isinstance(item, str):
+                result[key] = "f_" + self._digest(item)[:12].hex()
+            elif key == "data" and isinstance(item, str):
+                result[key] = self.mask_callback(item)
+            else:
+                result[key] = self.redact(item)
+        return result
+
+
+class GzipJsonlHandler(logging.Handler):
+    """
+    Пишет сообщения логгера строками в gzip-файл.
+
+    Сжатый поток сбрасывается на диск каждые `flush_every` записей и при
+    закрытии; при дозаписи в существующий файл добавляется новый gzip-блок,
+    такой файл читается обычным gzip.open.
+    """
+
+    def __init__(self, path: str, flush_every: int = 100):
+        super().__init__()
+        self.stream = gzip.open(path, "at", encoding="utf-8")
+        self.flush_every = flush_every
+        self._pending = 0
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self.stream.write(self.format(record) + "\n")
+            self._pending += 1
+            if self._pending >= self.flush_every:
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        if self.stream and not self.stream.closed:
+            self.stream.flush()
+        self._pending = 0
+
+    def close(self):
+        try:
+            if self.stream and not self.stream.closed:
+                self.stream.close()
+        finally:
+            super().close()
+
+
+class UpdateRecorder:
+    """Сохраняет апдейты со скрытыми персональными данными и временем получения."""
+
+    def __init__(self, redactor: Redactor):
+        self.redactor = redactor
+        self.recorded = 0
+
+    def record(self, update: Dict[str, Any], is_admin: bool = False):
+        """Записать апдейт (словарь в формате Bot API)."""
+        entry = {"ts": round(time.time(), 6), "update": self.redactor.redact(update)}
+        if is_admin:
+            entry["admin"] = True
+        record_logger.info(json.dumps(entry, ensure_ascii=False, separators=(",", ":")))
+        self.recorded += 1
+
+
+def setup_update_recording(path: str, salt: str = "", keep_texts: Iterable[str] = ()) -> UpdateRecorder:
+    """Включить запись апдейтов в gzip JSONL (запись на диск в отдельном потоке)."""
+    from logging_config import queue_handler
+
+    if not salt:
+        salt = os.urandom(16).hex()
+        logger.warning("RECORD_SALT не задан: ID в записи не совпадут с записями других запусков")
+
+    handler = GzipJsonlHandler(path)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    record_logger.handlers = [queue_handler(handler)]
+    record_logger.setLevel(logging.INFO)
+    logger.info(f"Запись апдейтов включена: {path}")
+    return UpdateRecorder(Redactor(salt, keep_texts))
+
+
+def read_recording(path: str) -> Iterator[Dict[str, Any]]:
+    """Прочитать записи из файла (gzip или обычный JSONL)."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
@@ -0,0 +1,163 @@
+"""Реестр собственников участков: импорт и сверка заявок."""
+import asyncio
+import csv
+import html
+import io
+import logging
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from database import replace_owners, find_owner_candidates
+from security import validate_full_name, validate_phone, validate_plot_number, normalize_phone, normalize_plot
+
+logger = logging.getLogger(__name__)
+
+# Сколько строк проверяется между передачами управления event loop
+IMPORT_BATCH_SIZE = 500
+
+# Баллы совпадения заявки с записью реестра (в сумме 100)
+SCORE_PLOT = 40
+SCORE_SURNAME = 25
+SCORE_FIRST_NAME = 10
+SCORE_INITIAL = 5
+SCORE_PATRONYMIC = 5
+SCORE_PHONE = 20
+
+# Порог, начиная с которого заявку можно одобрять без сверки с документом
+FAST_TRACK_SCORE = 85
+PARTIAL_SCORE = 50
+
+HEADER_WORDS = ("участок", "кадастр", "plot", "фио", "собственник", "owner")
+
+
+def name_tokens(full_name: str) -> List[str]:
+    """Части ФИО в нижнем регистре, ё заменена на е."""
+    name = html.unescape(full_name).lower().replace("ё", "е")
+    return re.findall(r"[a-zа-я]+(?:[-'][a-zа-я]+)*", name)
+
+
+class ImportResult:
+    """Итог разбора файла реестра."""
+
+    def __init__(self):
+        self.rows: List[Tuple] = []
+        # (номер строки файла, причина)
+        self.errors: List[Tuple[int, str]] = []
+        self.total = 0
+
+
+def _read_rows(text: str) -> List[List[str]]:
+    """Прочитать CSV с разделителем ";" или ","."""
+    sample = text[:4096]
+    delimiter = ";" if sample.count(";") >= sample.count(",") else ","
+    return list(csv.reader(io.StringIO(text), delimiter=delimiter))
+
+
+def _validate_row(row: List[str]) -> Tuple[Optional[Tuple], str]:
+    """Проверить и нормализовать строку "участок; ФИО собственника; телефон"."""
+    cells = [cell.strip() for cell in row]
+    if len(cells) < 2:
+        return None, "ожидается минимум 2 колонки: участок и ФИО"
+    plot_number, owner_name = cells[0], cells[1]
+    phone = cells[2] if len(cells) > 2 else ""
+
+    is_valid, error_msg = validate_plot_number(plot_number)
+    if not is_valid:
+        return None, f"участок: {error_msg}"
+    is_valid, error_msg = validate_full_name(owner_name)
+    if not is_valid:
+        return None, f"ФИО: {error_msg}"
+    if phone:
+        phone = normalize_phone(phone)
+        is_valid, error_msg = validate_phone(phone)
+        if not is_valid:
+            return None, f"телефон: {error_msg}"
+
+    tokens = name_tokens(owner_name)
+    if not tokens:
+        return None, "ФИО: нет букв"
+    return (plot_number, normalize_plot(plot_number), owner_name, tokens[0], phone or None), ""
+
+
+async def parse_register(text: str) -> ImportResult:
+    """
+    Разобрать CSV реестра собственников: участок, ФИО собственника, телефон.
+
+    Строки проверяются пачками по IMPORT_BATCH_SIZE, между пачками управление
+    возвращается event loop, чтобы большой файл не задерживал другие апдейты.
+    Заголовок в первой строке распознается и пропускается.
+    """
+    result = ImportResult()
+    rows = _read_rows(text)
+    start = 0
+    if rows and any(word in " ".join(rows[0]).lower() for word in HEADER_WORDS):
+        start = 1
+
+    for offset in range(start, len(rows), IMPORT_BATCH_SIZE):
+        for line_no, row in enumerate(rows[offset:offset + IMPORT_BATCH_SIZE], offset + 1):
+            if not any(cell.strip() for cell in row):
+                continue
+            result.total += 1
+            normalized, error = _validate_row(row)
+            if normalized:
+                result.rows.append(normalized)
+            else:
+                result.errors.append((line_no, error))
+        await asyncio.sleep(0)
+    return result
+
+
+async def import_register(text: str) -> ImportResult:
+    """Разобрать файл и заменить реестр корректными строками."""
+    result = await parse_register(text)
+    if result.rows:
+        await replace_owners(result.rows)
+    logger.info(
+        f"Импорт реестра: строк {result.total}, загружено {len(result.rows)}, ошибок {len(result.errors)}"
+    )
+    return result
+
+
+def match_score(full_name: str, phone: str, plot_number: str, owner: Dict[str, Any]) -> int:
+    """Оценка совпадения заявки с записью реестра от 0 до 100."""
+    score = 0
+    if normalize_plot(plot_number) == owner["plot_key"]:
+        score += SCORE_PLOT
+    if owner["phone"] and normalize_phone(phone) == owner["phone"]:
+        score += SCORE_PHONE
+
+    applicant = name_tokens(full_name)
+    registered = name_tokens(owner["owner_name"])
+    if applicant and registered and applicant[0] == registered[0]:
+        score += SCORE_SURNAME
+        if len(applicant) > 1 and len(registered) > 1:
+            if applicant[1] == registered[1]:
+                score += SCORE_FIRST_NAME
+            elif applicant[1][0] == registered[1][0]:
+                score += SCORE_INITIAL
+        if len(applicant) > 2 and len(registered) > 2 and applicant[2] == registered[2]:
+            score += SCORE_PATRONYMIC
+    return score
+
+
+async def match_owner(full_name: str, phone: str, plot_number: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+    """Лучшая запись реестра для заявки и ее оценка, None - совпадений нет."""
+    tokens = name_tokens(full_name)
+    candidates = await find_owner_candidates(
+        normalize_plot(plot_number), normalize_phone(phone), tokens[0] if tokens else ""
+    )
+    scored = [(match_score(full_name, phone, plot_number, owner), owner) for owner in candidates]
+    if not scored:
+        return None
+    return max(scored, key=lambda item: item[0])
+
+
+def format_match(match: Optional[Tuple[int, Dict[str, Any]]]) -> str:
+    """Строки о сверке с реестром для уведомления админа."""
+    if match is None or match[0] < PARTIAL_SCORE:
+        return "❌ <b>Реестр:</b> совпадений нет"
+    score, owner = match
+    owner_line = f"{html.escape(owner['owner_name'])}, участок {html.escape(owner['plot_number'])}"
+    if score >= FAST_TRACK_SCORE:
+        return f"⚡ <b>Реестр:</b> совпадение {score}% ({owner_line})\nМожно одобрить без сверки документа"
+    return f"⚠️ <b>Реестр:</b> частичное совпадение {score}% ({owner_line})"
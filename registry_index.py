@@ -0,0 +1,220 @@
+"""Индекс реестра пользователей в памяти для поиска без обращения к SQLite."""
+import asyncio
+import bisect
+import logging
+import time
+from abc import ABC, abstractmethod
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+from database import data_generation, get_search_columns, like_fold
+
+logger = logging.getLogger(__name__)
+
+# Разделитель значений в склеенной колонке: sanitize_search_query его не пропускает,
+# поэтому совпадение не может захватить два соседних значения
+SEPARATOR = "\x00"
+# Сколько значений в одном куске колонки: дописывание пересобирает только последний кусок
+CHUNK_SIZE = 4096
+LOAD_BATCH = 10000
+
+# Поле таблицы users для каждого вида поиска (как в search_by_*)
+KIND_FIELDS = {
+    "plot": "plot_number",
+    "phone": "phone",
+    "name": "full_name",
+}
+FIELDS = ("full_name", "phone", "plot_number")
+
+
+class _JoinedColumn:
+    """
+    Строковая колонка, склеенная в несколько больших строк.
+
+    Поиск подстроки идет через str.find по всему куску сразу (в C, без
+    Python-цикла по строкам), номер значения по позиции находится бинарным
+    поиском по массиву смещений.
+    """
+
+    def __init__(self):
+        self._texts: List[str] = []
+        self._starts: List[array] = []
+        self._tail: List[str] = []
+        self._dirty = False
+
+    def append(self, value: str):
+        if len(self._tail) == CHUNK_SIZE:
+            if self._dirty:
+                self._seal()
+            self._tail = []
+        if not self._tail:
+            self._texts.append("")
+            self._starts.append(array("l"))
+        self._tail.append(value)
+        self._dirty = True
+
+    def _seal(self):
+        """Склеить последний кусок после дописывания (перестраивается только он)."""
+        starts = array("l")
+        offset = 0
+        for item in self._tail:
+            starts.append(offset)
+            offset += len(item) + 1
+        self._texts[-1] = SEPARATOR.join(self._tail) + SEPARATOR
+        self._starts[-1] = starts
+        self._dirty = False
+
+    def find_all(self, query: str) -> List[int]:
+        """Номера значений, содержащих `query`, по возрастанию."""
+        if self._dirty:
+            self._seal()
+        found = []
+        for chunk, (text, starts) in enumerate(zip(self._texts, self._starts)):
+            base = chunk * CHUNK_SIZE
+            pos = text.find(query)
+            while pos != -1:
+                index = bisect.bisect_right(starts, pos) - 1
+                found.append(base + index)
+                # Следующее совпадение ищем уже в следующем значении
+                if index + 1 >= len(starts):
+                    break
+                pos = text.find(query, starts[index + 1])
+        return found
+
+
+class _FieldIndex:
+    """
+    Одно поле всех пользователей: колонка значений и словарь слов.
+
+    Запрос без пробелов целиком лежит внутри одного слова значения, поэтому
+    ищется по колонке уникальных слов (она заметно короче: фамилии и имена
+    повторяются), а номера строк берутся из инвертированного списка слова.
+    Запрос с пробелами ищется по колонке целых значений. Для телефонов и
+    участков слова почти не повторяются, и словарь не строится.
+    """
+
+    def __init__(self, tokenize: bool):
+        self.tokenize = tokenize
+        self.values = _JoinedColumn()
+        self.words = _JoinedColumn()
+        self._word_ids: Dict[str, int] = {}
+        self._postings: List[array] = []
+
+    def append(self, row: int, value: str):
+        value = like_fold(value or "")
+        self.values.append(value)
+        if not self.tokenize:
+            return
+        for word in set(value.split()):
+            word_id = self._word_ids.get(word)
+            if word_id is None:
+                word_id = self._word_ids[word] = len(self._postings)
+                self._postings.append(array("l"))
+                self.words.append(word)
+            self._postings[word_id].append(row)
+
+    def find(self, query: str) -> Iterable[int]:
+        """Номера строк, значение которых содержит `query` (уже приведенный like_fold)."""
+        if self.tokenize and query.split() == [query]:
+            rows = set()
+            for word_id in self.words.find_all(query):
+                rows.update(self._postings[word_id])
+            return rows
+        return self.values.find_all(query)
+
+
+class IncrementalIndex(ABC):
+    """
+    Основа индексов пользователей в памяти.
+
+    При каждом обращении индекс дочитывает из базы только строки с id больше
+    последнего загруженного, если поколение данных (database.data_generation)
+    сменилось. Бот не меняет ФИО, телефон и участок существующих заявок и не
+    удаляет их, поэтому этого достаточно. Строки нумеруются по порядку
+    загрузки, `_ids` переводит номер строки в id пользователя.
+    """
+
+    def __init__(self):
+        self._ids = array("q")
+        self._last_id = 0
+        self._generation = -1
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @abstractmethod
+    def _add(self, row: int, full_name: str, phone: str, plot_number: str):
+        """Добавить в индекс строку с номером `row`."""
+
+    async def sync(self):
+        """Дочитать новых пользователей, если с прошлой синхронизации были записи."""
+        if self._generation == data_generation():
+            return
+        async with self._lock:
+            generation = data_generation()
+            if generation == self._generation:
+                return
+            while True:
+                rows = await get_search_columns(self._last_id, LOAD_BATCH)
+                for user_id, full_name, phone, plot_number in rows:
+                    self._add(len(self._ids), full_name, phone, plot_number)
+                    self._ids.append(user_id)
+                if rows:
+                    self._last_id = rows[-1][0]
+                if len(rows) < LOAD_BATCH:
+                    break
+                # Большую базу загружаем пачками, не блокируя event loop надолго
+                await asyncio.sleep(0)
+            self._generation = generation
+
+
+class RegistryIndex(IncrementalIndex):
+    """
+    Снимок полей поиска всех пользователей в памяти.
+
+    Загружается при старте и дальше обновляется при поиске (см.
+    IncrementalIndex). Результаты совпадают с LIKE-поиском database.py:
+    подстрока без учета регистра латиницы, новые заявки первыми.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.loaded = False
+        self._fields = {field: _FieldIndex(tokenize=field == "full_name") for field in FIELDS}
+
+    def _add(self, row: int, full_name: str, phone: str, plot_number: str):
+        self._fields["full_name"].append(row, full_name)
+        self._fields["phone"].append(row, phone)
+        self._fields["plot_number"].append(row, plot_number)
+
+    async def load(self):
+        """Загрузить всех пользователей."""
+        started = time.perf_counter()
+        await self.sync()
+        self.loaded = True
+        logger.info(f"Индекс реестра загружен: {len(self)} пользователей за {time.perf_counter() - started:.2f} с")
+
+    async def search(self, kind: str, query: str, limit: Optional[int] = None) -> Optional[List[int]]:
+        """
+        id пользователей, у которых поле вида `kind` (plot, phone, name или any -
+        любое из трех) содержит `query`, новые первыми.
+
+        None - запрос индексом не обслуживается (символ "_" в LIKE означает
+        любой символ), нужен поиск в базе.
+        """
+        if "_" in query:
+            return None
+        await self.sync()
+        query = like_fold(query)
+        fields = FIELDS if kind == "any" else (KIND_FIELDS[kind],)
+        rows = set()
+        for field in fields:
+            rows.update(self._fields[field].find(query))
+        ordered = sorted(rows, reverse=True)
+        if limit is not None:
+            ordered = ordered[:limit]
+        return [self._ids[row] for row in ordered]
+
+
+registry_index = RegistryIndex()
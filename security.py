@@ -144,6 +144,34 @@ def validate_plot_number(plot_number: str) -> Tuple[bool, str]:
     return True, ""
 
 
+def normalize_plot(plot_number: str) -> str:
+    """Ключ участка: без пробелов, в нижнем регистре, без ведущих нулей в частях номера."""
+    plot = re.sub(r"\s+", "", html.unescape(plot_number)).lower()
+    return ":".join(part.lstrip("0") or "0" for part in plot.split(":"))
+
+
+# Кадастровый номер: регион:район:квартал[:участок]
+_cadastral_number = re.compile(r"(\d{1,2})\s*:\s*(\d{1,2})\s*:\s*(\d{5,7})(?:\s*:\s*(\d{1,6}))?")
+CADASTRAL_QUARTER_DIGITS = 7
+
+
+def parse_cadastral_number(plot_number: str) -> Optional[Tuple[int, int, str, Optional[int]]]:
+    """
+    Разобрать кадастровый номер участка.
+    
+    Квартал дополняется нулями до 7 цифр, чтобы сравнение строк совпадало
+    с числовым: "50:28:90247:12" -> (50, 28, "0090247", 12).
+    
+    Returns:
+        (регион, район, квартал, участок или None) или None, если номер не кадастровый
+    """
+    match = _cadastral_number.fullmatch(html.unescape(plot_number or "").strip())
+    if not match:
+        return None
+    region, district, quarter, parcel = match.groups()
+    return int(region), int(district), quarter.zfill(CADASTRAL_QUARTER_DIGITS), int(parcel) if parcel else None
+
+
 def validate_file_extension(filename: Optional[str], is_document: bool = False) -> Tuple[bool, str]:
     """
     Валидация расширения файла.
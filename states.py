@@ -17,3 +17,7 @@ class AdminSearchStates(StatesGroup):
     waiting_for_name = State()
     waiting_for_universal = State()
 
+
+class AdminImportStates(StatesGroup):
+    """Состояния загрузки реестра собственников."""
+    waiting_for_file = State()
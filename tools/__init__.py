@@ -0,0 +1 @@
+"""Вспомогательные утилиты для эксплуатации бота."""
@@ -0,0 +1,372 @@
+"""
+Локальный фейковый Telegram Bot API для нагрузочного тестирования.
+
+Реализует методы, которые использует бот, и хранит все в памяти.
+Настоящий main.py подключается к нему через TELEGRAM_API_URL:
+
+    python -m tools.fake_telegram --port 8081 --latency 0.05 --rate-429 0.01 \\
+        --migrate-chat=-100123:-100456
+    TELEGRAM_API_URL=http://127.0.0.1:8081 python main.py
+
+Служебные эндпоинты для нагрузочных сценариев:
+    POST /_control/updates  - поставить апдейт (или список апдейтов) в очередь getUpdates
+    GET  /_control/sent     - сообщения, отправленные ботом (?chat_id=...&offset=...)
+    GET  /_control/stats    - число вызовов и ошибок по методам, длина очереди апдейтов
+    POST /_control/config   - изменить latency, jitter, rate_429, retry_after на лету
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+BOT_USER = {"id": 42, "is_bot": True, "first_name": "Вахтер", "username": "fake_vahter_bot"}
+
+
+class TelegramError(Exception):
+    """Ошибка, которую нужно вернуть боту в формате Bot API."""
+
+    def __init__(self, code: int, description: str, parameters: Optional[Dict[str, Any]] = None):
+        super().__init__(description)
+        self.code = code
+        self.description = description
+        self.parameters = parameters
+
+
+class FakeTelegram:
+    """Состояние фейкового Bot API и обработчики методов."""
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        rate_429: float = 0.0,
+        retry_after: int = 1,
+        migrated_chats: Optional[Dict[int, int]] = None,
+        seed: Optional[int] = None
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.migrated_chats = migrated_chats or {}
+        self.random = random.Random(seed)
+
+        self.updates: List[Dict[str, Any]] = []
+        self.sent: List[Dict[str, Any]] = []
+        self.calls: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.files: Dict[str, bytes] = {}
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._file_ids = itertools.count(1)
+        self._new_updates = asyncio.Event()
+
+        self.methods = {
+            "getMe": self.get_me,
+            "getUpdates": self.get_updates,
+            "deleteWebhook": self.ok,
+            "sendMessage": self.send_message,
+            "sendPhoto": self.send_photo,
+            "sendDocument": self.send_document,
+            "editMessageText": self.edit_message_text,
+            "answerCallbackQuery": self.ok,
+            "answerInlineQuery": self.ok,
+            "createChatInviteLink": self.create_chat_invite_link,
+            "getChat": self.get_chat,
+            "getChatMember": self.get_chat_member,
+            "banChatMember": self.chat_action,
+            "unbanChatMember": self.chat_action,
+            "getFile": self.get_file,
+        }
+
+    # --- Служебные функции ---
+
+    def add_update(self, update: Dict[str, Any]) -> int:
+        """Поставить апдейт в очередь getUpdates."""
+        update = dict(update)
+        update["update_id"] = next(self._update_ids)
+        self.updates.append(update)
+        self._new_updates.set()
+        return update["update_id"]
+
+    def add_file(self, content: bytes) -> Dict[str, Any]:
+        """Зарегистрировать файл, который бот сможет скачать через getFile."""
+        number = next(self._file_ids)
+        file_id = f"fake_file_{number}"
+        self.files[file_id] = content
+        return {"file_id": file_id, "file_unique_id": f"fake_unique_{number}", "file_size": len(content)}
+
+    def _chat_id(self, params: Dict[str, Any]) -> Any:
+        chat_id = params.get("chat_id")
+        try:
+            chat_id = int(chat_id)
+        except (TypeError, ValueError):
+            return chat_id
+        if chat_id in self.migrated_chats:
+            raise TelegramError(
+                400,
+                "Bad Request: group chat was upgraded to a supergroup chat",
+                {"migrate_to_chat_id": self.migrated_chats[chat_id]}
+            )
+        return chat_id
+
+    def _chat(self, chat_id: Any) -> Dict[str, Any]:
+        if isinstance(chat_id, int) and chat_id > 0:
+            return {"id": chat_id, "type": "private", "first_name": f"User {chat_id}"}
+        return {"id": chat_id if isinstance(chat_id, int) else -1, "type": "supergroup", "title": "Поселок"}
+
+    def _message(self, method: str, params: Dict[str, Any], **extra: Any) -> Dict[str, Any]:
+        chat_id = self._chat_id(params)
+        message = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": self._chat(chat_id),
+            "from": BOT_USER,
+            **extra,
+        }
+        self.sent.append({"method": method, "chat_id": chat_id, **message})
+        return message
+
+    # --- Методы Bot API ---
+
+    async def ok(self, params: Dict[str, Any]) -> Any:
+        return True
+
+    async def get_me(self, params: Dict[str, Any]) -> Any:
+        return BOT_USER
+
+    async def get_updates(self, params: Dict[str, Any]) -> Any:
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        timeout = float(params.get("timeout") or 0)
+        # Подтвержденные ботом апдейты удаляем, как настоящий Telegram
+        self.updates = [u for u in self.updates if u["update_id"] >= offset]
+        if not self.updates and timeout:
+            self._new_updates.clear()
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.updates[:limit]
+
+    async def send_message(self, params: Dict[str, Any]) -> Any:
+        return self._message("sendMessage", params, text=params.get("text", ""))
+
+    async def send_photo(self, params: Dict[str, Any]) -> Any:
+        photo = params.get("photo")
+        return self._message(
+            "sendPhoto",
+            params,
+            photo=[{"file_id": str(photo), "file_unique_id": f"u_{photo}", "width": 800, "height": 600}],
+            caption=params.get("caption")
+        )
+
+    async def send_document(self, params: Dict[str, Any]) -> Any:
+        document = params.get("document")
+        return self._message(
+            "sendDocument",
+            params,
+            document={"file_id": str(document), "file_unique_id": f"u_{document}"},
+            caption=params.get("caption")
+        )
+
+    async def edit_message_text(self, params: Dict[str, Any]) -> Any:
+        if params.get("inline_message_id"):
+            return True
+        message = self._message("editMessageText", params, text=params.get("text", ""))
+        message["message_id"] = int(params.get("message_id") or message["message_id"])
+        return message
+
+    async def create_chat_invite_link(self, params: Dict[str, Any]) -> Any:
+        chat_id = self._chat_id(params)
+        return {
+            "invite_link": f"https://t.me/+fake{abs(hash((chat_id, time.time()))) % 10 ** 10}",
+            "creator": BOT_USER,
+            "creates_join_request": False,
+            "is_primary": False,
+            "is_revoked": False,
+            "name": params.get("name"),
+            "member_limit": int(params["member_limit"]) if params.get("member_limit") else None,
+        }
+
+    async def get_chat(self, params: Dict[str, Any]) -> Any:
+        chat = self._chat(self._chat_id(params))
+        chat.update({"accent_color_id": 0, "max_reaction_count": 11})
+        return chat
+
+    async def get_chat_member(self, params: Dict[str, Any]) -> Any:
+        self._chat_id(params)
+        user_id = int(params.get("user_id") or 0)
+        if user_id == BOT_USER["id"]:
+            return {
+                "status": "administrator", "user": BOT_USER, "can_be_edited": False,
+                "is_anonymous": False, "can_manage_chat": True, "can_delete_messages": True,
+                "can_manage_video_chats": True, "can_restrict_members": True,
+                "can_promote_members": False, "can_change_info": True, "can_invite_users": True,
+                "can_post_stories": False, "can_edit_stories": False, "can_delete_stories": False,
+            }
+        return {"status": "member", "user": {"id": user_id, "is_bot": False, "first_name": "User"}}
+
+    async def chat_action(self, params: Dict[str, Any]) -> Any:
+        self._chat_id(params)
+        return True
+
+    async def get_file(self, params: Dict[str, Any]) -> Any:
+        file_id = params.get("file_id")
+        content = self.files.get(file_id, f"fake content of {file_id}".encode())
+        return {
+            "file_id": file_id,
+            "file_unique_id": f"u_{file_id}",
+            "file_size": len(content),
+            "file_path": f"documents/{file_id}",
+        }
+
+    # --- HTTP ---
+
+    async def _read_params(self, request: web.Request) -> Dict[str, Any]:
+        params: Dict[str, Any] = dict(request.query)
+        if request.can_read_body:
+            if request.content_type == "application/json":
+                params.update(await request.json())
+            else:
+                for key, value in (await request.post()).items():
+                    # Файлы, загруженные ботом, заменяем их именем
+                    params[key] = getattr(value, "filename", value)
+        return params
+
+    async def _delay(self):
+        delay = self.latency + (self.random.uniform(-self.jitter, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def handle_method(self, request: web.Request) -> web.Response:
+        name = request.match_info["method"]
+        self.calls[name] = self.calls.get(name, 0) + 1
+        handler = self.methods.get(name)
+        if handler is None:
+            return self._error(name, TelegramError(404, "Not Found: method not found"))
+
+        if name != "getUpdates":
+            await self._delay()
+            if self.rate_429 and self.random.random() < self.rate_429:
+                return self._error(name, TelegramError(
+                    429,
+                    f"Too Many Requests: retry after {self.retry_after}",
+                    {"retry_after": self.retry_after}
+                ))
+
+        try:
+            result = await handler(await self._read_params(request))
+        except TelegramError as e:
+            return self._error(name, e)
+        return web.json_response({"ok": True, "result": result})
+
+    def _error(self, name: str, error: TelegramError) -> web.Response:
+        self.errors[name] = self.errors.get(name, 0) + 1
+        body: Dict[str, Any] = {"ok": False, "error_code": error.code, "description": error.description}
+        if error.parameters:
+            body["parameters"] = error.parameters
+        return web.json_response(body, status=error.code)
+
+    async def handle_file(self, request: web.Request) -> web.Response:
+        file_id = request.match_info["path"].rsplit("/", 1)[-1]
+        await self._delay()
+        return web.Response(body=self.files.get(file_id, f"fake content of {file_id}".encode()))
+
+    async def control_updates(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        updates = data if isinstance(data, list) else [data]
+        ids = [self.add_update(update) for update in updates]
+        return web.json_response({"ok": True, "update_ids": ids})
+
+    async def control_sent(self, request: web.Request) -> web.Response:
+        offset = int(request.query.get("offset", 0))
+        sent = self.sent[offset:]
+        if "chat_id" in request.query:
+            sent = [m for m in sent if str(m["chat_id"]) == request.query["chat_id"]]
+        return web.json_response({"ok": True, "total": len(self.sent), "result": sent})
+
+    async def control_stats(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "ok": True,
+            "calls": self.calls,
+            "errors": self.errors,
+            "pending_updates": len(self.updates),
+            "sent": len(self.sent),
+        })
+
+    async def control_config(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        for key in ("latency", "jitter", "rate_429"):
+            if key in data:
+                setattr(self, key, float(data[key]))
+        if "retry_after" in data:
+            self.retry_after = int(data["retry_after"])
+        if "migrated_chats" in data:
+            self.migrated_chats = {int(k): int(v) for k, v in data["migrated_chats"].items()}
+        return web.json_response({"ok": True})
+
+    def create_app(self) -> web.Application:
+        app = web.Application(client_max_size=50 * 1024 * 1024)
+        app.router.add_route("*", "/bot{token}/{method}", self.handle_method)
+        app.router.add_get("/file/bot{token}/{path:.+}", self.handle_file)
+        app.router.add_post("/_control/updates", self.control_updates)
+        app.router.add_get("/_control/sent", self.control_sent)
+        app.router.add_get("/_control/stats", self.control_stats)
+        app.router.add_post("/_control/config", self.control_config)
+        return app
+
+
+async def start_fake_telegram(fake: FakeTelegram, host: str = "127.0.0.1", port: int = 8081) -> web.AppRunner:
+    """Запустить фейковый Bot API в текущем event loop."""
+    runner = web.AppRunner(fake.create_app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Фейковый Bot API запущен на http://{host}:{port}")
+    return runner
+
+
+def _parse_migrations(values: List[str]) -> Dict[int, int]:
+    migrations = {}
+    for value in values:
+        old, _, new = value.rpartition(":")
+        migrations[int(old)] = int(new)
+    return migrations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Фейковый Telegram Bot API для нагрузочных тестов")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа, с")
+    parser.add_argument("--jitter", type=float, default=0.0, help="разброс задержки, с")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="доля ответов 429 Too Many Requests")
+    parser.add_argument("--retry-after", type=int, default=1, help="retry_after в ответах 429")
+    parser.add_argument(
+        "--migrate-chat", action="append", default=[], metavar="OLD:NEW",
+        help="отвечать migrate_to_chat_id для запросов к чату OLD"
+    )
+    parser.add_argument("--seed", type=int, default=None, help="seed генератора случайных ошибок")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    fake = FakeTelegram(
+        latency=args.latency,
+        jitter=args.jitter,
+        rate_429=args.rate_429,
+        retry_after=args.retry_after,
+        migrated_chats=_parse_migrations(args.migrate_chat),
+        seed=args.seed
+    )
+    web.run_app(fake.create_app(), host=args.host, port=args.port, access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Воспроизведение записанного трафика через диспетчер бота.
+
+Запись создается ботом при заданном RECORD_UPDATES_FILE. Апдейты подаются
+в настоящий Dispatcher с исходными интервалами, ускоренно или без пауз,
+а запросы к Bot API уходят в фейковый сервер (встроенный или внешний):
+
+    python -m tools.replay_updates updates.jsonl.gz                 # исходная скорость
+    python -m tools.replay_updates updates.jsonl.gz --speed 10      # в 10 раз быстрее
+    python -m tools.replay_updates updates.jsonl.gz --speed max     # без пауз
+    python -m tools.replay_updates updates.jsonl.gz --api-url http://127.0.0.1:8081
+
+База создается во временном файле, если не указан --db. Админами при
+воспроизведении становятся пользователи, отмеченные в записи как админы.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import setup_env, summarize
+
+setup_env()
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+import database
+from config import BOT_TOKEN, set_admin_ids
+from main import create_dispatcher
+from recording import read_recording
+from tools.fake_telegram import FakeTelegram, start_fake_telegram
+
+logger = logging.getLogger(__name__)
+
+
+def parse_speed(value: str) -> Optional[float]:
+    """Множитель скорости; None - без пауз."""
+    if value == "max":
+        return None
+    speed = float(value)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("скорость должна быть больше нуля или max")
+    return speed
+
+
+def event_type(update: Dict[str, Any]) -> str:
+    return next((key for key in update if key != "update_id"), "unknown")
+
+
+def event_user_id(update: Dict[str, Any]) -> Optional[int]:
+    event = update.get(event_type(update))
+    if isinstance(event, dict) and isinstance(event.get("from"), dict):
+        return event["from"].get("id")
+    return None
+
+
+def recorded_admins(records: List[Dict[str, Any]]) -> Set[int]:
+    return {
+        user_id for record in records
+        if record.get("admin") and (user_id := event_user_id(record["update"])) is not None
+    }
+
+
+class Replayer:
+    """Подает записанные апдейты в диспетчер по расписанию записи."""
+
+    def __init__(self, records: List[Dict[str, Any]], speed: Optional[float]):
+        self.records = records
+        self.speed = speed
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.lags: List[float] = []
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def _feed(self, dp, bot: Bot, update: Dict[str, Any]):
+        kind = event_type(update)
+        started = time.perf_counter()
+        try:
+            await dp.feed_raw_update(bot, update)
+        except Exception as e:
+            self.errors[type(e).__name__] += 1
+            logger.debug(f"Ошибка при обработке апдейта {update.get('update_id')}: {e}")
+        self.latencies[kind].append(time.perf_counter() - started)
+
+    async def run(self, dp, bot: Bot) -> float:
+        """Воспроизвести запись, вернуть общее время."""
+        first_ts = self.records[0]["ts"]
+        started = time.perf_counter()
+        tasks = []
+        for record in self.records:
+            if self.speed is not None:
+                due = started + (record["ts"] - first_ts) / self.speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                # Насколько подача отстает от расписания записи
+                self.lags.append(max(0.0, time.perf_counter() - due))
+            tasks.append(asyncio.create_task(self._feed(dp, bot, record["update"])))
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - started
+
+
+def print_report(replayer: Replayer, elapsed: float, original: float, api_calls: Dict[str, int]):
+    total = sum(len(values) for values in replayer.latencies.values())
+    print(
+        f"Воспроизведено {total} апдейтов за {elapsed:.2f} с "
+        f"(в записи {original:.2f} с), {total / elapsed if elapsed else 0:.0f} апдейтов/с"
+    )
+    if replayer.lags:
+        lag = summarize(replayer.lags)
+        print(f"Отставание от расписания: p95 {lag['p95_ms']:.1f} мс, максимум {lag['max_ms']:.1f} мс")
+    print(f"{'тип':<16}{'кол-во':>8}{'p50, мс':>10}{'p95, мс':>10}{'p99, мс':>10}")
+    for kind, values in sorted(replayer.latencies.items()):
+        stats = summarize(values)
+        print(f"{kind:<16}{stats['count']:>8}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+    if replayer.errors:
+        print("Ошибки: " + ", ".join(f"{name} {count}" for name, count in replayer.errors.items()))
+    if api_calls:
+        print("Вызовы Bot API: " + ", ".join(f"{name} {count}" for name, count in sorted(api_calls.items())))
+
+
+async def replay(args: argparse.Namespace):
+    records = list(read_recording(args.recording))
+    if args.limit:
+        records = records[:args.limit]
+    if not records:
+        print("Запись пуста")
+        return
+    records.sort(key=lambda record: record["ts"])
+
+    set_admin_ids(recorded_admins(records))
+    database.DB_NAME = args.db or os.path.join(tempfile.mkdtemp(prefix="replay_"), "replay.db")
+    await database.init_db()
+
+    fake = runner = None
+    api_url = args.api_url
+    if not api_url:
+        fake = FakeTelegram(latency=args.latency)
+        runner = await start_fake_telegram(fake, "127.0.0.1", args.port)
+        api_url = f"http://127.0.0.1:{args.port}"
+
+    bot = Bot(BOT_TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(api_url)))
+    dp = create_dispatcher()
+    replayer = Replayer(records, args.speed)
+    try:
+        elapsed = await replayer.run(dp, bot)
+    finally:
+        await bot.session.close()
+        if runner:
+            await runner.cleanup()
+
+    original = records[-1]["ts"] - records[0]["ts"]
+    print_report(replayer, elapsed, original, fake.calls if fake else {})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Воспроизведение записанных апдейтов")
+    parser.add_argument("recording", help="Файл записи (.jsonl.gz или .jsonl)")
+    parser.add_argument("--speed", type=parse_speed, default=1.0,
+                        help="Множитель скорости (1 - как в записи) или max - без пауз")
+    parser.add_argument("--api-url", help="Адрес внешнего фейкового Bot API (по умолчанию встроенный)")
+    parser.add_argument("--port", type=int, default=8082, help="Порт встроенного фейкового Bot API")
+    parser.add_argument("--latency", type=float, default=0.0, help="Задержка встроенного Bot API, с")
+    parser.add_argument("--db", help="Файл базы (по умолчанию временный)")
+    parser.add_argument("--limit", type=int, default=0, help="Воспроизвести только первые N апдейтов")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR, format="%(levelname)s %(name)s: %(message)s")
+    asyncio.run(replay(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Вывод журнала изменений пользователей в JSONL (как tail -f).
+
+Работает отдельным процессом рядом с ботом и читает ту же базу:
+
+    python -m tools.tail_changes                       # весь журнал и дальше новые записи
+    python -m tools.tail_changes --from-end            # только новые записи
+    python -m tools.tail_changes --consumer crm-sync   # с сохраненной позиции потребителя
+    python -m tools.tail_changes --once                # вывести накопленное и выйти
+
+С --consumer позиция сохраняется в базе, и при следующем запуске вывод
+продолжается с места остановки.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+from changes import ChangeFeed
+
+
+def print_changes(changes):
+    for change in changes:
+        print(json.dumps(change, ensure_ascii=False), flush=True)
+
+
+async def tail(args: argparse.Namespace):
+    database.DB_NAME = args.db
+    feed = ChangeFeed(
+        consumer=args.consumer,
+        after_seq=args.after,
+        from_end=args.from_end,
+        poll_interval=args.interval
+    )
+    if args.once:
+        while True:
+            changes = await feed.fetch()
+            if not changes:
+                break
+            print_changes(changes)
+            await feed.commit()
+        return
+    async for changes in feed.tail():
+        print_changes(changes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Журнал изменений пользователей")
+    parser.add_argument("--db", default=database.DB_NAME, help="Файл базы бота")
+    parser.add_argument("--consumer", help="Имя потребителя: позиция сохраняется в базе")
+    parser.add_argument("--after", type=int, help="Начать после записи с этим seq")
+    parser.add_argument("--from-end", action="store_true", help="Пропустить накопленные записи")
+    parser.add_argument("--interval", type=float, default=1.0, help="Период опроса базы, с")
+    parser.add_argument("--once", action="store_true", help="Вывести накопленные записи и выйти")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(tail(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Сводка по журналу медленных апдейтов.
+
+Запуск:
+    python -m tools.trace_summary slow_updates.jsonl [slow_updates.jsonl.1 ...] [--top 10]
+
+Показывает, на что ушло время медленных апдейтов: суммарное и среднее время
+по видам отрезков (хендлеры, функции БД, методы Bot API), их долю во времени
+апдейтов, а также самые долгие апдейты.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, Iterable, Iterator, List
+
+
+def read_traces(paths: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Прочитать трассы из JSONL-файлов, пропуская поврежденные строки."""
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"{path}:{line_no}: пропущена некорректная строка", file=sys.stderr)
+
+
+def walk_spans(span: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Обойти все вложенные отрезки трассы."""
+    for child in span.get("children", ()):
+        yield child
+        yield from walk_spans(child)
+
+
+def self_time(span: Dict[str, Any]) -> float:
+    """Время отрезка без времени вложенных отрезков."""
+    return max(0.0, span["duration"] - sum(c["duration"] for c in span.get("children", ())))
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(q * (len(values) - 1))))
+    return values[index]
+
+
+def summarize(traces: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Агрегировать время по видам отрезков."""
+    by_name: Dict[str, List[float]] = {}
+    self_by_name: Dict[str, float] = {}
+    total = 0.0
+    queue_wait = 0.0
+    for trace in traces:
+        total += trace["duration"]
+        queue_wait += trace.get("attrs", {}).get("queue_wait", 0.0)
+        for span in walk_spans(trace):
+            by_name.setdefault(span["name"], []).append(span["duration"])
+            self_by_name[span["name"]] = self_by_name.get(span["name"], 0.0) + self_time(span)
+
+    rows = []
+    for name, durations in by_name.items():
+        rows.append({
+            "name": name,
+            "count": len(durations),
+            "total": sum(durations),
+            "self": self_by_name[name],
+            "mean": sum(durations) / len(durations),
+            "p95": percentile(durations, 0.95),
+        })
+    rows.sort(key=lambda row: row["self"], reverse=True)
+    return {"traces": len(traces), "total": total, "queue_wait": queue_wait, "spans": rows}
+
+
+def print_report(traces: List[Dict[str, Any]], top: int):
+    summary = summarize(traces)
+    total = summary["total"] or 1.0
+    print(f"Медленных апдейтов: {summary['traces']}, суммарно {summary['total']:.2f} с")
+    print(f"Ожидание в очереди: {summary['queue_wait']:.2f} с ({summary['queue_wait'] / total:.0%})\n")
+
+    print(f"{'отрезок':<40} {'кол-во':>7} {'собств., с':>11} {'доля':>6} {'средн., с':>10} {'p95, с':>8}")
+    for row in summary["spans"]:
+        print(
+            f"{row['name']:<40} {row['count']:>7} {row['self']:>11.3f} "
+            f"{row['self'] / total:>6.0%} {row['mean']:>10.3f} {row['p95']:>8.3f}"
+        )
+
+    print(f"\nСамые долгие апдейты (топ-{top}):")
+    for trace in sorted(traces, key=lambda t: t["duration"], reverse=True)[:top]:
+        handlers = [s["name"] for s in walk_spans(trace) if s["name"].startswith("handler.")]
+        attrs = trace.get("attrs", {})
+        print(
+            f"  {trace.get('ts', '?')} {trace['duration']:.2f} с {trace['name']} "
+            f"update_id={attrs.get('update_id')} {', '.join(handlers) or '-'}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сводка по журналу медленных апдейтов")
+    parser.add_argument("paths", nargs="+", help="JSONL-файлы с трассами")
+    parser.add_argument("--top", type=int, default=10, help="сколько самых долгих апдейтов показать")
+    args = parser.parse_args()
+
+    traces = list(read_traces(args.paths))
+    if not traces:
+        print("Трассы не найдены")
+        return
+    print_report(traces, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Трассировка обработки апдейтов и журнал медленных апдейтов."""
+import json
+import logging
+import logging.handlers
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Отдельный логгер для трасс: пишет только JSON-строки в свой файл
+trace_logger = logging.getLogger("traces")
+trace_logger.propagate = False
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """Отрезок времени внутри обработки апдейта."""
+    __slots__ = ("name", "attrs", "started", "finished", "children", "error")
+
+    def __init__(self, name: str, attrs: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.attrs = attrs or {}
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.children: List["Span"] = []
+        self.error: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return end - self.started
+
+    def to_dict(self, origin: float) -> Dict[str, Any]:
+        """Представить отрезок и вложенные отрезки в виде словаря."""
+        data = {
+            "name": self.name,
+            "start": round(self.started - origin, 6),
+            "duration": round(self.duration, 6),
+        }
+        if self.attrs:
+            data["attrs"] = self.attrs
+        if self.error:
+            data["error"] = self.error
+        if self.children:
+            data["children"] = [child.to_dict(origin) for child in self.children]
+        return data
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[Optional[Span]]:
+    """
+    Открыть вложенный отрезок в текущей трассе.
+
+    Вне трассы ничего не делает, поэтому его можно оставлять в коде,
+    который вызывается и не из хендлеров.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = Span(name, attrs)
+    parent.children.append(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = type(e).__name__
+        raise
+    finally:
+        child.finished = time.perf_counter()
+        _current_span.reset(token)
+
+
+class Tracer:
+    """Открывает корневые отрезки апдейтов и сохраняет медленные трассы."""
+
+    def __init__(self, slow_threshold: float):
+        self.slow_threshold = slow_threshold
+        self.traced = 0
+        self.slow = 0
+
+    @contextmanager
+    def trace(self, name: str, **attrs: Any) -> Iterator[Span]:
+        """Открыть корневой отрезок апдейта."""
+        root = Span(name, attrs)
+        token = _current_span.set(root)
+        try:
+            yield root
+        except BaseException as e:
+            root.error = type(e).__name__
+            raise
+        finally:
+            root.finished = time.perf_counter()
+            _current_span.reset(token)
+            self.traced += 1
+            if root.duration >= self.slow_threshold:
+                self.slow += 1
+                self._write(root)
+
+    def _write(self, root: Span):
+        record = {
+            "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "duration": round(root.duration, 6),
+            **root.to_dict(root.started),
+        }
+        trace_logger.info(json.dumps(record, ensure_ascii=False, default=str))
+        logger.warning(f"Медленный апдейт: {root.name} {root.duration:.2f} с {root.attrs}")
+
+
+def setup_trace_log(path: str, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5):
+    """Направить медленные трассы в JSONL-файл с ротацией по размеру (запись в отдельном потоке)."""
+    from logging_config import queue_handler
+    
+    handler = logging.handlers.RotatingFileHandler(
+        path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+    )
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    trace_logger.handlers = [queue_handler(handler)]
+    trace_logger.setLevel(logging.INFO)
@@ -0,0 +1,138 @@
+"""Контроль задержки event loop и поиск блокирующих вызовов."""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+from metrics import LOOP_LAG_SECONDS, LOOP_LAG, LOOP_BLOCKS
+
+logger = logging.getLogger(__name__)
+
+# Корень проекта: по нему отличаем кадры нашего кода от кадров библиотек
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+class LoopWatchdog:
+    """
+    Следит за задержкой event loop.
+
+    Задача в самом loop раз в `interval` секунд измеряет, насколько позже
+    запланированного она проснулась. Отдельный поток проверяет, что loop
+    вообще просыпается: если он молчит дольше `threshold`, поток снимает стек
+    основного потока и записывает в лог, какой хендлер или вызов его держит.
+    """
+
+    def __init__(self, interval: float = 0.5, threshold: float = 1.0, history: int = 240):
+        self.interval = interval
+        self.threshold = threshold
+        self.lags: Deque[float] = deque(maxlen=history)
+        self.blocks = 0
+        self.last_block: Optional[Dict[str, Any]] = None
+        self.started_at = time.monotonic()
+        self._heartbeat = time.monotonic()
+        self._reported = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Запустить контроль из работающего event loop."""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._task = asyncio.create_task(self._monitor(), name="loop-watchdog")
+        self._thread = threading.Thread(target=self._detect, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(f"Контроль event loop запущен (порог {self.threshold} с)")
+
+    async def stop(self):
+        """Остановить контроль."""
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _monitor(self):
+        while True:
+            planned = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - planned)
+            self._heartbeat = now
+            self._reported = False
+            self.lags.append(lag)
+            LOOP_LAG.set(lag)
+            LOOP_LAG_SECONDS.observe(lag)
+            if lag > self.threshold:
+                logger.warning(f"Задержка event loop: {lag:.2f} с")
+
+    def _detect(self):
+        while not self._stopped.wait(self.interval):
+            stalled = time.monotonic() - self._heartbeat - self.interval
+            if stalled > self.threshold and not self._reported:
+                self._reported = True
+                self._report_block(stalled)
+
+    def _current_task_name(self, frame) -> Optional[str]:
+        """Задача, корутина которой выполняется в стеке `frame` потока event loop."""
+        frames = set()
+        while frame is not None:
+            frames.add(frame)
+            frame = frame.f_back
+        try:
+            tasks = list(asyncio.all_tasks(self._loop))
+        except RuntimeError:
+            # Набор задач изменился во время обхода из другого потока
+            return None
+        for task in tasks:
+            if getattr(task.get_coro(), "cr_frame", None) in frames:
+                return task.get_name()
+        return None
+
+    def _report_block(self, stalled: float):
+        """Снять стек заблокированного потока event loop и записать отчет."""
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        stack = traceback.extract_stack(frame)
+        own_frames = [f for f in stack if f.filename.startswith(PROJECT_ROOT)]
+        culprit = own_frames[-1] if own_frames else stack[-1]
+
+        self.blocks += 1
+        LOOP_BLOCKS.inc()
+        self.last_block = {
+            "at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "stalled": stalled,
+            "task": self._current_task_name(frame),
+            "location": f"{os.path.relpath(culprit.filename, PROJECT_ROOT)}:{culprit.lineno} in {culprit.name}",
+            "blocking_call": f"{stack[-1].filename}:{stack[-1].lineno} in {stack[-1].name}",
+        }
+        logger.warning(
+            f"Event loop заблокирован уже {stalled:.2f} с. "
+            f"Задача: {self.last_block['task']}, место: {self.last_block['location']}, "
+            f"вызов: {self.last_block['blocking_call']}\n"
+            + "".join(traceback.format_list(stack))
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика задержки за последние измерения."""
+        lags: List[float] = sorted(self.lags)
+        return {
+            "uptime": time.monotonic() - self.started_at,
+            "current": self.lags[-1] if self.lags else 0.0,
+            "p95": lags[int(0.95 * (len(lags) - 1))] if lags else 0.0,
+            "max": lags[-1] if lags else 0.0,
+            "blocks": self.blocks,
+            "last_block": self.last_block,
+        }